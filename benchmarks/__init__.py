@@ -0,0 +1,27 @@
+"""
+Benchmarks for the billing system and the containerization tools.
+
+Run from the repository root, e.g.
+
+    python -m benchmarks.storage_memory --invoices 100000 --lines 10
+    python -m benchmarks.billing_load --invoices 2000 --lines 10
+    python -m benchmarks.mcp_tools --repeat 5
+
+or every suite at once, saving the results as JSON and failing on any
+metric more than --threshold worse than a saved baseline:
+
+    python -m benchmarks --output results.json --baseline baseline.json
+"""
+import os
+import sys
+
+REPOSITORY_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BILLING_SYSTEM_PATH = os.path.join(REPOSITORY_PATH, "billing-system")
+
+
+def use_billing_system() -> None:
+    """
+    Make the billing `app` package importable
+    """
+    if BILLING_SYSTEM_PATH not in sys.path:
+        sys.path.insert(0, BILLING_SYSTEM_PATH)
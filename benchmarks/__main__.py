@@ -0,0 +1,63 @@
+"""
+Run the benchmark suites, save the results as JSON and check them against a
+baseline.
+
+    python -m benchmarks --output results.json
+    python -m benchmarks --output results.json --baseline baseline.json --threshold 0.10
+
+Exits with status 1 when any metric is more than --threshold worse than in
+the baseline. Keep a baseline from before a performance change and run again
+after it: the comparison shows what the change did.
+"""
+import argparse
+import sys
+
+from benchmarks import billing_load, mcp_tools, results
+
+SUITES = ("billing_load", "mcp_tools")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", help="results file to check this run against")
+    parser.add_argument("--threshold", type=float, default=results.DEFAULT_THRESHOLD)
+    parser.add_argument("--suite", action="append", choices=SUITES, help="run only these suites (repeatable)")
+    parser.add_argument("--storage", default="dict", help="billing store for the in-process load scenarios")
+    parser.add_argument("--invoices", type=int, default=2000)
+    parser.add_argument("--lines", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--memory-invoices", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5, help="calls per MCP tool scenario")
+    args = parser.parse_args()
+
+    suites = {}
+    for suite in args.suite or SUITES:
+        print(f"Running {suite}...", file=sys.stderr)
+        if suite == "billing_load":
+            with billing_load.in_process_client(args.storage) as client:
+                suites[suite] = billing_load.run(
+                    client, args.invoices, args.lines, concurrency=args.concurrency
+                )
+            if args.memory_invoices:
+                suites[suite].update(billing_load.memory(args.memory_invoices, args.lines))
+        else:
+            suites[suite] = mcp_tools.run(args.repeat)
+
+    parameters = {name: value for name, value in vars(args).items() if name not in ("output", "baseline")}
+    current = results.save(args.output, parameters, suites)
+    for suite, metrics in suites.items():
+        print(f"\n[{suite}]")
+        print(billing_load.report(metrics) if suite == "billing_load" else mcp_tools.report(metrics))
+    print(f"\nResults saved to {args.output}")
+
+    if args.baseline:
+        baseline = results.load(args.baseline)
+        print()
+        print(results.comparison_report(baseline, current, args.threshold))
+        if results.regressions(baseline, current, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
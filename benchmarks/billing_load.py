@@ -0,0 +1,234 @@
+"""
+Load scenarios against the billing API.
+
+By default the app runs in this process behind FastAPI's TestClient (an
+in-memory store, no server or port involved); with --url the same scenarios
+run against a running server, e.g. the container the MCP server deployed.
+Every scenario creates its own customers and items, so a server that
+already holds data can be measured too.
+
+    python -m benchmarks.billing_load --invoices 2000 --lines 10
+    python -m benchmarks.billing_load --url http://localhost:8001 --concurrency 8
+
+Scenarios: single invoice creation (throughput and latency), bulk import
+(line items per second), paging through every invoice (first walk and the
+cached second walk), per-customer and total-range queries, the totals
+report. Memory per million line items comes from benchmarks.storage_memory.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import storage_memory, use_billing_system
+from benchmarks.results import HIGHER, latency_metrics, metric
+
+BULK_BATCH_ROWS = 1000
+PAGE_SIZE = 100
+# Requests per query scenario, and requests not measured before each
+QUERY_REQUESTS = 200
+WARMUP_REQUESTS = 10
+
+
+def in_process_client(storage_backend: str = "dict"):
+    """
+    A TestClient for the billing app, imported fresh with the given store.
+    Settings and the store are created when `app` is imported, so modules
+    of an earlier import are dropped first.
+    """
+    os.environ["STORAGE_BACKEND"] = storage_backend
+    use_billing_system()
+    for name in [name for name in sys.modules if name == "app" or name.startswith("app.")]:
+        del sys.modules[name]
+    from fastapi.testclient import TestClient
+    from app.main import app
+    return TestClient(app)
+
+
+def http_client(url: str, concurrency: int = 1):
+    import httpx
+    return httpx.Client(
+        base_url=url, timeout=60.0, limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    )
+
+
+def _timed(client, method: str, path: str, **options) -> float:
+    started = time.perf_counter()
+    response = client.request(method, path, **options)
+    elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    return elapsed
+
+
+def _run_requests(client, requests, concurrency: int):
+    """
+    Send (method, path, options) requests, `concurrency` at a time; returns
+    (durations, wall-clock seconds)
+    """
+    started = time.perf_counter()
+    if concurrency <= 1:
+        durations = [_timed(client, method, path, **options) for method, path, options in requests]
+    else:
+        with ThreadPoolExecutor(concurrency) as pool:
+            durations = list(pool.map(lambda request: _timed(client, request[0], request[1], **request[2]), requests))
+    return durations, time.perf_counter() - started
+
+
+# ============================================================
+# Scenarios
+# ============================================================
+def seed(client, customer_count: int, item_count: int):
+    """
+    Create the customers and items invoices are drawn from; returns their ids
+    """
+    tag = uuid.uuid4().hex[:8]
+    customers = client.post(
+        "/customers/bulk", json=[{"name": f"bench-{tag}-{n}", "email": f"bench-{tag}-{n}@example.com"}
+                                 for n in range(customer_count)]
+    )
+    customers.raise_for_status()
+    items = client.post(
+        "/items/bulk", json=[{"name": f"bench-{tag}-{n}", "price": round(1 + (n % 500) * 0.37, 2)}
+                             for n in range(item_count)]
+    )
+    items.raise_for_status()
+    return [row["id"] for row in customers.json()], [row["id"] for row in items.json()]
+
+
+def _invoice_lines(items, n: int, lines_per_invoice: int):
+    return [{"item_id": items[(n * 7 + k) % len(items)], "quantity": k % 5 + 1} for k in range(lines_per_invoice)]
+
+
+def create_invoices(client, customers, items, invoice_count: int, lines_per_invoice: int, concurrency: int) -> dict:
+    requests = [
+        ("POST", "/invoices/", {
+            "params": {"customer_id": customers[n % len(customers)]},
+            "json": _invoice_lines(items, n, lines_per_invoice),
+        })
+        for n in range(invoice_count)
+    ]
+    _run_requests(client, requests[:WARMUP_REQUESTS], 1)
+    durations, wall = _run_requests(client, requests[WARMUP_REQUESTS:], concurrency)
+    return {
+        "create_invoices_per_second": metric(len(durations) / wall, "invoices/s", HIGHER),
+        **latency_metrics("create_invoice", durations),
+    }
+
+
+def bulk_import(client, customers, items, invoice_count: int, lines_per_invoice: int) -> dict:
+    started = time.perf_counter()
+    for first in range(0, invoice_count, BULK_BATCH_ROWS):
+        rows = [
+            {"customer_id": customers[n % len(customers)], "items": _invoice_lines(items, n, lines_per_invoice)}
+            for n in range(first, min(first + BULK_BATCH_ROWS, invoice_count))
+        ]
+        client.post("/invoices/bulk", json=rows).raise_for_status()
+    elapsed = time.perf_counter() - started
+    return {
+        "bulk_line_items_per_second": metric(invoice_count * lines_per_invoice / elapsed, "line items/s", HIGHER),
+    }
+
+
+def walk_pages(client) -> list:
+    """
+    Page through every invoice by cursor; returns each page's duration
+    """
+    durations = []
+    params = {"limit": PAGE_SIZE}
+    while True:
+        started = time.perf_counter()
+        response = client.get("/invoices/", params=params)
+        durations.append(time.perf_counter() - started)
+        response.raise_for_status()
+        cursor = response.json()["next_cursor"]
+        if cursor is None:
+            return durations
+        params = {"limit": PAGE_SIZE, "cursor": cursor}
+
+
+def queries(client, customers, concurrency: int) -> dict:
+    rng = random.Random(1)
+    ranges = []
+    for _ in range(QUERY_REQUESTS):
+        low = rng.uniform(0, 2000)
+        ranges.append(("GET", "/invoices/", {"params": {"min_total": low, "max_total": low + 50, "limit": PAGE_SIZE}}))
+    scenarios = {
+        "customer_invoices": [
+            ("GET", f"/customers/{customers[n % len(customers)]}/invoices", {"params": {"limit": PAGE_SIZE}})
+            for n in range(QUERY_REQUESTS)
+        ],
+        "total_range": ranges,
+        "report_totals": [("GET", "/reports/totals", {})] * QUERY_REQUESTS,
+    }
+    results = {}
+    for name, requests in scenarios.items():
+        _run_requests(client, requests[:WARMUP_REQUESTS], 1)
+        durations, _ = _run_requests(client, requests, concurrency)
+        results.update(latency_metrics(name, durations))
+    return results
+
+
+def memory(invoice_count: int, lines_per_invoice: int) -> dict:
+    """
+    Retained store memory per million line items for each storage backend,
+    extrapolated from invoice_count invoices
+    """
+    return {
+        f"memory_{result['backend']}_per_million_line_items_mb": metric(
+            result["bytes_per_line_item"] * 1_000_000 / 2**20, "MB"
+        )
+        for result in storage_memory.run(invoice_count, lines_per_invoice)
+    }
+
+
+def run(
+    client,
+    invoice_count: int = 2000,
+    lines_per_invoice: int = 10,
+    customer_count: int = 200,
+    item_count: int = 1000,
+    concurrency: int = 1
+) -> dict:
+    """
+    Every API scenario against client; returns {metric name: metric}
+    """
+    customers, items = seed(client, customer_count, item_count)
+    results = create_invoices(client, customers, items, invoice_count, lines_per_invoice, concurrency)
+    results.update(bulk_import(client, customers, items, invoice_count, lines_per_invoice))
+    results.update(latency_metrics("list_page", walk_pages(client)))
+    # Nothing was written since: every page is now a response cache hit
+    results.update(latency_metrics("list_page_cached", walk_pages(client)))
+    results.update(queries(client, customers, concurrency))
+    return results
+
+
+def report(results: dict) -> str:
+    return "\n".join(f"{name:<48} {value['value']:>12g} {value['unit']}" for name, value in results.items())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="a running billing API; in process when omitted")
+    parser.add_argument("--storage", choices=storage_memory.BACKENDS, default="dict", help="in-process store")
+    parser.add_argument("--invoices", type=int, default=2000)
+    parser.add_argument("--lines", type=int, default=10)
+    parser.add_argument("--customers", type=int, default=200)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--memory-invoices", type=int, default=20_000, help="invoices for the memory scenario (0: skip)")
+    parser.add_argument("--json", action="store_true", help="print raw results as JSON")
+    args = parser.parse_args()
+
+    with (http_client(args.url, args.concurrency) if args.url else in_process_client(args.storage)) as client:
+        results = run(client, args.invoices, args.lines, args.customers, args.items, args.concurrency)
+    if args.memory_invoices:
+        results.update(memory(args.memory_invoices, args.lines))
+    print(json.dumps(results, indent=2) if args.json else report(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Timing of the MCP tools against the fake Docker daemon.
+
+The server module is loaded from containerize-mcp.py with its project path
+pointed at a scratch copy of the billing system and its backend at a
+tests.fakes.FakeDockerDaemon, so what is timed is the tools' own work
+(inspecting, rendering, hashing and sending the build context, the job
+pipeline) rather than Docker's. The fake starts no processes, so deploys
+skip the health wait. The project is prepared with wheelhouse=false to keep
+the run offline.
+
+    python -m benchmarks.mcp_tools --repeat 5
+
+Scenarios: prepare_python_project_for_docker; build_and_deploy_python_application
+from a cold build cache, after a source change (rebuild), and with nothing
+changed (up to date), each timed from the tool call to the job's end.
+"""
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks import BILLING_SYSTEM_PATH, REPOSITORY_PATH
+from benchmarks.results import latency_metrics, metric
+from tests.fakes import FakeDockerDaemon
+from tools import build_cache
+from tools.jobs import SUCCEEDED
+from tools.proxy import find_free_port
+
+SERVER_PATH = os.path.join(REPOSITORY_PATH, "containerize-mcp.py")
+TEMPLATE_DOCKERFILE_PATH = os.path.join(REPOSITORY_PATH, "templates", "docker", "Dockerfile")
+
+
+def load_server(project_path: str, docker_host: str):
+    """
+    A fresh instance of the MCP server module, configured for this run
+    """
+    spec = importlib.util.spec_from_file_location("containerize_mcp_benchmark", SERVER_PATH)
+    server = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(server)
+
+    server.PROJECT_PATH = project_path
+    server.TEMPLATE_DOCKERFILE_PATH = TEMPLATE_DOCKERFILE_PATH
+    server.BUILD_CACHE_PATH = os.path.join(project_path, "manifest", build_cache.MANIFEST_NAME)
+    server.DOCKER_BACKEND = "api"
+    server.DOCKER_HOST = docker_host
+    server.APP_PORT = find_free_port()
+    server.HEALTH_PATH = ""
+    return server
+
+
+def _tool(function):
+    """
+    The plain function behind an @mcp.tool registration
+    """
+    return getattr(function, "fn", function)
+
+
+def _time_prepare(server) -> float:
+    started = time.perf_counter()
+    result = _tool(server.prepare_python_project_for_docker)(wheelhouse=False)
+    elapsed = time.perf_counter() - started
+    if not result.startswith("✅"):
+        raise RuntimeError(result)
+    return elapsed
+
+
+async def _time_build(server) -> float:
+    started = time.perf_counter()
+    result = await _tool(server.build_and_deploy_python_application)(None)
+    job = server.jobs.list()[-1] if server.jobs.list() else None
+    if job is None:
+        raise RuntimeError(result)
+    await job.task
+    elapsed = time.perf_counter() - started
+    if job.status != SUCCEEDED:
+        raise RuntimeError(f"{job.kind} {job.status}: {job.error}")
+    return elapsed
+
+
+def _touch_source(project_path: str, revision: int) -> None:
+    with open(os.path.join(project_path, "app", "main.py"), "a", encoding="utf-8") as f:
+        f.write(f"# benchmark revision {revision}\n")
+
+
+async def _run(repeat: int) -> dict:
+    project_path = tempfile.mkdtemp(prefix="mcp-benchmark-")
+    daemon = FakeDockerDaemon()
+    try:
+        shutil.copytree(
+            BILLING_SYSTEM_PATH, project_path, dirs_exist_ok=True,
+            ignore=shutil.ignore_patterns("manifest", "__pycache__", ".dockerignore")
+        )
+        server = load_server(project_path, await daemon.start())
+
+        prepare = [_time_prepare(server) for _ in range(repeat)]
+        cold = await _time_build(server)
+        rebuild = []
+        for revision in range(repeat):
+            _touch_source(project_path, revision)
+            rebuild.append(await _time_build(server))
+        up_to_date = [await _time_build(server) for _ in range(repeat)]
+
+        if server._docker_backend is not None:
+            await server._docker_backend.close()
+    finally:
+        await daemon.stop()
+        shutil.rmtree(project_path, ignore_errors=True)
+
+    return {
+        **latency_metrics("prepare", prepare),
+        "build_cold_ms": metric(cold * 1000, "ms"),
+        **latency_metrics("build_rebuild", rebuild),
+        **latency_metrics("build_up_to_date", up_to_date),
+    }
+
+
+def run(repeat: int = 5) -> dict:
+    # The tools log to stdout as they run
+    with contextlib.redirect_stdout(sys.stderr):
+        return asyncio.run(_run(repeat))
+
+
+def report(results: dict) -> str:
+    return "\n".join(f"{name:<32} {value['value']:>10g} {value['unit']}" for name, value in results.items())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print raw results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    print(json.dumps(results, indent=2) if args.json else report(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark results as JSON, and the regression check between two runs.
+
+A results file records where and when it was measured, the parameters, and
+per suite its named metrics: {"value", "unit", "better": "lower"|"higher"}.
+Comparing a run with a baseline flags every metric that got worse by more
+than the threshold (a fraction: 0.10 is 10%).
+
+    python -m benchmarks.results baseline.json current.json --threshold 0.10
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+
+LOWER = "lower"
+HIGHER = "higher"
+
+DEFAULT_THRESHOLD = 0.10
+
+
+def metric(value: float, unit: str, better: str = LOWER) -> dict:
+    return {"value": round(value, 4), "unit": unit, "better": better}
+
+
+def percentile(ordered, fraction: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted, non-empty list
+    """
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def latency_metrics(name: str, seconds) -> dict:
+    """
+    p50/p95/p99 (in milliseconds) of the durations of one operation
+    """
+    ordered = sorted(seconds)
+    return {
+        f"{name}_p{int(fraction * 100)}_ms": metric(percentile(ordered, fraction) * 1000, "ms")
+        for fraction in (0.50, 0.95, 0.99)
+    }
+
+
+def environment() -> dict:
+    repository = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=repository
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def save(path: str, parameters: dict, suites: dict) -> dict:
+    results = {"environment": environment(), "parameters": parameters, "suites": suites}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
+    return results
+
+
+def load(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ============================================================
+# Regression Check
+# ============================================================
+def compare(baseline: dict, current: dict):
+    """
+    (suite, metric, baseline value, current value, change) for every metric
+    both runs measured; change is the fraction by which it got worse
+    (negative: it improved)
+    """
+    changes = []
+    for suite, metrics in current["suites"].items():
+        previous = baseline["suites"].get(suite, {})
+        for name, measured in metrics.items():
+            before = previous.get(name)
+            if before is None or not before["value"]:
+                continue
+            change = (measured["value"] - before["value"]) / abs(before["value"])
+            if measured["better"] == HIGHER:
+                change = -change
+            changes.append((suite, name, before["value"], measured["value"], change))
+    return changes
+
+
+def regressions(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD):
+    return [change for change in compare(baseline, current) if change[4] > threshold]
+
+
+def comparison_report(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> str:
+    lines = [
+        f"Baseline {baseline['environment'].get('commit') or '?'} ({baseline['environment']['created_at']}) "
+        f"vs {current['environment'].get('commit') or '?'} ({current['environment']['created_at']}), "
+        f"threshold {threshold:.0%}",
+    ]
+    differing = sorted(
+        name for name in set(baseline["parameters"]) | set(current["parameters"])
+        if name not in ("threshold", "suite") and baseline["parameters"].get(name) != current["parameters"].get(name)
+    )
+    if differing:
+        lines.append(f"Warning: measured with different parameters ({', '.join(differing)}), not comparable")
+    lines.append(f"{'suite':<14} {'metric':<40} {'baseline':>12} {'current':>12} {'change':>8}")
+    failed = 0
+    for suite, name, before, after, change in compare(baseline, current):
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            failed += 1
+        elif change < -threshold:
+            flag = "  improved"
+        # Shown as the change in value; the flag says whether that is good
+        raw = (after - before) / abs(before)
+        lines.append(f"{suite:<14} {name:<40} {before:>12g} {after:>12g} {raw:>+8.1%}{flag}")
+    lines.append(f"{failed} regression(s) beyond {threshold:.0%}" if failed else "No regressions")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare benchmark results with a baseline")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    baseline, current = load(args.baseline), load(args.current)
+    print(comparison_report(baseline, current, args.threshold))
+    sys.exit(1 if regressions(baseline, current, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Memory used by each invoice storage backend.
+
+Every backend is measured in its own subprocess so interpreter state from
+one run cannot inflate the other. Invoices are generated one at a time and
+inserted into a bare store (no indexes or rollups attached), and tracemalloc
+reports what the store retains.
+
+    python -m benchmarks.storage_memory --invoices 100000 --lines 10
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+
+from benchmarks import use_billing_system
+
+BACKENDS = ("dict", "columnar")
+
+
+def measure(backend: str, invoice_count: int, lines_per_invoice: int, customer_count: int, item_count: int) -> dict:
+    use_billing_system()
+    from app.models.invoice import Invoice, InvoiceItem
+    from app.storage.columnar import ColumnarInvoices
+    from app.storage.memory import Collection, write_lock
+
+    customers = [uuid.uuid4() for _ in range(customer_count)]
+    items = [uuid.uuid4() for _ in range(item_count)]
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+
+    store = ColumnarInvoices(write_lock) if backend == "columnar" else Collection()
+    for n in range(invoice_count):
+        invoice = Invoice(
+            id=uuid.uuid4(),
+            customer_id=customers[n % customer_count],
+            items=[
+                InvoiceItem(item_id=items[(n + k) % item_count], quantity=k + 1)
+                for k in range(lines_per_invoice)
+            ],
+            total_amount=float(n % 1000),
+        )
+        store[invoice.id] = invoice
+    del invoice
+
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    # Reading a page back materializes models on demand for the columnar store
+    started = time.perf_counter()
+    page = [store[key] for key in store.order[0:1000]]
+    read_seconds = time.perf_counter() - started
+
+    lines = invoice_count * lines_per_invoice
+    return {
+        "backend": backend,
+        "invoices": invoice_count,
+        "line_items": lines,
+        "retained_bytes": retained,
+        "bytes_per_invoice": round(retained / invoice_count, 1),
+        "bytes_per_line_item": round(retained / lines, 1),
+        "insert_seconds": round(elapsed, 3),
+        "read_1000_seconds": round(read_seconds, 4),
+        "page_read": len(page),
+    }
+
+
+def run(invoice_count: int, lines_per_invoice: int, customer_count: int = 1000, item_count: int = 5000):
+    """
+    Measure every backend in a fresh interpreter; returns a list of result dicts
+    """
+    results = []
+    for backend in BACKENDS:
+        output = subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.storage_memory", "--worker", backend,
+                "--invoices", str(invoice_count), "--lines", str(lines_per_invoice),
+                "--customers", str(customer_count), "--items", str(item_count),
+            ],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout
+        results.append(json.loads(output))
+    return results
+
+
+def report(results) -> str:
+    lines = [
+        f"{'backend':<10} {'invoices':>10} {'line items':>11} {'retained':>12} {'B/invoice':>10} {'B/line':>8} {'insert s':>9}"
+    ]
+    for r in results:
+        lines.append(
+            f"{r['backend']:<10} {r['invoices']:>10} {r['line_items']:>11} "
+            f"{r['retained_bytes'] / 2**20:>10.1f}MB {r['bytes_per_invoice']:>10} "
+            f"{r['bytes_per_line_item']:>8} {r['insert_seconds']:>9}"
+        )
+    baseline, *others = results
+    for r in others:
+        lines.append(f"{r['backend']} retains {baseline['retained_bytes'] / max(r['retained_bytes'], 1):.1f}x less than {baseline['backend']}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--invoices", type=int, default=100_000)
+    parser.add_argument("--lines", type=int, default=10)
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--json", action="store_true", help="print raw results as JSON")
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.invoices, args.lines, args.customers, args.items)))
+        return
+
+    results = run(args.invoices, args.lines, args.customers, args.items)
+    print(json.dumps(results, indent=2) if args.json else report(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,36 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     app_name: str = "Billing System API"
     version: str = "1.0.0"
+    max_bulk_rows: int = 100_000
+    page_size: int = 100
+    max_page_size: int = 1000
+    # Use orjson for list responses when it is installed
+    fast_json: bool = True
+    # "dict" keeps invoice models as-is; "columnar" packs them into typed
+    # arrays (far less memory per line item, models built on read)
+    storage_backend: str = "dict"
+    # Directory (a mounted volume in containers) for the write log and
+    # snapshots; empty keeps the store in memory only
+    data_dir: str = ""
+    # Seconds between fsyncs of the write log (0 fsyncs every write). Writes
+    # reach the OS at once, so only a host crash can lose this window
+    fsync_interval: float = 0.05
+    # Log records after which the log is compacted into a snapshot
+    snapshot_records: int = 100_000
+    # Memory for cached list response bodies (served while the collections
+    # they were read from are unchanged)
+    response_cache_bytes: int = 32 * 1024 * 1024
+    # How long a replayed Idempotency-Key is answered from memory, and how
+    # many keys are kept (older retries are still found in the store)
+    idempotency_ttl: float = 24 * 3600
+    idempotency_max_keys: int = 10_000
+    # Seconds between publishing each worker's metrics for /metrics to
+    # aggregate (only with data_dir, which workers share)
+    metrics_flush_interval: float = 5.0
+    # Server processes for app/serve.py; 0 starts one per CPU the container
+    # may use (its cgroup quota). More than one shares the store through
+    # the write log in data_dir
+    workers: int = 0
 
     class Config:
         env_file = ".env"
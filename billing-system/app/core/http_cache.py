@@ -0,0 +1,79 @@
+"""
+Conditional GETs and a response body cache for list endpoints.
+
+Every collection counts its writes (version). A list page only depends on
+the versions of the collections it reads, so those versions (with the
+store's id) form a strong ETag: a client sending it back in If-None-Match
+gets 304 without anything being looked up or serialized. Bodies that do get
+serialized are kept under (path, query), together with their ETag, until
+the memory budget is exceeded; an entry whose ETag is no longer current is
+never served and is dropped when next looked up.
+"""
+import threading
+from collections import OrderedDict
+from app.core.config import settings
+from app.core.metrics import response_cache_requests
+from app.storage import memory
+
+def etag(collections):
+    """Strong ETag for data that only changes when these collections are written"""
+    return '"' + "-".join([memory.store_id] + [str(collection.version) for collection in collections]) + '"'
+
+def etag_matches(header, tag):
+    """If-None-Match uses weak comparison: W/ prefixes are ignored"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == tag for candidate in header.split(","))
+
+class BodyCache:
+    """Serialized bodies by key, least recently used evicted past max_bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, tag):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != tag:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                response_cache_requests.inc(result="miss")
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            response_cache_requests.inc(result="hit")
+            return entry[1]
+
+    def put(self, key, tag, body):
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (tag, body)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+
+    def _remove(self, key):
+        _, body = self.entries.pop(key)
+        self.size -= len(body)
+
+    def status(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+body_cache = BodyCache(settings.response_cache_bytes)
@@ -0,0 +1,257 @@
+"""
+Prometheus metrics in the text exposition format.
+
+Counters and histograms are kept per process. When workers share a data
+directory, each one also writes its values to
+<data_dir>/metrics/<hostname>-<pid>.json every
+settings.metrics_flush_interval seconds, and /metrics adds the files of the
+other workers on the same host to its own live values, so a scrape answered
+by any worker covers the whole server. Replicas mount the same directory
+but each container has its own hostname (and pid namespace), so every
+container reports its own workers. A file not rewritten for STALE_INTERVALS
+intervals belongs to a worker or container that is gone: it is ignored and
+deleted. Gauges are read from the (replicated) store when scraped.
+"""
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+# Flush intervals after which a worker's file is considered abandoned
+STALE_INTERVALS = 3
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def state(self):
+        """JSON-able copy of the values, for merging across processes"""
+        with self.lock:
+            return [[list(key), value] for key, value in self.values.items()]
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def merge(self, totals, state):
+        for key, value in state:
+            totals[tuple(key)] = totals.get(tuple(key), 0) + value
+
+    def lines(self, totals):
+        for key, value in sorted(totals.items()):
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            # Per-bucket counts (not cumulative), then sum and count
+            counts = self.values.get(key)
+            if counts is None:
+                counts = self.values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[position] += 1
+                    break
+            counts[-2] += value
+            counts[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def state(self):
+        with self.lock:
+            return [[list(key), list(counts)] for key, counts in self.values.items()]
+
+    def merge(self, totals, state):
+        for key, counts in state:
+            current = totals.setdefault(tuple(key), [0] * len(counts))
+            for position, value in enumerate(counts):
+                current[position] += value
+
+    def lines(self, totals):
+        for key, counts in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _number(float(bound)))])} {cumulative}"
+            yield f"{self.name}_bucket{_labels(self.labelnames, key, [('le', '+Inf')])} {counts[-1]}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_number(counts[-2])}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {counts[-1]}"
+
+class Gauge(Metric):
+    """Read when scraped: collect() returns {label values tuple: value}"""
+    type = "gauge"
+
+    def __init__(self, name, help, labelnames=(), collect=None):
+        super().__init__(name, help, labelnames)
+        self.collect = collect
+
+    def state(self):
+        return []
+
+    def merge(self, totals, state):
+        pass
+
+    def lines(self, totals):
+        for key, value in sorted(self.collect().items()):
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.directory = None
+        self.host = None
+        self.interval = None
+        self.closing = threading.Event()
+        self.thread = None
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name, help, labelnames=(), collect=None):
+        return self.register(Gauge(name, help, labelnames, collect))
+
+    # ------------------------------------------------------------
+    # Sharing Between Workers
+    # ------------------------------------------------------------
+    def share(self, directory, interval):
+        """Publish this process's values under directory every interval seconds"""
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.host = socket.gethostname()
+        self.interval = interval
+        self.closing.clear()
+        self.thread = threading.Thread(target=self._flush_loop, args=(interval,), name="metrics-flush", daemon=True)
+        self.thread.start()
+
+    def _path(self):
+        return os.path.join(self.directory, f"{self.host}-{os.getpid()}.json")
+
+    def flush(self):
+        state = {name: metric.state() for name, metric in self.metrics.items()}
+        temp = self._path() + ".tmp"
+        with open(temp, "w") as f:
+            json.dump(state, f)
+        os.replace(temp, self._path())
+
+    def _flush_loop(self, interval):
+        while not self.closing.wait(interval):
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"metrics: flush failed: {e}")
+
+    def unshare(self):
+        """Stop publishing and withdraw this process's file"""
+        if self.directory is None:
+            return
+        self.closing.set()
+        self.thread.join()
+        try:
+            os.remove(self._path())
+        except FileNotFoundError:
+            pass
+        self.directory = None
+
+    def _other_states(self):
+        if self.directory is None:
+            return []
+        own = os.path.basename(self._path())
+        stale_before = time.time() - STALE_INTERVALS * self.interval
+        states = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json") or name == own:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < stale_before:
+                    # Its writer stopped flushing: exited, or its container was removed
+                    os.remove(path)
+                    continue
+                if name[:-len(".json")].rpartition("-")[0] != self.host:
+                    continue  # another replica's worker
+                with open(path) as f:
+                    states.append(json.load(f))
+            except (OSError, ValueError):
+                pass  # being replaced or removed right now
+        return states
+
+    # ------------------------------------------------------------
+    # Exposition
+    # ------------------------------------------------------------
+    def render(self):
+        others = self._other_states()
+        lines = []
+        for name, metric in self.metrics.items():
+            totals = {}
+            metric.merge(totals, metric.state())
+            for state in others:
+                metric.merge(totals, state.get(name, []))
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            lines.extend(metric.lines(totals))
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+request_seconds = registry.histogram(
+    "billing_http_request_duration_seconds", "Time to answer a request, by route", ("method", "route", "status")
+)
+pricing_seconds = registry.histogram(
+    "billing_pricing_duration_seconds", "Time spent pricing invoices, by operation", ("operation",)
+)
+priced_invoices = registry.counter("billing_priced_invoices_total", "Invoices priced, by operation", ("operation",))
+response_cache_requests = registry.counter(
+    "billing_response_cache_requests_total", "List page body cache lookups", ("result",)
+)
+idempotency_requests = registry.counter(
+    "billing_idempotency_requests_total", "Invoice requests with an Idempotency-Key", ("result",)
+)
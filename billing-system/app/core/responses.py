@@ -0,0 +1,174 @@
+import base64
+import json
+from datetime import datetime
+from uuid import UUID
+from fastapi import HTTPException
+from fastapi.responses import Response, StreamingResponse
+from app.core.config import settings
+from app.core.http_cache import body_cache, etag, etag_matches
+from app.core.metrics import response_cache_requests
+from app.storage.indexes import KeyRange
+from app.storage.memory import write_lock
+
+try:
+    import orjson
+except ImportError:  # optional fast path
+    orjson = None
+
+NDJSON_CHUNK_ROWS = 256
+
+def dumps(model):
+    """Serialize one model to JSON bytes, through orjson when available"""
+    if orjson is not None and settings.fast_json:
+        return orjson.dumps(model.model_dump())
+    return model.model_dump_json().encode()
+
+def cursor_after(ids, index):
+    """
+    Opaque cursor naming the row at ids[index] by sort key and id: its
+    (value, id) in an index range, else its position in creation order
+    """
+    if isinstance(ids, KeyRange):
+        value, key = ids.entry(index)
+        state = ["v", value.isoformat() if isinstance(value, datetime) else value, str(key)]
+    else:
+        state = ["p", index + 1, str(ids[index])]
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode()).rstrip(b"=").decode()
+
+def resume(ids, cursor):
+    """
+    Position in ids of the first row after the one cursor names. A range
+    ordered by value resumes after the cursor's (value, id) however rows
+    moved in or out before it; a creation-order list after the named row,
+    looked up if removals shifted it.
+    """
+    if cursor is None:
+        return 0
+    try:
+        kind, value, key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        key = UUID(key)
+        if kind == "v" and isinstance(ids, KeyRange):
+            return ids.position_after(datetime.fromisoformat(value) if isinstance(value, str) else float(value), key)
+        if kind != "p" or isinstance(ids, KeyRange):
+            raise ValueError(kind)
+        if int(value) < 0:
+            raise ValueError(value)
+        position = min(int(value), len(ids))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=422, detail="Invalid cursor")
+    if position and ids[position - 1] == key:
+        return position
+    try:
+        return ids.index(key) + 1
+    except (AttributeError, ValueError):
+        return position
+
+def read_page(ids, lookup, cursor, limit):
+    """
+    The records of the limit rows after cursor and the cursor after them
+    (None at the end). ids may be a callable: it is called, and the page
+    copied, under the write lock, so an index result cannot shift between
+    the two.
+    """
+    with write_lock.reading():
+        if callable(ids):
+            ids = ids()
+        start = resume(ids, cursor)
+        keys = ids[start:start + limit]
+        end = start + len(keys)
+        records = [lookup[key] for key in keys]
+        return records, cursor_after(ids, end - 1) if keys and end < len(ids) else None
+
+def page_body(ids, lookup, cursor, limit):
+    """
+    One page as {"items": [...], "next_cursor": cursor}, serialized without
+    building the whole list of dicts first
+    """
+    records, next_cursor = read_page(ids, lookup, cursor, limit)
+    tail = b"null" if next_cursor is None else b'"%s"' % next_cursor.encode()
+    return b'{"items":[' + b",".join(dumps(record) for record in records) + b'],"next_cursor":' + tail + b"}"
+
+def page_response(ids, lookup, cursor, limit):
+    return Response(content=page_body(ids, lookup, cursor, limit), media_type="application/json")
+
+def cached_page_response(request, collections, ids, lookup, cursor, limit):
+    """
+    page_response for a page that only changes when collections are written:
+    answered with 304 when the client already has it, otherwise from the
+    body cache when possible. ids may be a callable, only called on a miss.
+    """
+    # Taken before the page is read: a write landing meanwhile bumps the
+    # version past this tag, so the body is never served under it again
+    tag = etag(collections)
+    headers = {"ETag": tag}
+    if etag_matches(request.headers.get("if-none-match"), tag):
+        response_cache_requests.inc(result="not_modified")
+        return Response(status_code=304, headers=headers)
+    key = (request.url.path, request.url.query)
+    body = body_cache.get(key, tag)
+    if body is None:
+        body = page_body(ids, lookup, cursor, limit)
+        body_cache.put(key, tag, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _chunks(ids, lookup, start, end):
+    """
+    Serialized records of ids[start:end], a chunk at a time. Each chunk's
+    records are read under the write lock, so none is read half written.
+    """
+    for first in range(start, end, NDJSON_CHUNK_ROWS):
+        with write_lock.reading():
+            records = [lookup[key] for key in ids[first:min(first + NDJSON_CHUNK_ROWS, end)]]
+        yield [dumps(record) for record in records]
+
+def ndjson_response(ids, lookup, start, end):
+    """
+    Stream ids[start:end] as NDJSON, serializing lazily so memory stays flat
+    however large the collection is
+    """
+    def lines():
+        for chunk in _chunks(ids, lookup, start, end):
+            yield b"\n".join(chunk) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+def array_response(ids, lookup, start, end):
+    """ids[start:end] as one JSON array, streamed like ndjson_response"""
+    def body():
+        separator = b"["
+        for chunk in _chunks(ids, lookup, start, end):
+            yield separator + b",".join(chunk)
+            separator = b","
+        yield b"]" if separator == b"," else b"[]"
+
+    return StreamingResponse(body(), media_type="application/json")
+
+def list_response(ids, lookup, cursor, limit, format, request=None, depends_on=()):
+    """
+    A list endpoint's response. JSON without cursor or limit is the whole
+    list as a bare array, streamed; with either it is one page,
+    {"items": [...], "next_cursor": ...}, and pages of a request whose data
+    only changes with the collections in depends_on get ETags and caching.
+    NDJSON streams the rows after cursor (up to limit). Pass index query
+    results as a callable so they are read under the lock.
+    """
+    if format == "json" and (cursor is not None or limit is not None):
+        if request is not None and depends_on:
+            return cached_page_response(request, depends_on, ids, lookup, cursor, limit or settings.page_size)
+        return page_response(ids, lookup, cursor, limit or settings.page_size)
+
+    # Streamed: the end is fixed when the stream starts, so rows created
+    # meanwhile are not included
+    with write_lock.reading():
+        if callable(ids):
+            ids = ids()
+        start = resume(ids, cursor)
+        end = len(ids) if limit is None else min(len(ids), start + limit)
+        if ids is not getattr(lookup, "order", None):
+            # An index query's result (a range of sorted entries, a per
+            # customer list) shifts as invoices are written, unlike a
+            # collection's order, which only grows: copy the streamed ids
+            ids, start, end = ids[start:end], 0, end - start
+    if format == "ndjson":
+        return ndjson_response(ids, lookup, start, end)
+    return array_response(ids, lookup, start, end)
@@ -1,15 +1,86 @@
+import os
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from app.core.config import settings
-from app.routes import customers, items, invoices
+from app.core.metrics import registry, request_seconds
+from app.routes import customers, items, invoices, metrics, reports, storage
+from app.storage.memory import reads
+from app.storage.persistence import persistence
+
+@asynccontextmanager
+async def lifespan(app):
+    # Recover before serving, so /health only answers once the data is back
+    if settings.data_dir:
+        persistence.open()
+        registry.share(os.path.join(settings.data_dir, "metrics"), settings.metrics_flush_interval)
+    yield
+    registry.unshare()
+    persistence.close()
+
+class CatchUpMiddleware:
+    """
+    Apply writes other workers committed before handling a request, then
+    handle it inside the store's read gate (see memory.ReadGate)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        if persistence.behind():
+            await run_in_threadpool(persistence.catch_up)
+        if not reads.enter(blocking=False):
+            await run_in_threadpool(reads.enter)
+        token = reads.inside.set(True)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            reads.inside.reset(token)
+            reads.leave()
+
+class MetricsMiddleware:
+    """Observe every request's latency under its route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            request_seconds.observe(time.perf_counter() - started, method=scope["method"], route=route, status=status)
 
 app = FastAPI(
     title=settings.app_name,
-    version=settings.version
+    version=settings.version,
+    lifespan=lifespan
 )
+app.add_middleware(CatchUpMiddleware)
+# Added last so it runs outermost and times the catch-up too
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(customers.router)
 app.include_router(items.router)
 app.include_router(invoices.router)
+app.include_router(reports.router)
+app.include_router(storage.router)
+app.include_router(metrics.router)
 
 @app.get("/health")
 def health():
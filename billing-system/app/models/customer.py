@@ -5,3 +5,7 @@ class Customer(BaseModel):
     id: UUID
     name: str
     email: str
+
+class CustomerCreate(BaseModel):
+    name: str
+    email: str
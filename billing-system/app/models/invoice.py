@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from datetime import datetime, timezone
+from pydantic import BaseModel, Field
 from uuid import UUID
 from typing import List
 
@@ -11,3 +12,8 @@ class Invoice(BaseModel):
     customer_id: UUID
     items: List[InvoiceItem]
     total_amount: float
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class InvoiceCreate(BaseModel):
+    customer_id: UUID
+    items: List[InvoiceItem]
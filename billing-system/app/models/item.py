@@ -5,3 +5,7 @@ class Item(BaseModel):
     id: UUID
     name: str
     price: float
+
+class ItemCreate(BaseModel):
+    name: str
+    price: float
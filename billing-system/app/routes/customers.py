@@ -1,7 +1,12 @@
-from fastapi import APIRouter
-from uuid import uuid4
-from app.models.customer import Customer
-from app.storage.memory import customers
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
+from uuid import UUID, uuid4
+from app.core.config import settings
+from app.core.responses import list_response
+from app.models.customer import Customer, CustomerCreate
+from app.services.bulk_service import read_rows, validate_rows, raise_for_errors
+from app.storage.memory import customers, invoices, invoice_index, insert_many
 
 router = APIRouter(prefix="/customers", tags=["Customers"])
 
@@ -11,6 +16,46 @@ def create_customer(name: str, email: str):
     customers[customer.id] = customer
     return customer
 
+def import_customers(rows, errors):
+    drafts = validate_rows(CustomerCreate, rows, errors)
+    raise_for_errors(errors)
+    created = [Customer(id=uuid4(), **draft.model_dump()) for _, draft in drafts]
+    insert_many(customers, created)
+    return created
+
+@router.post("/bulk")
+async def create_customers_bulk(request: Request):
+    """Create customers from a JSON array or NDJSON stream of {name, email}; all or nothing"""
+    rows, errors = await read_rows(request)
+    return await run_in_threadpool(import_customers, rows, errors)
+
 @router.get("/")
-def list_customers():
-    return list(customers.values())
+def list_customers(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=settings.max_page_size),
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
+    """
+    Every customer in creation order as a JSON array (streamed), or a page
+    of them when cursor or limit is given (pass next_cursor back), or an
+    NDJSON stream. Pages carry an ETag; send it as If-None-Match to get 304
+    while nothing changed.
+    """
+    return list_response(customers.order, customers, cursor, limit, format, request, depends_on=(customers,))
+
+@router.get("/{customer_id}/invoices")
+def list_customer_invoices(
+    request: Request,
+    customer_id: UUID,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=settings.max_page_size),
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
+    """Invoices of this customer, in creation order, from the customer index"""
+    if customer_id not in customers:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    def ids():
+        return invoice_index.by_customer.get(customer_id, [])
+
+    return list_response(ids, invoices, cursor, limit, format, request, depends_on=(invoices,))
@@ -1,16 +1,96 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+import time
+from datetime import datetime, timezone
 from uuid import UUID
-from typing import List
-from app.models.invoice import InvoiceItem
-from app.services.billing_service import create_invoice
-from app.storage.memory import invoices
+from typing import List, Optional
+from app.core.config import settings
+from app.core.responses import list_response
+from app.models.invoice import InvoiceCreate, InvoiceItem
+from app.services.billing_service import (
+    UnknownCustomerError, create_invoice, create_invoice_once, create_invoices, reprice_invoices
+)
+from app.services.idempotency import IdempotencyKeyReused, invoice_id_for, invoice_requests, request_hash
+from app.services.pricing import UnknownItemError
+from app.services.bulk_service import read_rows, validate_rows, raise_for_errors
+from app.storage.memory import invoices, invoice_index
 
 router = APIRouter(prefix="/invoices", tags=["Invoices"])
 
 @router.post("/")
-def generate_invoice(customer_id: UUID, items: List[InvoiceItem]):
-    return create_invoice(customer_id, items)
+def generate_invoice(
+    customer_id: UUID,
+    items: List[InvoiceItem],
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=255)
+):
+    """
+    Create and price one invoice. Requests sent again with the same
+    Idempotency-Key return the first invoice (Idempotent-Replayed: true)
+    instead of creating another; reusing a key for a different request is
+    rejected with 422, as are unknown customers and items.
+    """
+    try:
+        if idempotency_key is None:
+            return create_invoice(customer_id, items)
+        (invoice, created), cached = invoice_requests.run(
+            (idempotency_key, request_hash(customer_id, items)),
+            lambda: create_invoice_once(idempotency_key, invoice_id_for(idempotency_key), customer_id, items)
+        )
+    except (UnknownCustomerError, UnknownItemError, IdempotencyKeyReused) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if cached or not created:
+        response.headers["Idempotent-Replayed"] = "true"
+    return invoice
+
+def import_invoices(rows, errors):
+    drafts = validate_rows(InvoiceCreate, rows, errors)
+    created = create_invoices(drafts, errors)
+    raise_for_errors(errors)
+    return created
+
+@router.post("/bulk")
+async def generate_invoices_bulk(request: Request):
+    """
+    Generate invoices from a JSON array or NDJSON stream of
+    {customer_id, items: [{item_id, quantity}]}, priced as one batch; all or nothing
+    """
+    rows, errors = await read_rows(request)
+    return await run_in_threadpool(import_invoices, rows, errors)
+
+def _utc(moment):
+    return moment.replace(tzinfo=timezone.utc) if moment is not None and moment.tzinfo is None else moment
+
+@router.post("/reprice")
+def reprice_all_invoices():
+    """Re-price every stored invoice from the current item prices in vectorized batches"""
+    started = time.perf_counter()
+    priced, changed = reprice_invoices()
+    return {"invoices": priced, "changed": changed, "seconds": round(time.perf_counter() - started, 3)}
 
 @router.get("/")
-def list_invoices():
-    return list(invoices.values())
+def list_invoices(
+    request: Request,
+    customer_id: Optional[UUID] = None,
+    item_id: Optional[UUID] = None,
+    min_total: Optional[float] = None,
+    max_total: Optional[float] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=settings.max_page_size),
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
+    """
+    Invoices as a JSON array (streamed), or a page of them when cursor or
+    limit is given (pass next_cursor back), or an NDJSON stream. Filters are
+    answered from the secondary indexes, in the narrowest one's order: by
+    total or date for a range, otherwise creation order.
+    """
+    def ids():
+        matching = invoice_index.query(
+            customer_id, item_id, min_total, max_total, _utc(created_from), _utc(created_to), lookup=invoices
+        )
+        return invoices.order if matching is None else matching
+
+    return list_response(ids, invoices, cursor, limit, format, request, depends_on=(invoices,))
@@ -1,7 +1,12 @@
-from fastapi import APIRouter
-from uuid import uuid4
-from app.models.item import Item
-from app.storage.memory import items
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
+from uuid import UUID, uuid4
+from app.core.config import settings
+from app.core.responses import list_response
+from app.models.item import Item, ItemCreate
+from app.services.bulk_service import read_rows, validate_rows, raise_for_errors
+from app.storage.memory import items, invoices, invoice_index, insert_many
 
 router = APIRouter(prefix="/items", tags=["Items"])
 
@@ -11,7 +16,55 @@ def create_item(name: str, price: float):
     items[item.id] = item
     return item
 
+@router.patch("/{item_id}")
+def update_item_price(item_id: UUID, price: float):
+    """Change an item's price; stored invoices keep their totals until re-priced"""
+    item = items.get(item_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    items[item_id] = item.model_copy(update={"price": price})
+    return items[item_id]
+
+def import_items(rows, errors):
+    drafts = validate_rows(ItemCreate, rows, errors)
+    raise_for_errors(errors)
+    created = [Item(id=uuid4(), **draft.model_dump()) for _, draft in drafts]
+    insert_many(items, created)
+    return created
+
+@router.post("/bulk")
+async def create_items_bulk(request: Request):
+    """Create items from a JSON array or NDJSON stream of {name, price}; all or nothing"""
+    rows, errors = await read_rows(request)
+    return await run_in_threadpool(import_items, rows, errors)
+
 @router.get("/")
-def list_items():
-    return list(items.values())
+def list_items(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=settings.max_page_size),
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
+    """
+    Every item in creation order as a JSON array (streamed), or a page of
+    them when cursor or limit is given (pass next_cursor back), or an NDJSON
+    stream. Pages carry an ETag; send it as If-None-Match to get 304 while
+    nothing changed.
+    """
+    return list_response(items.order, items, cursor, limit, format, request, depends_on=(items,))
+
+@router.get("/{item_id}/invoices")
+def list_item_invoices(
+    request: Request,
+    item_id: UUID,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=settings.max_page_size),
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
+    """Invoices containing this item, in creation order, from the item index"""
+    if item_id not in items:
+        raise HTTPException(status_code=404, detail="Item not found")
+    def ids():
+        return invoice_index.by_item.get(item_id, [])
 
+    return list_response(ids, invoices, cursor, limit, format, request, depends_on=(invoices,))
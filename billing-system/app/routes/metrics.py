@@ -0,0 +1,39 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from app.core.http_cache import body_cache
+from app.core.metrics import registry
+from app.services.idempotency import invoice_requests
+from app.storage.memory import customers, items, invoices, invoice_index
+from app.storage.persistence import persistence
+
+router = APIRouter(tags=["Metrics"])
+
+registry.gauge(
+    "billing_store_entities", "Entities held in the store, by collection", ("collection",),
+    lambda: {("customers",): len(customers), ("items",): len(items), ("invoices",): len(invoices)}
+)
+registry.gauge(
+    "billing_store_version", "Writes applied to each collection", ("collection",),
+    lambda: {("customers",): customers.version, ("items",): items.version, ("invoices",): invoices.version}
+)
+registry.gauge(
+    "billing_index_keys", "Distinct keys in the invoice indexes", ("index",),
+    lambda: {("customer",): len(invoice_index.by_customer), ("item",): len(invoice_index.by_item)}
+)
+registry.gauge(
+    "billing_log_records_since_snapshot", "Write log records not yet compacted into a snapshot", (),
+    lambda: {(): persistence.records} if persistence.enabled else {}
+)
+registry.gauge(
+    "billing_response_cache_bytes", "Bytes of cached list page bodies", (),
+    lambda: {(): body_cache.size}
+)
+registry.gauge(
+    "billing_idempotency_keys", "Idempotency keys remembered in memory", (),
+    lambda: {(): len(invoice_requests.entries)}
+)
+
+@router.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus text exposition of every worker's metrics"""
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,36 @@
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from uuid import UUID
+from app.storage.memory import invoices, rollups, write_lock
+
+router = APIRouter(prefix="/reports", tags=["Reports"])
+
+@router.get("/totals")
+def report_totals():
+    """Invoice count, revenue and units sold across all invoices"""
+    return rollups.total()
+
+@router.get("/customers/{customer_id}")
+def report_customer(customer_id: UUID):
+    """Invoice count and revenue for one customer"""
+    return {"customer_id": customer_id, **rollups.customer(customer_id)}
+
+@router.get("/items/{item_id}")
+def report_item(item_id: UUID):
+    """Invoices containing the item and units sold"""
+    return {"item_id": item_id, **rollups.item(item_id)}
+
+def verify_rollups(repair):
+    with write_lock:
+        mismatches, rebuilt = rollups.verify(invoices.values())
+        if mismatches and repair:
+            rollups.replace(rebuilt)
+    return {"consistent": not mismatches, "repaired": bool(mismatches and repair), "mismatches": mismatches}
+
+@router.post("/verify")
+async def verify_reports(repair: bool = False):
+    """
+    Rebuild the rollups from every invoice and compare; with repair=true the
+    rebuilt values replace the maintained ones when they differ
+    """
+    return await run_in_threadpool(verify_rollups, repair)
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from app.storage.persistence import persistence
+
+router = APIRouter(prefix="/storage", tags=["Storage"])
+
+@router.get("/")
+def storage_status():
+    """Write log position, last snapshot and how the last startup recovered"""
+    return persistence.status()
+
+@router.post("/snapshot")
+async def take_snapshot():
+    """Compact the write log into a snapshot now"""
+    if not persistence.enabled:
+        raise HTTPException(status_code=409, detail="Persistence is disabled (set DATA_DIR)")
+    return await run_in_threadpool(persistence.snapshot, True)
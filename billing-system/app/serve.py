@@ -0,0 +1,63 @@
+"""
+Start the API with one uvicorn worker per CPU the container may use.
+
+    python -m app.serve --host 0.0.0.0 --port 8000 [--workers N]
+
+The app is CPU-bound in one process, so more cores only help through more
+processes. Workers share the store through the write log in DATA_DIR (see
+storage/persistence.py); without DATA_DIR a scratch directory in shared
+memory is used, which keeps the state in memory but common to all workers.
+"""
+import argparse
+import math
+import os
+import tempfile
+import uvicorn
+from app.core.config import settings
+
+def cpu_limit():
+    """CPUs this process may use: the cgroup CPU quota, capped by its affinity"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS / Windows
+        cpus = os.cpu_count() or 1
+    quota = None
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            limit, period = f.read().split()
+        if limit != "max":
+            quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1: a quota of -1 means unlimited
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                limit = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(cpus, 1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=settings.workers,
+                        help="server processes (default: one per available CPU)")
+    args = parser.parse_args()
+    workers = args.workers or cpu_limit()
+
+    if workers > 1 and not settings.data_dir:
+        # Workers are separate processes: give them a common log to share
+        scratch = tempfile.TemporaryDirectory(prefix="billing-", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+        os.environ["DATA_DIR"] = scratch.name
+    print(f"Starting {workers} worker(s) on {args.host}:{args.port}")
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=workers)
+
+if __name__ == "__main__":
+    main()
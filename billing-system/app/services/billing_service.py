@@ -1,21 +1,123 @@
 from uuid import uuid4
-from app.storage.memory import customers, items, invoices
+import numpy as np
+from app.storage.columnar import ColumnarInvoices
+from app.storage.memory import customers, items, invoices, insert_many, write_lock
 from app.models.invoice import Invoice
+from app.services.idempotency import IdempotencyKeyReused
+from app.services.pricing import catalog, price_batch, price_lines
+
+# Invoices re-priced per vectorized batch
+REPRICE_BATCH_SIZE = 50_000
+
+class UnknownCustomerError(ValueError):
+    """Raised when an invoice names a customer that is not in the store"""
+
+    def __init__(self, customer_id):
+        self.customer_id = customer_id
+        super().__init__(f"Unknown customer_id: {customer_id}")
 
 def calculate_total(invoice_items):
-    total = 0
-    for i in invoice_items:
-        item = items.get(i.item_id)
-        total += item.price * i.quantity
-    return total
+    return price_lines(invoice_items)
+
+def check_customer(customer_id):
+    if customer_id not in customers:
+        raise UnknownCustomerError(customer_id)
 
 def create_invoice(customer_id, invoice_items):
-    total = calculate_total(invoice_items)
-    invoice = Invoice(
-        id=uuid4(),
-        customer_id=customer_id,
-        items=invoice_items,
-        total_amount=total
-    )
-    invoices[invoice.id] = invoice
+    # Checked, priced and stored under the store lock, so the customer and
+    # every price are read from the same state
+    with write_lock:
+        check_customer(customer_id)
+        invoice = Invoice(
+            id=uuid4(),
+            customer_id=customer_id,
+            items=invoice_items,
+            total_amount=calculate_total(invoice_items)
+        )
+        invoices[invoice.id] = invoice
     return invoice
+
+def create_invoice_once(key, invoice_id, customer_id, invoice_items):
+    """
+    create_invoice under an id derived from an idempotency key. If any
+    worker already stored that invoice it is returned as is (not re-priced).
+    Returns (invoice, created).
+    """
+    with write_lock:
+        existing = invoices.get(invoice_id)
+        if existing is not None:
+            if existing.customer_id != customer_id or _lines(existing.items) != _lines(invoice_items):
+                raise IdempotencyKeyReused(key)
+            return existing, False
+        check_customer(customer_id)
+        invoice = Invoice(
+            id=invoice_id,
+            customer_id=customer_id,
+            items=invoice_items,
+            total_amount=calculate_total(invoice_items)
+        )
+        invoices[invoice.id] = invoice
+    return invoice, True
+
+def _lines(invoice_items):
+    return [(line.item_id, line.quantity) for line in invoice_items]
+
+def check_references(drafts, errors):
+    """Record a row error for every draft naming an unknown customer or item"""
+    for row, draft in drafts:
+        if draft.customer_id not in customers:
+            errors.add(row, f"customer_id: unknown customer {draft.customer_id}")
+        for position, line in enumerate(draft.items):
+            if line.item_id not in items:
+                errors.add(row, f"items.{position}.item_id: unknown item {line.item_id}")
+
+def calculate_totals(drafts):
+    """Price a batch of invoices in one vectorized pass over the price catalog"""
+    return price_batch(drafts)
+
+def create_invoices(drafts, errors):
+    """
+    Validate references, price and store a batch of invoice drafts as one
+    unit: if any row has an error nothing is stored and [] is returned.
+    """
+    with write_lock:
+        check_references(drafts, errors)
+        if errors:
+            return []
+        batch = [draft for _, draft in drafts]
+        created = [
+            Invoice(id=uuid4(), customer_id=draft.customer_id, items=draft.items, total_amount=total)
+            for draft, total in zip(batch, calculate_totals(batch))
+        ]
+        insert_many(invoices, created)
+    return created
+
+def reprice_invoices():
+    """
+    Recompute every stored invoice's total from current prices. Only
+    invoices whose total changes are rewritten (keeping indexes and rollups
+    in step). Returns (invoices priced, invoices changed).
+    """
+    if isinstance(invoices, ColumnarInvoices):
+        return _reprice_columnar()
+    changed = 0
+    with write_lock:
+        stored = list(invoices.values())
+        for start in range(0, len(stored), REPRICE_BATCH_SIZE):
+            batch = stored[start:start + REPRICE_BATCH_SIZE]
+            for invoice, total in zip(batch, price_batch(batch)):
+                if total != invoice.total_amount:
+                    invoices[invoice.id] = invoice.model_copy(update={"total_amount": total})
+                    changed += 1
+    return len(stored), changed
+
+def _reprice_columnar():
+    """Re-price straight from the line arrays; only changed rows become models"""
+    with write_lock:
+        totals = catalog().column_totals(invoices) / 100
+        current = np.frombuffer(invoices.totals, dtype=np.float64).copy()
+        changed = np.flatnonzero(totals != current)
+        for row in changed:
+            invoice = invoices.materialize(int(row))
+            invoices[invoice.id] = invoice.model_copy(update={"total_amount": float(totals[row])})
+    return len(current), len(changed)
@@ -0,0 +1,84 @@
+import json
+from fastapi import HTTPException
+from pydantic import ValidationError
+from app.core.config import settings
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+class RowErrors(dict):
+    """Row index -> list of error messages"""
+
+    def add(self, row, message):
+        self.setdefault(row, []).append(message)
+
+    def report(self):
+        return [{"row": row, "errors": self[row]} for row in sorted(self)]
+
+def _check_size(count):
+    if count > settings.max_bulk_rows:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Bulk requests are limited to {settings.max_bulk_rows} rows"
+        )
+
+async def read_rows(request):
+    """
+    Read a bulk request body: a JSON array, or one JSON document per line
+    when sent as NDJSON (parsed while it streams in). Lines that are not
+    valid JSON are recorded as row errors instead of failing the request.
+    """
+    rows = []
+    errors = RowErrors()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+
+    if content_type in NDJSON_TYPES:
+        pending = b""
+
+        def parse(line):
+            if not line.strip():
+                return
+            _check_size(len(rows) + 1)
+            try:
+                rows.append(json.loads(line))
+            except ValueError as e:
+                errors.add(len(rows), f"invalid JSON: {e}")
+                rows.append(None)
+
+        async for chunk in request.stream():
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                parse(line)
+        parse(pending)
+        return rows, errors
+
+    try:
+        rows = json.loads(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Request body is not valid JSON: {e}")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array or an NDJSON stream")
+    _check_size(len(rows))
+    return rows, errors
+
+def validate_rows(model, rows, errors):
+    """Validate every row against model; returns [(row, instance)] for the valid ones"""
+    valid = []
+    for row, data in enumerate(rows):
+        if row in errors:
+            continue
+        try:
+            valid.append((row, model.model_validate(data)))
+        except ValidationError as e:
+            for error in e.errors():
+                location = ".".join(str(part) for part in error["loc"])
+                errors.add(row, f"{location}: {error['msg']}" if location else error["msg"])
+    return valid
+
+def raise_for_errors(errors):
+    if errors:
+        raise HTTPException(
+            status_code=422,
+            detail={"message": f"{len(errors)} rows failed validation, nothing was created",
+                    "rows": errors.report()}
+        )
@@ -0,0 +1,119 @@
+"""
+Idempotency-Key support for invoice creation.
+
+A retried POST carrying the same Idempotency-Key must not create a second
+invoice or price it again. Two layers make sure of that:
+
+- IdempotencyCache keeps the first result per (key, request hash) for
+  settings.idempotency_ttl seconds, at most settings.idempotency_max_keys
+  entries (least recently used evicted first). A duplicate that arrives
+  while the first request is still running waits for it and shares its
+  result instead of running alongside it.
+- The invoice id is derived from the key (invoice_id_for), so a retry that
+  reaches another worker, or arrives after its cache entry expired, finds
+  the stored invoice rather than creating a new one.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from uuid import UUID, uuid5
+from app.core.config import settings
+from app.core.metrics import idempotency_requests
+
+# Namespace of invoice ids derived from idempotency keys
+INVOICE_NAMESPACE = UUID("5d3b7a0e-7f0c-4c8e-9a52-1f4f3c2b9e61")
+
+class IdempotencyKeyReused(ValueError):
+    """Raised when a key is sent again with a different request"""
+
+    def __init__(self, key):
+        self.key = key
+        super().__init__(f"Idempotency-Key {key!r} was already used for a different request")
+
+def invoice_id_for(key):
+    return uuid5(INVOICE_NAMESPACE, key)
+
+def request_hash(customer_id, invoice_items):
+    """Hash of what an invoice request asks for, independent of field order"""
+    canonical = json.dumps([str(customer_id), [[str(line.item_id), line.quantity] for line in invoice_items]])
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+class _Entry:
+    __slots__ = ("done", "result", "failed", "expires")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+        self.expires = None
+
+class IdempotencyCache:
+    """First results by key with a TTL and LRU bound; duplicates in flight wait for the first"""
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def run(self, key, compute):
+        """
+        compute() once for key: returns (result, replayed). If the first
+        attempt raises, nothing is kept and waiting duplicates try themselves.
+        """
+        while True:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is not None and entry.expires is not None and entry.expires < time.monotonic():
+                    del self.entries[key]
+                    entry = None
+                if entry is None:
+                    entry = self.entries[key] = _Entry()
+                    self.misses += 1
+                    idempotency_requests.inc(result="miss")
+                    self._evict()
+                    break
+                self.entries.move_to_end(key)
+                if entry.done.is_set():
+                    self.hits += 1
+                    idempotency_requests.inc(result="hit")
+                else:
+                    self.coalesced += 1
+                    idempotency_requests.inc(result="coalesced")
+            entry.done.wait()
+            if not entry.failed:
+                return entry.result, True
+
+        try:
+            entry.result = compute()
+        except BaseException:
+            entry.failed = True
+            with self.lock:
+                if self.entries.get(key) is entry:
+                    del self.entries[key]
+            raise
+        finally:
+            entry.expires = time.monotonic() + self.ttl
+            entry.done.set()
+        return entry.result, False
+
+    def _evict(self):
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def status(self):
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
+
+invoice_requests = IdempotencyCache(settings.idempotency_ttl, settings.idempotency_max_keys)
@@ -0,0 +1,144 @@
+"""
+Vectorized invoice pricing.
+
+Prices are converted once to integer cents (rounded half-up from their
+decimal representation) and held in a NumPy array indexed by a dense item
+position. A batch of invoices is flattened into line arrays, line amounts
+are computed as cents * quantity in int64, and per-invoice totals are taken
+as differences of a cumulative sum, so every total is exact and only
+converted to a float amount at the end.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+import numpy as np
+from app.core.metrics import priced_invoices, pricing_seconds
+from app.storage.memory import items, reload_listeners, write_lock
+
+CENT = Decimal("0.01")
+
+class UnknownItemError(ValueError):
+    """Raised when invoice lines reference items that are not in the catalog"""
+
+    def __init__(self, unknown):
+        # unknown: {invoice position: [item_id, ...]}
+        self.unknown = unknown
+        item_ids = sorted({str(item_id) for ids in unknown.values() for item_id in ids})
+        super().__init__(f"Unknown item_id: {', '.join(item_ids)}")
+
+def to_cents(price):
+    return int(Decimal(str(price)).quantize(CENT, rounding=ROUND_HALF_UP) * 100)
+
+def from_cents(cents):
+    return int(cents) / 100
+
+def price_lines(invoice_items):
+    """
+    Exact total of one invoice's lines, without building a catalog
+    snapshot. Prices are read under the store's write lock, so a concurrent
+    price change cannot leave the total mixing old and new prices.
+    """
+    with pricing_seconds.time(operation="single"), write_lock:
+        unknown = [line.item_id for line in invoice_items if line.item_id not in items]
+        if unknown:
+            raise UnknownItemError({0: unknown})
+        total = from_cents(sum(to_cents(items[line.item_id].price) * line.quantity for line in invoice_items))
+    priced_invoices.inc(operation="single")
+    return total
+
+class PriceCatalog:
+    """Snapshot of item prices: dense position per item_id and a cents array"""
+
+    def __init__(self, catalog):
+        self.position = {}
+        cents = []
+        for item_id, item in catalog.items():
+            self.position[item_id] = len(cents)
+            cents.append(to_cents(item.price))
+        self.cents = np.array(cents, dtype=np.int64)
+
+    def totals(self, batch):
+        """
+        Totals in cents for a batch of invoices (anything with .items lines).
+        Raises UnknownItemError listing every offending invoice.
+        """
+        if not batch:
+            return np.zeros(0, dtype=np.int64)
+        with pricing_seconds.time(operation="batch"):
+            totals = self._totals(batch)
+        priced_invoices.inc(len(batch), operation="batch")
+        return totals
+
+    def _totals(self, batch):
+        lookup = self.position.get
+        positions = []
+        quantities = []
+        ends = np.empty(len(batch), dtype=np.int64)
+        unknown = {}
+        for index, invoice in enumerate(batch):
+            for line in invoice.items:
+                position = lookup(line.item_id)
+                if position is None:
+                    unknown.setdefault(index, []).append(line.item_id)
+                    position = 0
+                positions.append(position)
+                quantities.append(line.quantity)
+            ends[index] = len(positions)
+        if unknown:
+            raise UnknownItemError(unknown)
+
+        amounts = self.cents[np.array(positions, dtype=np.int64)] * np.array(quantities, dtype=np.int64)
+        running = np.concatenate(([0], np.cumsum(amounts, dtype=np.int64)))
+        starts = np.concatenate(([0], ends[:-1]))
+        return running[ends] - running[starts]
+
+    def column_totals(self, store):
+        """
+        Totals in cents for every row of a ColumnarInvoices store, computed
+        from its line arrays without materializing any invoice
+        """
+        with pricing_seconds.time(operation="columns"):
+            totals = self._column_totals(store)
+        priced_invoices.inc(len(totals), operation="columns")
+        return totals
+
+    def _column_totals(self, store):
+        positions = np.array([self.position.get(key, -1) for key in store.item_ids.keys], dtype=np.int64)
+        unknown = [key for key, position in zip(store.item_ids.keys, positions) if position < 0]
+        if unknown:
+            raise UnknownItemError({-1: unknown})
+
+        # Copies, so the arrays are not locked against growing afterwards
+        refs = np.frombuffer(store.line_items, dtype=np.uint32).copy()
+        quantities = np.frombuffer(store.line_quantities, dtype=np.int64).copy()
+        starts = np.frombuffer(store.line_start, dtype=np.uint64).astype(np.int64)
+        counts = np.frombuffer(store.line_count, dtype=np.uint32).astype(np.int64)
+
+        amounts = self.cents[positions[refs]] * quantities if len(refs) else np.zeros(0, dtype=np.int64)
+        running = np.concatenate(([0], np.cumsum(amounts, dtype=np.int64)))
+        return running[starts + counts] - running[starts]
+
+_catalog = None
+
+def _invalidate(old, new):
+    global _catalog
+    if old is None or old.price != new.price:
+        _catalog = None
+
+def _invalidate_all():
+    global _catalog
+    _catalog = None
+
+items.listeners.append(_invalidate)
+reload_listeners.append(_invalidate_all)
+
+def catalog():
+    """The current price snapshot, rebuilt only after an item or price changes"""
+    global _catalog
+    # Built under the store's write lock so no item can change mid-snapshot
+    with write_lock:
+        if _catalog is None:
+            _catalog = PriceCatalog(items)
+        return _catalog
+
+def price_batch(batch):
+    """Float totals for a batch of invoices, exact to the cent"""
+    return [from_cents(cents) for cents in catalog().totals(batch)]
@@ -0,0 +1,253 @@
+"""
+Array-backed invoice storage.
+
+ColumnarInvoices behaves like the Collection of invoices in memory.py
+(mapping of id -> Invoice, an `order` sequence for cursors, write listeners,
+a write version) but keeps no model objects: each invoice is one row across
+typed arrays, ids are packed as 16 raw bytes, customer and item ids are
+interned to 4-byte references, and line items live in contiguous arrays
+addressed by (start, count). Invoice models are only constructed when a row
+is read.
+"""
+from array import array
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+import numpy as np
+from app.models.invoice import Invoice, InvoiceItem
+
+# Names of the columns() copies, as stored in snapshots
+COLUMNS = (
+    "ids", "customer_keys", "customer_refs", "totals", "created",
+    "line_start", "line_count", "item_keys", "line_items", "line_quantities",
+)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+class Interner:
+    """Maps each distinct key to a dense position"""
+
+    __slots__ = ("keys", "index")
+
+    def __init__(self):
+        self.keys = []
+        self.index = {}
+
+    def add(self, key):
+        position = self.index.get(key)
+        if position is None:
+            position = self.index[key] = len(self.keys)
+            self.keys.append(key)
+        return position
+
+class IdView:
+    """Row-ordered sequence of ids decoded from packed 16-byte values"""
+
+    __slots__ = ("packed",)
+
+    def __init__(self, packed):
+        self.packed = packed
+
+    def __len__(self):
+        return len(self.packed) // 16
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return UUID(bytes=bytes(self.packed[16 * index:16 * index + 16]))
+
+def _micros(moment):
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return (moment - EPOCH) // MICROSECOND
+
+class ColumnarInvoices:
+    def __init__(self, lock):
+        self.lock = lock
+        self.listeners = []
+        self.version = 0
+        self.rows = {}
+        self.ids = bytearray()
+        self.order = IdView(self.ids)
+        self.customer_ids = Interner()
+        self.customer_refs = array("I")
+        self.totals = array("d")
+        self.created = array("q")
+        self.line_start = array("Q")
+        self.line_count = array("I")
+        self.item_ids = Interner()
+        self.line_items = array("I")
+        self.line_quantities = array("q")
+
+    # ------------------------------------------------------------
+    # Rows
+    # ------------------------------------------------------------
+    def materialize(self, row):
+        start = self.line_start[row]
+        item_keys = self.item_ids.keys
+        lines = [
+            InvoiceItem.model_construct(item_id=item_keys[self.line_items[position]], quantity=self.line_quantities[position])
+            for position in range(start, start + self.line_count[row])
+        ]
+        return Invoice.model_construct(
+            id=UUID(bytes=bytes(self.ids[16 * row:16 * row + 16])),
+            customer_id=self.customer_ids.keys[self.customer_refs[row]],
+            items=lines,
+            total_amount=self.totals[row],
+            created_at=EPOCH + self.created[row] * MICROSECOND,
+        )
+
+    def line_rows(self):
+        """Row, item reference and quantity arrays for every live line, in row order"""
+        counts = np.frombuffer(self.line_count, dtype=np.uint32).astype(np.int64)
+        positions = _line_positions(np.frombuffer(self.line_start, dtype=np.uint64).astype(np.int64), counts)
+        return (
+            np.repeat(np.arange(len(counts)), counts),
+            np.frombuffer(self.line_items, dtype=np.uint32)[positions],
+            np.frombuffer(self.line_quantities, dtype=np.int64)[positions],
+        )
+
+    def item_rows(self):
+        """Distinct (item reference, row) pairs, sorted by item then row"""
+        line_rows, line_items, _ = self.line_rows()
+        count = max(len(self), 1)
+        pairs = line_items.astype(np.int64) * count + line_rows
+        pairs.sort()
+        pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))] if len(pairs) else pairs
+        return pairs // count, pairs % count
+
+    def id_order(self, values):
+        """Row positions sorted by (value, id), the order SortedIndex keeps"""
+        halves = np.frombuffer(self.ids, dtype=">u8").reshape(-1, 2)
+        return np.lexsort((halves[:, 1], halves[:, 0], values))
+
+    def _write_lines(self, row, lines, reuse):
+        if reuse:
+            # Same number of lines: overwrite them in place
+            position = self.line_start[row]
+            for line in lines:
+                self.line_items[position] = self.item_ids.add(line.item_id)
+                self.line_quantities[position] = line.quantity
+                position += 1
+            return
+        # Otherwise append; the old lines are left unreferenced
+        self.line_start[row] = len(self.line_items)
+        self.line_count[row] = len(lines)
+        self.line_items.extend(self.item_ids.add(line.item_id) for line in lines)
+        self.line_quantities.extend(line.quantity for line in lines)
+
+    def __setitem__(self, key, invoice):
+        with self.lock:
+            row = self.rows.get(key.int)
+            old = None
+            if row is None:
+                row = self.rows[key.int] = len(self.totals)
+                self.ids += key.bytes
+                self.customer_refs.append(0)
+                self.totals.append(0.0)
+                self.created.append(0)
+                self.line_start.append(0)
+                self.line_count.append(0)
+            else:
+                old = self.materialize(row)
+
+            self._write_lines(row, invoice.items, old is not None and len(invoice.items) == self.line_count[row])
+            self.customer_refs[row] = self.customer_ids.add(invoice.customer_id)
+            self.totals[row] = invoice.total_amount
+            self.created[row] = _micros(invoice.created_at)
+            self.version += 1
+            for listener in self.listeners:
+                listener(old, invoice)
+
+    # ------------------------------------------------------------
+    # Bulk Load / Copy
+    # ------------------------------------------------------------
+    def columns(self):
+        """Copies of every column (interned keys as 16-byte ids), taken under the lock"""
+        with self.lock:
+            return {
+                "ids": bytes(self.ids),
+                "customer_keys": b"".join(key.bytes for key in self.customer_ids.keys),
+                "customer_refs": self.customer_refs[:],
+                "totals": self.totals[:],
+                "created": self.created[:],
+                "line_start": self.line_start[:],
+                "line_count": self.line_count[:],
+                "item_keys": b"".join(key.bytes for key in self.item_ids.keys),
+                "line_items": self.line_items[:],
+                "line_quantities": self.line_quantities[:],
+            }
+
+    def load(self, columns):
+        """
+        Replace the contents with columns shaped like columns() returns
+        (any bytes-like values). Listeners are not called.
+        """
+        with self.lock:
+            self.ids[:] = columns["ids"]
+            self.rows = {
+                int.from_bytes(self.ids[offset:offset + 16], "big"): row
+                for row, offset in enumerate(range(0, len(self.ids), 16))
+            }
+            for interner, keys in ((self.customer_ids, columns["customer_keys"]), (self.item_ids, columns["item_keys"])):
+                interner.keys = [UUID(bytes=bytes(keys[offset:offset + 16])) for offset in range(0, len(keys), 16)]
+                interner.index = {key: position for position, key in enumerate(interner.keys)}
+            for name in ("customer_refs", "totals", "created", "line_start", "line_count", "line_items", "line_quantities"):
+                column = getattr(self, name)
+                del column[:]
+                column.frombytes(columns[name])
+
+    # ------------------------------------------------------------
+    # Mapping Interface
+    # ------------------------------------------------------------
+    def __getitem__(self, key):
+        row = self.rows.get(key.int)
+        if row is None:
+            raise KeyError(key)
+        return self.materialize(row)
+
+    def get(self, key, default=None):
+        row = self.rows.get(key.int)
+        return default if row is None else self.materialize(row)
+
+    def __contains__(self, key):
+        return isinstance(key, UUID) and key.int in self.rows
+
+    def __len__(self):
+        return len(self.totals)
+
+    def __iter__(self):
+        return iter(self.order[0:len(self.order)])
+
+    def keys(self):
+        return iter(self)
+
+    def values(self):
+        return (self.materialize(row) for row in range(len(self.totals)))
+
+    def items(self):
+        return ((invoice.id, invoice) for invoice in self.values())
+
+def _line_positions(starts, counts):
+    """Line array positions of every row's lines, concatenated in row order"""
+    return np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(int(counts.sum()))
+
+def compact(columns):
+    """
+    Drop line items no row references any more (left behind when an invoice
+    is rewritten with a different number of lines) from columns() output
+    """
+    counts = np.frombuffer(columns["line_count"], dtype=np.uint32).astype(np.int64)
+    total = int(counts.sum())
+    if total == len(columns["line_items"]):
+        return columns
+    positions = _line_positions(np.frombuffer(columns["line_start"], dtype=np.uint64).astype(np.int64), counts)
+    packed_starts = np.cumsum(counts) - counts
+    return dict(
+        columns,
+        line_start=array("Q", packed_starts.astype(np.uint64).tobytes()),
+        line_items=array("I", np.frombuffer(columns["line_items"], dtype=np.uint32)[positions].tobytes()),
+        line_quantities=array("q", np.frombuffer(columns["line_quantities"], dtype=np.int64)[positions].tobytes()),
+    )
@@ -0,0 +1,174 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from uuid import UUID
+import numpy as np
+from app.storage.columnar import EPOCH, MICROSECOND
+
+# Sorts after every real id, so (value, _LAST) bounds all entries with that value
+_LAST = UUID(int=(1 << 128) - 1)
+_FIRST = UUID(int=0)
+
+class KeyRange:
+    """Read-only view of the ids in entries[start:stop], sliced lazily"""
+
+    def __init__(self, entries, start, stop):
+        self.entries = entries
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, _ = index.indices(len(self))
+            return [key for _, key in self.entries[self.start + start:self.start + stop]]
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.entries[self.start + index][1]
+
+    def entry(self, index):
+        """The (value, id) pair at index"""
+        return self.entries[self.start + index]
+
+    def position_after(self, value, key):
+        """Position of the first entry after (value, key), whether or not that pair is still here"""
+        return bisect_right(self.entries, (value, key), self.start, self.stop) - self.start
+
+class SortedIndex:
+    """(value, id) pairs kept sorted so value ranges are found by bisection"""
+
+    def __init__(self):
+        self.entries = []
+
+    def add(self, value, key):
+        insort(self.entries, (value, key))
+
+    def remove(self, value, key):
+        position = bisect_left(self.entries, (value, key))
+        if position < len(self.entries) and self.entries[position] == (value, key):
+            del self.entries[position]
+
+    def range(self, low=None, high=None):
+        """Ids whose value lies in [low, high], in value order"""
+        start = 0 if low is None else bisect_left(self.entries, (low, _FIRST))
+        stop = len(self.entries) if high is None else bisect_left(self.entries, (high, _LAST))
+        return KeyRange(self.entries, start, max(start, stop))
+
+def _groups(keys, order):
+    """(key, positions) for each run of equal keys[order]"""
+    if not len(order):
+        return
+    ordered = keys[order]
+    for chunk in np.split(order, np.flatnonzero(np.diff(ordered)) + 1):
+        yield int(keys[chunk[0]]), chunk
+
+class InvoiceIndex:
+    """
+    Secondary indexes over invoices: ids per customer and per item (in
+    creation order) and sorted total_amount / created_at indexes. Kept up to
+    date by update(old, new), registered as a listener on the collection.
+    """
+
+    def __init__(self):
+        self.by_customer = defaultdict(list)
+        self.by_item = defaultdict(list)
+        self.by_total = SortedIndex()
+        self.by_created = SortedIndex()
+
+    @staticmethod
+    def _item_ids(invoice):
+        return dict.fromkeys(line.item_id for line in invoice.items)
+
+    def update(self, old, new):
+        if old is not None:
+            self.by_total.remove(old.total_amount, old.id)
+            self.by_created.remove(old.created_at, old.id)
+            if old.customer_id != new.customer_id:
+                self.by_customer[old.customer_id].remove(old.id)
+            for item_id in self._item_ids(old).keys() - self._item_ids(new).keys():
+                self.by_item[item_id].remove(old.id)
+
+        if old is None or old.customer_id != new.customer_id:
+            self.by_customer[new.customer_id].append(new.id)
+        old_items = self._item_ids(old) if old is not None else {}
+        for item_id in self._item_ids(new):
+            if item_id not in old_items:
+                self.by_item[item_id].append(new.id)
+        self.by_total.add(new.total_amount, new.id)
+        self.by_created.add(new.created_at, new.id)
+
+    @classmethod
+    def rebuild_columns(cls, store):
+        """
+        Index every row of a ColumnarInvoices store from scratch, grouping
+        and sorting by interned references with NumPy instead of hashing ids
+        """
+        index = cls()
+        count = len(store)
+        if not count:
+            return index
+        ids = store.order[0:count]
+
+        refs = np.frombuffer(store.customer_refs, dtype=np.uint32)
+        for ref, rows in _groups(refs, np.argsort(refs, kind="stable")):
+            index.by_customer[store.customer_ids.keys[ref]] = [ids[row] for row in rows.tolist()]
+
+        item_refs, item_rows = store.item_rows()
+        for ref, positions in _groups(item_refs, np.arange(len(item_refs))):
+            index.by_item[store.item_ids.keys[ref]] = [ids[row] for row in item_rows[positions].tolist()]
+
+        totals = np.frombuffer(store.totals, dtype=np.float64)
+        order = store.id_order(totals)
+        index.by_total.entries = list(zip(totals[order].tolist(), [ids[row] for row in order.tolist()]))
+        created = np.frombuffer(store.created, dtype=np.int64)
+        order = store.id_order(created)
+        index.by_created.entries = [
+            (EPOCH + micros * MICROSECOND, ids[row]) for micros, row in zip(created[order].tolist(), order.tolist())
+        ]
+        return index
+
+    def replace(self, other):
+        self.by_customer = other.by_customer
+        self.by_item = other.by_item
+        self.by_total = other.by_total
+        self.by_created = other.by_created
+
+    def query(self, customer_id=None, item_id=None, min_total=None, max_total=None,
+              created_from=None, created_to=None, lookup=None):
+        """
+        Ids of the invoices matching every given filter. The narrowest
+        index answers the query; with more than one filter the candidates
+        are checked against the rest through lookup (id -> invoice).
+        Returns None when no filter is given.
+        """
+        candidates = []
+        if customer_id is not None:
+            candidates.append(self.by_customer.get(customer_id, []))
+        if item_id is not None:
+            candidates.append(self.by_item.get(item_id, []))
+        if min_total is not None or max_total is not None:
+            candidates.append(self.by_total.range(min_total, max_total))
+        if created_from is not None or created_to is not None:
+            candidates.append(self.by_created.range(created_from, created_to))
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            return candidates[0]
+
+        def matches(invoice):
+            return (
+                (customer_id is None or invoice.customer_id == customer_id)
+                and (item_id is None or any(line.item_id == item_id for line in invoice.items))
+                and (min_total is None or invoice.total_amount >= min_total)
+                and (max_total is None or invoice.total_amount <= max_total)
+                and (created_from is None or invoice.created_at >= created_from)
+                and (created_to is None or invoice.created_at <= created_to)
+            )
+
+        narrowest = min(candidates, key=len)
+        if isinstance(narrowest, KeyRange):
+            # Stay a range in value order, so pages resume by (value, id)
+            entries = [entry for entry in narrowest.entries[narrowest.start:narrowest.stop] if matches(lookup[entry[1]])]
+            return KeyRange(entries, 0, len(entries))
+        return [key for key in narrowest if matches(lookup[key])]
@@ -1,3 +1,183 @@
-customers = {}
-items = {}
-invoices = {}
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from uuid import uuid4
+from app.core.config import settings
+from app.storage.columnar import ColumnarInvoices
+from app.storage.indexes import InvoiceIndex
+from app.storage.rollups import Rollups
+
+class StoreLock:
+    """
+    Reentrant lock around store writes. on_acquire / on_release hooks run
+    when the outermost holder takes and gives it up, so everything written
+    under one hold can be treated as a single transaction (persistence uses
+    them to serialize writers across processes and commit to its log).
+    """
+
+    def __init__(self):
+        self.local = threading.RLock()
+        self.depth = 0
+        self.hooked = False
+        self.on_acquire = []
+        self.on_release = []
+
+    def acquire(self, blocking=True, hooks=True):
+        """
+        hooks=False takes the lock without running the hooks for this hold
+        (for applying changes that are already committed elsewhere)
+        """
+        if not self.local.acquire(False):
+            if not blocking:
+                return False
+            # Not reading while waiting: the holder may be rebuilding the store
+            with reads.stepped_out():
+                self.local.acquire()
+        self.depth += 1
+        if self.depth == 1:
+            self.hooked = hooks
+            try:
+                for hook in self.on_acquire if hooks else ():
+                    hook()
+            except BaseException:
+                self.depth -= 1
+                self.local.release()
+                raise
+        return True
+
+    def release(self):
+        try:
+            if self.depth == 1 and self.hooked:
+                for hook in self.on_release:
+                    hook()
+        finally:
+            self.depth -= 1
+            self.local.release()
+
+    @contextmanager
+    def reading(self):
+        """
+        Hold the lock in this process only (no hooks): nothing is written
+        meanwhile, for reading several structures as one consistent state
+        """
+        self.acquire(hooks=False)
+        try:
+            yield self
+        finally:
+            self.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+class ReadGate:
+    """
+    Requests read the store without taking a lock. When the store has to be
+    rebuilt in place (persistence resyncing from a snapshot) the gate is
+    closed: new requests wait at it, and the rebuild waits for the requests
+    already inside to finish. A request waiting for the write lock steps out
+    meanwhile, since the rebuild may be what holds it.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.readers = 0
+        self.closed = False
+        # Set in the context of a request that entered (copied into the
+        # threads it runs handlers in)
+        self.inside = ContextVar("store_reader", default=False)
+
+    def enter(self, blocking=True):
+        with self.condition:
+            if self.closed and not blocking:
+                return False
+            self.condition.wait_for(lambda: not self.closed)
+            self.readers += 1
+            return True
+
+    def leave(self):
+        with self.condition:
+            self.readers -= 1
+            self.condition.notify_all()
+
+    @contextmanager
+    def stepped_out(self):
+        if not self.inside.get():
+            yield
+            return
+        self.leave()
+        try:
+            yield
+        finally:
+            self.enter()
+
+    @contextmanager
+    def closed_for_rebuild(self):
+        # A request rebuilding from inside the gate does not wait for itself
+        own = 1 if self.inside.get() else 0
+        with self.condition:
+            self.closed = True
+            self.condition.wait_for(lambda: self.readers <= own)
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.closed = False
+                self.condition.notify_all()
+
+# Held while a batch is validated against the store and inserted, so bulk
+# imports land all-or-nothing
+write_lock = StoreLock()
+
+reads = ReadGate()
+
+# Names this store's history in ETags together with collection versions:
+# random per process, replaced by the data directory's id when persistence
+# is on so every worker following the same log agrees
+store_id = uuid4().hex
+
+# Called with no arguments after the whole store has been replaced in bulk
+# (e.g. reloaded from a snapshot) without per-entity listener calls
+reload_listeners = []
+
+class Collection(dict):
+    """
+    Entities keyed by id. Insertion order is also kept as a list so a
+    position in it can serve as a stable pagination cursor, and listeners
+    are called as listener(old, new) on every write to keep derived
+    structures (indexes) in step. version counts writes, for HTTP caching.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.order = []
+        self.listeners = []
+        self.version = 0
+
+    def __setitem__(self, key, value):
+        with write_lock:
+            old = self.get(key)
+            if old is None:
+                self.order.append(key)
+            super().__setitem__(key, value)
+            self.version += 1
+            for listener in self.listeners:
+                listener(old, value)
+
+customers = Collection()
+items = Collection()
+invoices = ColumnarInvoices(write_lock) if settings.storage_backend == "columnar" else Collection()
+
+invoice_index = InvoiceIndex()
+invoices.listeners.append(invoice_index.update)
+
+rollups = Rollups()
+invoices.listeners.append(rollups.update)
+
+def insert_many(collection, entities):
+    with write_lock:
+        for entity in entities:
+            collection[entity.id] = entity
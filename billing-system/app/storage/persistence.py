@@ -0,0 +1,583 @@
+"""
+Write log and snapshots for the in-memory store, shared between processes.
+
+With settings.data_dir set, every write to customers, items and invoices is
+recorded as (length, crc32, kind, JSON payload). Records written while the
+store lock is held are buffered and appended together with a COMMIT record
+when the outermost holder releases it, so each locked section (a bulk import
+included) is one transaction. A background thread fsyncs the log every
+settings.fsync_interval seconds.
+
+Any number of processes (uvicorn workers, or containers sharing a volume)
+can open the same directory. Each keeps a full replica in memory and follows
+the log: taking the store lock also takes an exclusive flock on the
+directory and first applies every transaction other processes committed, so
+writes validate against the latest state; requests apply newly committed
+transactions before they run (catch_up).
+
+After settings.snapshot_records records the log is rotated (a ROTATE record
+points followers at the next segment) and the state it covers is written as
+a compacted binary snapshot (see snapshot.py); older segments and snapshots
+are then deleted. Snapshot N holds everything written to segments before N,
+so a warm start maps the newest snapshot, bulk-loads its columns, rebuilds
+indexes and rollups once, and replays only segments N and later. Records
+after the last COMMIT (a writer died mid-transaction) are truncated away.
+"""
+import gc
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from array import array
+from functools import partial
+from uuid import UUID, uuid4
+
+from app.core.config import settings
+from app.models.customer import Customer
+from app.models.item import Item
+from app.models.invoice import Invoice
+from app.storage import memory, snapshot
+from app.storage.columnar import COLUMNS, ColumnarInvoices, compact
+from app.storage.indexes import InvoiceIndex
+from app.storage.memory import (
+    customers, items, invoices, invoice_index, reads, reload_listeners, rollups, write_lock
+)
+from app.storage.rollups import Rollups
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows: one process per directory there
+    fcntl = None
+
+RECORD = struct.Struct("<IIB")  # payload length, crc32 of payload, kind
+COMMIT, CUSTOMER, ITEM, INVOICE, ROTATE = 0, 1, 2, 3, 4
+
+SEGMENT_NAME = "log-{:08d}.wal"
+SNAPSHOT_NAME = "snapshot-{:08d}.bin"
+FILE_PATTERN = re.compile(r"^(log|snapshot)-(\d{8})\.(wal|bin)$")
+LOCK_NAME = "LOCK"
+STORE_ID_NAME = "STORE_ID"
+
+def _record(kind, payload=b""):
+    return RECORD.pack(len(payload), zlib.crc32(payload), kind) + payload
+
+def _strings(values):
+    """Encode strings as (offsets array, utf-8 blob) sections"""
+    encoded = [value.encode() for value in values]
+    offsets = [0]
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+    return array("Q", offsets), b"".join(encoded)
+
+def _read_strings(snap, name):
+    offsets = snap.array(f"{name}.offsets", "Q")
+    blob = bytes(snap[f"{name}.blob"])
+    return [blob[offsets[i]:offsets[i + 1]].decode() for i in range(len(offsets) - 1)]
+
+def _read_ids(view):
+    return [UUID(bytes=bytes(view[offset:offset + 16])) for offset in range(0, len(view), 16)]
+
+def _load_entities(collection, entities):
+    """Insert into a Collection without calling its listeners"""
+    for entity in entities:
+        dict.__setitem__(collection, entity.id, entity)
+        collection.order.append(entity.id)
+
+def _clear(collection):
+    if isinstance(collection, ColumnarInvoices):
+        collection.load({name: b"" for name in COLUMNS})
+    else:
+        dict.clear(collection)
+        collection.order.clear()
+    collection.version = 0
+
+class Persistence:
+    def __init__(self, data_dir, fsync_interval=0.05, snapshot_records=100_000):
+        self.data_dir = data_dir
+        self.fsync_interval = fsync_interval
+        self.snapshot_records = snapshot_records
+        self.collections = {
+            CUSTOMER: (customers, Customer),
+            ITEM: (items, Item),
+            INVOICE: (invoices, Invoice),
+        }
+        self.listeners = {}
+        # Current segment: descriptor (read + append), number, and how far
+        # it has been applied to this process's replica
+        self.fd = None
+        self.segment = 0
+        self.offset = 0
+        self.records = 0
+        self.pending = bytearray()
+        self.applying = False
+        self.dirty = False
+        self.lock_fd = None
+        # Guards swapping self.fd against the fsync thread and behind()
+        self.io_lock = threading.Lock()
+        self.snapshot_lock = threading.Lock()
+        self.closing = threading.Event()
+        self.snapshot_due = threading.Event()
+        self.threads = []
+        self.recovery = {}
+        self.last_snapshot = None
+        self.resyncs = 0
+
+    @property
+    def enabled(self):
+        return self.fd is not None
+
+    def path(self, name):
+        return os.path.join(self.data_dir, name)
+
+    def _files(self, kind):
+        found = []
+        for name in os.listdir(self.data_dir):
+            match = FILE_PATTERN.match(name)
+            if match and match.group(1) == kind:
+                found.append(int(match.group(2)))
+        return sorted(found)
+
+    def _open_segment(self, segment, create=False):
+        flags = os.O_RDWR | os.O_APPEND | (os.O_CREAT if create else 0)
+        return os.open(self.path(SEGMENT_NAME.format(segment)), flags, 0o644)
+
+    # ------------------------------------------------------------
+    # Cross-process Lock (store lock hooks)
+    # ------------------------------------------------------------
+    def _lock(self):
+        if fcntl is not None:
+            fcntl.flock(self.lock_fd, fcntl.LOCK_EX)
+
+    def _unlock(self):
+        if fcntl is not None:
+            fcntl.flock(self.lock_fd, fcntl.LOCK_UN)
+
+    def _acquired(self):
+        self._lock()
+        try:
+            self._follow(exclusive=True)
+        except BaseException:
+            self._unlock()
+            raise
+
+    def _released(self):
+        try:
+            if self.pending:
+                self.pending += _record(COMMIT)
+                view = memoryview(self.pending)
+                while view:
+                    view = view[os.write(self.fd, view):]
+                self.offset += len(self.pending)
+                self.pending = bytearray()
+                if not self.fsync_interval:
+                    os.fsync(self.fd)
+                else:
+                    self.dirty = True
+                if self.records >= self.snapshot_records:
+                    self.snapshot_due.set()
+        finally:
+            self._unlock()
+
+    # ------------------------------------------------------------
+    # Startup / Following the Log
+    # ------------------------------------------------------------
+    def open(self):
+        """Recover the store from data_dir, then log every write and follow other writers"""
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.lock_fd = os.open(self.path(LOCK_NAME), os.O_RDWR | os.O_CREAT, 0o644)
+        write_lock.acquire(hooks=False)
+        try:
+            self._lock()
+            try:
+                memory.store_id = self._store_id()
+                self.recovery = self._recover(exclusive=True)
+            finally:
+                self._unlock()
+            for kind, (collection, _) in self.collections.items():
+                self.listeners[kind] = partial(self._append, kind)
+                collection.listeners.append(self.listeners[kind])
+            write_lock.on_acquire.append(self._acquired)
+            write_lock.on_release.append(self._released)
+        finally:
+            write_lock.release()
+
+        if self.records >= self.snapshot_records:
+            self.snapshot_due.set()
+        # Separate threads so a long snapshot never holds back the batched fsync
+        self.threads = [
+            threading.Thread(target=self._sync_loop, name="store-fsync", daemon=True),
+            threading.Thread(target=self._snapshot_loop, name="store-snapshot", daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+        return self.recovery
+
+    def _store_id(self):
+        """The directory's id (created with it), shared by every process using it"""
+        path = self.path(STORE_ID_NAME)
+        if not os.path.exists(path):
+            with open(path + ".tmp", "w") as f:
+                f.write(uuid4().hex)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+            snapshot.fsync_dir(self.data_dir)
+        with open(path) as f:
+            return f.read().strip()
+
+    def _recover(self, exclusive):
+        """
+        Replace the replica with the newest snapshot plus every committed
+        transaction after it. Only an exclusive holder truncates a dead
+        writer's uncommitted tail.
+        """
+        started = time.perf_counter()
+        # Recovery allocates millions of long-lived objects; collecting
+        # while they arrive would rescan them over and over
+        gc.disable()
+        try:
+            fd = None
+            while fd is None:
+                for collection, _ in self.collections.values():
+                    _clear(collection)
+                snapshots = self._files("snapshot")
+                loaded = snapshots[-1] if snapshots else 0
+                packed = self._load_snapshot(self.path(SNAPSHOT_NAME.format(loaded))) if loaded else None
+                loaded_at = time.perf_counter()
+                invoice_index.replace(InvoiceIndex.rebuild_columns(packed) if packed is not None else InvoiceIndex())
+                rollups.replace(Rollups.rebuild_columns(packed) if packed is not None else Rollups())
+                for listener in reload_listeners:
+                    listener()
+                rebuilt_at = time.perf_counter()
+
+                # Replay from the snapshot's segment on, following ROTATE records
+                first = max(loaded, 1)
+                fd = self._open_first(first, loaded)
+            self._switch(fd, first)
+            snapshot.fsync_dir(self.data_dir)
+            replayed = self._follow(exclusive)
+            finished = time.perf_counter()
+        finally:
+            gc.enable()
+
+        return {
+            "snapshot": SNAPSHOT_NAME.format(loaded) if loaded else None,
+            "segments_replayed": self.segment - first + 1,
+            "records_replayed": replayed,
+            "snapshot_load_seconds": round(loaded_at - started, 4),
+            "index_rebuild_seconds": round(rebuilt_at - loaded_at, 4),
+            "log_replay_seconds": round(finished - rebuilt_at, 4),
+            "total_seconds": round(finished - started, 4),
+        }
+
+    def _open_first(self, first, loaded):
+        """
+        Open the segment replay starts from. None when it was pruned since
+        the snapshots were listed: a newer snapshot covers it, so recovery
+        starts over from that one.
+        """
+        try:
+            return self._open_segment(first)
+        except FileNotFoundError:
+            if any(number > loaded for number in self._files("snapshot")):
+                return None
+        # A new data directory: the log starts here
+        return self._open_segment(first, create=True)
+
+    def _load_snapshot(self, path):
+        """
+        Load a snapshot into the (empty) store without calling listeners;
+        returns the invoices as a ColumnarInvoices for rebuilding indexes
+        """
+        with snapshot.Snapshot(path) as snap:
+            _load_entities(customers, [
+                Customer.model_construct(id=key, name=name, email=email)
+                for key, name, email in zip(
+                    _read_ids(snap["customers.ids"]),
+                    _read_strings(snap, "customers.name"),
+                    _read_strings(snap, "customers.email"),
+                )
+            ])
+            _load_entities(items, [
+                Item.model_construct(id=key, name=name, price=price)
+                for key, name, price in zip(
+                    _read_ids(snap["items.ids"]),
+                    _read_strings(snap, "items.name"),
+                    snap.array("items.price", "d"),
+                )
+            ])
+
+            columns = {name: snap[f"invoices.{name}"] for name in COLUMNS}
+            if isinstance(invoices, ColumnarInvoices):
+                invoices.load(columns)
+                packed = invoices
+            else:
+                packed = ColumnarInvoices(write_lock)
+                packed.load(columns)
+                _load_entities(invoices, packed.values())
+            # Write versions carry on from the snapshot, so every process
+            # that has applied the same log reports the same versions
+            if "versions" in snap:
+                customers.version, items.version, invoices.version = snap.array("versions", "Q")
+            return packed
+
+    def _apply(self, data):
+        """
+        Apply every committed transaction in data (a run of records).
+        Returns (end of the last one, entities applied, segment named by a
+        ROTATE record after it or None).
+        """
+        offset = committed = applied = 0
+        transaction = []
+        self.applying = True
+        try:
+            while offset + RECORD.size <= len(data):
+                length, checksum, kind = RECORD.unpack_from(data, offset)
+                end = offset + RECORD.size + length
+                payload = data[offset + RECORD.size:end]
+                if end > len(data) or zlib.crc32(payload) != checksum:
+                    break
+                offset = end
+                if kind == COMMIT:
+                    for collection, entity in transaction:
+                        collection[entity.id] = entity
+                    applied += len(transaction)
+                    transaction = []
+                    committed = offset
+                elif kind == ROTATE:
+                    return committed, applied, int(payload)
+                elif kind in self.collections:
+                    collection, model = self.collections[kind]
+                    transaction.append((collection, model.model_validate_json(payload)))
+                else:
+                    break
+        finally:
+            self.applying = False
+        return committed, applied, None
+
+    def behind(self):
+        """
+        True when other processes committed writes this replica has not
+        applied. Called on the event loop, so it never waits: while the log
+        is being fsynced or rotated (io_lock held) it answers True and lets
+        catch_up sort it out.
+        """
+        if not self.io_lock.acquire(blocking=False):
+            return True
+        try:
+            # Under io_lock self.fd cannot be closed (and its number reused) by _switch
+            return self.fd is not None and os.fstat(self.fd).st_size > self.offset
+        except OSError:
+            return True
+        finally:
+            self.io_lock.release()
+
+    def catch_up(self):
+        """
+        Apply what other processes committed. Skipped while this process
+        holds the store lock: the holder catches up when it takes it.
+        """
+        if not write_lock.acquire(blocking=False, hooks=False):
+            return
+        try:
+            self._follow(exclusive=False)
+        finally:
+            write_lock.release()
+
+    def _follow(self, exclusive):
+        """
+        Apply committed transactions from the current position on, moving
+        to the next segment at each ROTATE record. exclusive: the caller
+        holds the flock. Returns the number of entities applied.
+        """
+        total = 0
+        while self.fd is not None:
+            size = os.fstat(self.fd).st_size
+            if size <= self.offset:
+                return total
+            end, applied, rotated = self._apply(os.pread(self.fd, size - self.offset, self.offset))
+            self.offset += end
+            self.records += applied
+            total += applied
+            if rotated is None:
+                if exclusive and self.offset < size:
+                    # Holding the lock, so whoever wrote this died mid-transaction
+                    os.ftruncate(self.fd, self.offset)
+                return total
+            if not any(number > rotated for number in self._files("snapshot")):
+                # snapshot() creates the segment before writing the ROTATE
+                # naming it, so one missing here was pruned since the check
+                try:
+                    self._switch(self._open_segment(rotated), rotated)
+                    continue
+                except FileNotFoundError:
+                    pass
+            # Fell behind by more than a snapshot (the segment may be
+            # pruned): start over from the newest one, with no request
+            # reading the collections while they are rebuilt
+            self.resyncs += 1
+            with reads.closed_for_rebuild():
+                self._recover(exclusive)
+            return total
+        return total
+
+    def _switch(self, fd, segment):
+        with self.io_lock:
+            if self.fd is not None:
+                os.close(self.fd)
+            self.fd = fd
+            self.segment = segment
+            self.offset = 0
+            self.records = 0
+            self.dirty = False
+
+    # ------------------------------------------------------------
+    # Write Path
+    # ------------------------------------------------------------
+    def _append(self, kind, old, new):
+        # Called under the store lock by the collection; committed on release
+        if self.applying:
+            return
+        payload = new.model_dump_json().encode()
+        self.pending += _record(kind, payload)
+        self.records += 1
+
+    def sync(self):
+        """fsync whatever the log received since the last sync"""
+        with self.io_lock:
+            if self.fd is None or not self.dirty:
+                return
+            self.dirty = False
+            os.fsync(self.fd)
+
+    def _sync_loop(self):
+        while not self.closing.wait(self.fsync_interval or 1.0):
+            try:
+                self.sync()
+            except OSError as e:
+                print(f"store persistence: fsync failed: {e}")
+
+    def _snapshot_loop(self):
+        while True:
+            self.snapshot_due.wait()
+            if self.closing.is_set():
+                return
+            try:
+                self.snapshot()
+            except OSError as e:
+                print(f"store persistence: snapshot failed: {e}")
+                self.closing.wait(1.0)
+
+    # ------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------
+    def snapshot(self, force=False):
+        """
+        Rotate the log and write the state it covers as a snapshot; the
+        store only stays locked while the state is copied. Without force,
+        does nothing (returns None) when another process already rotated.
+        """
+        with self.snapshot_lock:
+            started = time.perf_counter()
+            with write_lock:
+                self.snapshot_due.clear()
+                if not force and self.records < self.snapshot_records:
+                    return None
+                segment = self.segment + 1
+                fd = self._open_segment(segment, create=True)
+                snapshot.fsync_dir(self.data_dir)
+                os.write(self.fd, _record(ROTATE, str(segment).encode()))
+                os.fsync(self.fd)
+                self._switch(fd, segment)
+                state = (
+                    list(customers.values()),
+                    list(items.values()),
+                    invoices.columns() if isinstance(invoices, ColumnarInvoices) else list(invoices.values()),
+                    (customers.version, items.version, invoices.version),
+                )
+            locked = time.perf_counter() - started
+
+            name = SNAPSHOT_NAME.format(segment)
+            size = snapshot.write(self.path(name), self._encode(*state))
+            self._prune(segment)
+            self.last_snapshot = {
+                "name": name,
+                "bytes": size,
+                "customers": len(state[0]),
+                "items": len(state[1]),
+                "locked_seconds": round(locked, 4),
+                "seconds": round(time.perf_counter() - started, 4),
+            }
+            return self.last_snapshot
+
+    def _encode(self, customer_list, item_list, invoice_state, versions):
+        sections = {"versions": array("Q", versions)}
+        for prefix, entities in (("customers", customer_list), ("items", item_list)):
+            sections[f"{prefix}.ids"] = b"".join(entity.id.bytes for entity in entities)
+            sections[f"{prefix}.name.offsets"], sections[f"{prefix}.name.blob"] = _strings(e.name for e in entities)
+        sections["customers.email.offsets"], sections["customers.email.blob"] = _strings(c.email for c in customer_list)
+        sections["items.price"] = array("d", (item.price for item in item_list))
+
+        if isinstance(invoice_state, list):
+            # Dict backend: pack the models through a scratch columnar store
+            packed = ColumnarInvoices(threading.RLock())
+            for invoice in invoice_state:
+                packed[invoice.id] = invoice
+            invoice_state = packed.columns()
+        for name, column in compact(invoice_state).items():
+            sections[f"invoices.{name}"] = column
+        return sections
+
+    def _prune(self, keep_from):
+        for kind, template in (("log", SEGMENT_NAME), ("snapshot", SNAPSHOT_NAME)):
+            for number in self._files(kind):
+                if number < keep_from:
+                    try:
+                        os.remove(self.path(template.format(number)))
+                    except FileNotFoundError:
+                        pass  # another process pruned it first
+
+    # ------------------------------------------------------------
+    # Shutdown / Status
+    # ------------------------------------------------------------
+    def close(self):
+        """Stop the background threads and fsync the log"""
+        if self.fd is None:
+            return
+        self.closing.set()
+        self.snapshot_due.set()
+        for thread in self.threads:
+            thread.join()
+        write_lock.acquire(hooks=False)
+        try:
+            write_lock.on_acquire.remove(self._acquired)
+            write_lock.on_release.remove(self._released)
+            for kind, (collection, _) in self.collections.items():
+                collection.listeners.remove(self.listeners.pop(kind))
+            with self.io_lock:
+                os.fsync(self.fd)
+                os.close(self.fd)
+                self.fd = None
+        finally:
+            write_lock.release()
+        os.close(self.lock_fd)
+        self.lock_fd = None
+
+    def status(self):
+        return {
+            "enabled": self.enabled,
+            "data_dir": self.data_dir or None,
+            "pid": os.getpid(),
+            "segment": SEGMENT_NAME.format(self.segment) if self.enabled else None,
+            "applied_offset": self.offset,
+            "records_since_snapshot": self.records,
+            "fsync_interval": self.fsync_interval,
+            "snapshot_records": self.snapshot_records,
+            "recovery": self.recovery,
+            "resyncs": self.resyncs,
+            "last_snapshot": self.last_snapshot,
+        }
+
+persistence = Persistence(settings.data_dir, settings.fsync_interval, settings.snapshot_records)
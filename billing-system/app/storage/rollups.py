@@ -0,0 +1,128 @@
+from collections import defaultdict
+import numpy as np
+
+def _customer():
+    return {"invoices": 0, "revenue_cents": 0}
+
+def _item():
+    return {"invoices": 0, "units": 0}
+
+def _cents(amount):
+    # Invoice totals are priced exact to the cent (see pricing.py)
+    return round(amount * 100)
+
+def _report(rollup):
+    """A rollup as served: revenue in currency units rather than cents"""
+    return {
+        "revenue" if field == "revenue_cents" else field: value / 100 if field == "revenue_cents" else value
+        for field, value in rollup.items()
+    }
+
+class Rollups:
+    """
+    Aggregates over invoices, maintained incrementally: update(old, new)
+    applies the difference an invoice write makes in O(lines in invoice), so
+    reads are dictionary lookups. Revenue is summed in integer cents, so any
+    sequence of deltas lands exactly where a rebuild does; reads convert it.
+    """
+
+    def __init__(self):
+        self.customers = defaultdict(_customer)
+        self.items = defaultdict(_item)
+        self.totals = {"invoices": 0, "revenue_cents": 0, "units": 0}
+
+    def _apply(self, invoice, sign):
+        cents = _cents(invoice.total_amount)
+        customer = self.customers[invoice.customer_id]
+        customer["invoices"] += sign
+        customer["revenue_cents"] += sign * cents
+
+        units = 0
+        for item_id in dict.fromkeys(line.item_id for line in invoice.items):
+            self.items[item_id]["invoices"] += sign
+        for line in invoice.items:
+            self.items[line.item_id]["units"] += sign * line.quantity
+            units += line.quantity
+
+        self.totals["invoices"] += sign
+        self.totals["revenue_cents"] += sign * cents
+        self.totals["units"] += sign * units
+
+    def update(self, old, new):
+        if old is not None:
+            self._apply(old, -1)
+        self._apply(new, 1)
+
+    def total(self):
+        return _report(self.totals)
+
+    def customer(self, customer_id):
+        return _report(self.customers.get(customer_id) or _customer())
+
+    def item(self, item_id):
+        return _report(self.items.get(item_id) or _item())
+
+    @classmethod
+    def rebuild(cls, invoices):
+        """Recompute every rollup from scratch"""
+        rollups = cls()
+        for invoice in invoices:
+            rollups._apply(invoice, 1)
+        return rollups
+
+    @classmethod
+    def rebuild_columns(cls, store):
+        """rebuild() for a ColumnarInvoices store, aggregating by interned reference"""
+        rollups = cls()
+        count = len(store)
+        if not count:
+            return rollups
+        refs = np.frombuffer(store.customer_refs, dtype=np.uint32)
+        cents = np.rint(np.frombuffer(store.totals, dtype=np.float64) * 100).astype(np.int64)
+        invoice_counts = np.bincount(refs)
+        # Float64 sums of whole cents are exact below 2**53 cents
+        revenue = np.bincount(refs, weights=cents)
+        for ref in np.flatnonzero(invoice_counts).tolist():
+            rollups.customers[store.customer_ids.keys[ref]] = {
+                "invoices": int(invoice_counts[ref]), "revenue_cents": int(revenue[ref]),
+            }
+
+        _, line_items, quantities = store.line_rows()
+        # An invoice counts once per item however many lines name it
+        containing = np.bincount(store.item_rows()[0])
+        units = np.bincount(line_items, weights=quantities)
+        for ref in np.flatnonzero(containing).tolist():
+            rollups.items[store.item_ids.keys[ref]] = {"invoices": int(containing[ref]), "units": int(units[ref])}
+
+        rollups.totals = {"invoices": count, "revenue_cents": int(cents.sum()), "units": int(quantities.sum())}
+        return rollups
+
+    def verify(self, invoices):
+        """
+        Compare against a full rebuild; returns a list of mismatches
+        (empty when consistent) and the rebuilt rollups
+        """
+        expected = self.rebuild(invoices)
+        mismatches = []
+
+        def compare(scope, key, actual, wanted):
+            for field, value in wanted.items():
+                if actual.get(field, 0) != value:
+                    mismatches.append({
+                        "scope": scope, "id": key, "field": field,
+                        "maintained": actual.get(field, 0), "expected": value,
+                    })
+
+        compare("totals", None, self.totals, expected.totals)
+        for scope, actual, wanted, empty in (
+            ("customer", self.customers, expected.customers, _customer),
+            ("item", self.items, expected.items, _item),
+        ):
+            for key in actual.keys() | wanted.keys():
+                compare(scope, str(key), actual.get(key, empty()), wanted.get(key, empty()))
+        return mismatches, expected
+
+    def replace(self, other):
+        self.customers = other.customers
+        self.items = other.items
+        self.totals = other.totals
@@ -0,0 +1,109 @@
+"""
+Binary snapshot files.
+
+A snapshot is a set of named sections (raw native arrays or byte strings)
+stored 8-byte aligned after a fixed header and a section table, so a reader
+can mmap the file and take each section as a zero-copy memoryview. Files are
+written under a temporary name, fsynced and renamed into place: a snapshot
+that exists under its final name is complete.
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+MAGIC = b"BILLSNP1"
+HEADER = struct.Struct("<8s8sI")   # magic, byte order, section count
+ENTRY = struct.Struct("<32sQQ")    # section name, offset, length
+ALIGN = 8
+
+def _padding(length):
+    return -length % ALIGN
+
+def fsync_dir(path):
+    """Make a rename or new file in path durable (a no-op where unsupported)"""
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def write(path, sections):
+    """Atomically write {name: bytes-like} to path; returns the file size"""
+    names = list(sections)
+    offset = HEADER.size + ENTRY.size * len(names)
+    offset += _padding(offset)
+    table = []
+    for name in names:
+        length = memoryview(sections[name]).nbytes
+        table.append((name, offset, length))
+        offset += length + _padding(length)
+
+    temp = path + ".tmp"
+    with open(temp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, sys.byteorder.encode(), len(names)))
+        for name, start, length in table:
+            f.write(ENTRY.pack(name.encode(), start, length))
+        f.write(b"\0" * _padding(f.tell()))
+        for name, _, length in table:
+            f.write(sections[name])
+            f.write(b"\0" * _padding(length))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+    fsync_dir(os.path.dirname(path) or ".")
+    return offset
+
+class Snapshot:
+    """An open snapshot: sections are memoryviews over a read-only mapping"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+        self.sections = {}
+        try:
+            magic, byteorder, count = HEADER.unpack_from(self.map, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a billing snapshot")
+            if byteorder.rstrip(b"\0").decode() != sys.byteorder:
+                raise ValueError(f"{path} was written on a {byteorder.decode()}-endian machine")
+            for position in range(count):
+                name, offset, length = ENTRY.unpack_from(self.map, HEADER.size + ENTRY.size * position)
+                if offset + length > len(self.map):
+                    raise ValueError(f"{path} is truncated")
+                self.sections[name.rstrip(b"\0").decode()] = self.view[offset:offset + length]
+        except (ValueError, struct.error):
+            self.close()
+            raise
+
+    def __getitem__(self, name):
+        return self.sections[name]
+
+    def __contains__(self, name):
+        return name in self.sections
+
+    def array(self, name, typecode):
+        """Copy a section into a new array (one memcpy from the mapping)"""
+        column = array(typecode)
+        column.frombytes(self.sections[name])
+        return column
+
+    def close(self):
+        # Exported views must be released before the mapping can close
+        for section in self.sections.values():
+            section.release()
+        self.sections = {}
+        self.view.release()
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
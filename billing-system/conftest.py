@@ -0,0 +1,3 @@
+"""
+Makes the `app` package importable when pytest runs from the repository root.
+"""
@@ -0,0 +1,86 @@
+"""
+Another worker sharing a data directory, run as its own process (the store
+is module-level, so one process holds one replica):
+
+    python tests/store_worker.py DATA_DIR STEP...
+
+Steps run in order: write:N commits N invoices (one transaction each),
+reprice:P sets the item's price, snapshot rotates the log. The store is
+printed as JSON (dump()) when done. Tests import the helpers to drive the
+replica in their own process the same way.
+"""
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from app.models.customer import Customer
+from app.models.invoice import Invoice, InvoiceItem
+from app.models.item import Item
+from app.storage.memory import customers, invoice_index, invoices, items, rollups, write_lock
+from app.storage.persistence import Persistence
+
+CUSTOMER = Customer(id=UUID(int=1), name="Ada", email="ada@example.com")
+ITEM = Item(id=UUID(int=2), name="Widget", price=2.5)
+CREATED = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def write(count):
+    for _ in range(count):
+        with write_lock:
+            if CUSTOMER.id not in customers:
+                customers[CUSTOMER.id] = CUSTOMER
+                items[ITEM.id] = ITEM
+            # Numbered under the lock, which first applies other workers' writes
+            number = len(invoices) + 1
+            invoices[UUID(int=1000 + number)] = Invoice(
+                id=UUID(int=1000 + number),
+                customer_id=CUSTOMER.id,
+                items=[InvoiceItem(item_id=ITEM.id, quantity=number)],
+                total_amount=number * items[ITEM.id].price,
+                created_at=CREATED + timedelta(minutes=number),
+            )
+
+
+def reprice(price):
+    with write_lock:
+        items[ITEM.id] = ITEM.model_copy(update={"price": price})
+
+
+def dump():
+    """The replica, derived state included, as plain JSON values"""
+    def entities(collection):
+        return [collection[key].model_dump(mode="json") for key in sorted(collection.keys())]
+
+    return {
+        "customers": entities(customers),
+        "items": entities(items),
+        "invoices": entities(invoices),
+        "versions": [customers.version, items.version, invoices.version],
+        "by_customer": {str(key): [str(i) for i in ids] for key, ids in invoice_index.by_customer.items() if ids},
+        "by_total": [[value, str(key)] for value, key in invoice_index.by_total.entries],
+        "totals": rollups.totals,
+    }
+
+
+def main(data_dir, *steps):
+    store = Persistence(data_dir, fsync_interval=0, snapshot_records=1_000_000)
+    store.open()
+    try:
+        for step in steps:
+            name, _, argument = step.partition(":")
+            if name == "write":
+                write(int(argument))
+            elif name == "reprice":
+                reprice(float(argument))
+            elif name == "snapshot":
+                store.snapshot(force=True)
+            else:
+                raise SystemExit(f"unknown step {step!r}")
+    finally:
+        store.close()
+    print(json.dumps(dump()))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
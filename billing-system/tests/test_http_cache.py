@@ -0,0 +1,81 @@
+"""
+ETags, 304s and the body cache of list pages.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.http_cache import body_cache
+from app.main import app
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def item(client):
+    return client.post("/items/", params={"name": "Cached", "price": 4}).json()
+
+
+def page_holding(client, item_id):
+    """Query params of the /items/ page that lists item_id"""
+    params = {"limit": 100}
+    while True:
+        page = client.get("/items/", params=params).json()
+        if any(row["id"] == item_id for row in page["items"]):
+            return params
+        params = {"limit": 100, "cursor": page["next_cursor"]}
+
+
+def test_matching_if_none_match_gets_304_without_body(client, item):
+    first = client.get("/items/", params={"limit": 5})
+    tag = first.headers["ETag"]
+    for header in (tag, f"W/{tag}", f'"stale", {tag}', "*"):
+        response = client.get("/items/", params={"limit": 5}, headers={"If-None-Match": header})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == tag
+
+    stale = client.get("/items/", params={"limit": 5}, headers={"If-None-Match": '"stale"'})
+    assert stale.status_code == 200
+    assert stale.json() == first.json()
+
+
+def test_every_write_changes_the_etag(client, item):
+    def tags():
+        return tuple(client.get(path, params={"limit": 5}).headers["ETag"] for path in ("/items/", "/invoices/"))
+
+    customer = client.post("/customers/", params={"name": "Tagged", "email": "tagged@example.com"}).json()
+    lines = [{"item_id": item["id"], "quantity": 3}]
+    seen = [tags()]
+    writes = [
+        lambda: client.patch(f"/items/{item['id']}", params={"price": 5}),
+        lambda: client.post("/items/bulk", json=[{"name": "Bulk", "price": 1}]),
+        lambda: client.post("/invoices/", params={"customer_id": customer["id"]}, json=lines),
+        lambda: client.post("/invoices/bulk", json=[{"customer_id": customer["id"], "items": lines}]),
+        lambda: client.patch(f"/items/{item['id']}", params={"price": 6}),
+        lambda: client.post("/invoices/reprice"),
+    ]
+    for write in writes:
+        assert write().status_code == 200
+        seen.append(tags())
+    # Item writes move the item pages' tag, invoice writes the invoice pages'
+    assert [before[0] != after[0] for before, after in zip(seen, seen[1:])] == [True, True, False, False, True, False]
+    assert [before[1] != after[1] for before, after in zip(seen, seen[1:])] == [False, False, True, True, False, True]
+
+
+def test_cached_body_is_not_served_after_a_write(client, item):
+    params = page_holding(client, item["id"])
+    first = client.get("/items/", params=params)
+    hits = body_cache.hits
+    assert client.get("/items/", params=params).content == first.content
+    assert body_cache.hits == hits + 1
+
+    assert client.patch(f"/items/{item['id']}", params={"price": 7.25}).status_code == 200
+    after = client.get("/items/", params=params)
+    assert after.headers["ETag"] != first.headers["ETag"]
+    assert next(row for row in after.json()["items"] if row["id"] == item["id"])["price"] == 7.25
+    # The old tag no longer gets a 304
+    assert client.get("/items/", params=params, headers={"If-None-Match": first.headers["ETag"]}).status_code == 200
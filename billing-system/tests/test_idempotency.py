@@ -0,0 +1,86 @@
+"""
+Idempotency-Key handling of POST /invoices/, through the test client.
+"""
+from uuid import UUID, uuid4, uuid5
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.idempotency import INVOICE_NAMESPACE, invoice_id_for, invoice_requests
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def order(client):
+    """
+    (customer id, invoice lines) of a new customer ordering two new items
+    """
+    customer = client.post("/customers/", params={"name": "Ada", "email": "ada@example.com"}).json()
+    first = client.post("/items/", params={"name": "Widget", "price": 2.5}).json()
+    second = client.post("/items/", params={"name": "Gadget", "price": 10}).json()
+    return customer["id"], [{"item_id": first["id"], "quantity": 4}, {"item_id": second["id"], "quantity": 1}]
+
+
+def post_invoice(client, order, key, lines=None):
+    customer_id, order_lines = order
+    return client.post(
+        "/invoices/", params={"customer_id": customer_id}, json=lines or order_lines, headers={"Idempotency-Key": key}
+    )
+
+
+def customer_invoices(client, customer_id):
+    return client.get(f"/customers/{customer_id}/invoices").json()
+
+
+def test_retry_replays_the_first_invoice(client, order):
+    key = f"order-{uuid4()}"
+    first = post_invoice(client, order, key)
+    assert first.status_code == 200
+    assert "Idempotent-Replayed" not in first.headers
+    assert first.json()["total_amount"] == 20.0
+
+    retry = post_invoice(client, order, key)
+    assert retry.status_code == 200
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert [invoice["id"] for invoice in customer_invoices(client, order[0])] == [first.json()["id"]]
+
+
+def test_reused_key_with_a_different_request_is_rejected(client, order):
+    key = f"order-{uuid4()}"
+    first = post_invoice(client, order, key)
+    changed = [dict(line, quantity=line["quantity"] + 1) for line in order[1]]
+
+    response = post_invoice(client, order, key, changed)
+    assert response.status_code == 422
+    assert key in response.json()["detail"]
+
+    # Also once the first result has left the cache (another worker, or after the TTL)
+    invoice_requests.entries.clear()
+    response = post_invoice(client, order, key, changed)
+    assert response.status_code == 422
+    assert [invoice["id"] for invoice in customer_invoices(client, order[0])] == [first.json()["id"]]
+
+
+def test_invoice_id_is_derived_from_the_key(client, order):
+    key = f"order-{uuid4()}"
+    first = post_invoice(client, order, key)
+    assert first.json()["id"] == str(uuid5(INVOICE_NAMESPACE, key))
+
+    # A retry the cache no longer knows finds the stored invoice by its id
+    invoice_requests.entries.clear()
+    retry = post_invoice(client, order, key)
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert len(customer_invoices(client, order[0])) == 1
+
+
+def test_invoice_ids_are_stable_across_releases():
+    # Changing the namespace would let retries across an upgrade create duplicates
+    assert invoice_id_for("order-42") == UUID("dcfa56d5-37fe-59de-9f14-e75e373c9a2c")
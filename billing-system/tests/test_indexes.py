@@ -0,0 +1,88 @@
+"""
+Filtered invoice lists (answered from the secondary indexes) against a full
+scan of every invoice, as the store is written.
+"""
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def scan(client, customer_id=None, item_id=None, min_total=None, max_total=None, created_from=None):
+    """Ids of the invoices matching every given filter, checked one by one"""
+    return {
+        invoice["id"] for invoice in client.get("/invoices/").json()
+        if (customer_id is None or invoice["customer_id"] == customer_id)
+        and (item_id is None or any(line["item_id"] == item_id for line in invoice["items"]))
+        and (min_total is None or invoice["total_amount"] >= min_total)
+        and (max_total is None or invoice["total_amount"] <= max_total)
+        and (created_from is None or datetime.fromisoformat(invoice["created_at"]) >= created_from)
+    }
+
+
+def indexed(client, **filters):
+    """The same filters through the endpoint: whole array, pages and NDJSON agree"""
+    params = {key: value.isoformat() if isinstance(value, datetime) else value for key, value in filters.items()}
+    everything = client.get("/invoices/", params=params).json()
+    paged, cursor = [], None
+    while True:
+        page = client.get("/invoices/", params={**params, "limit": 7, **({"cursor": cursor} if cursor else {})}).json()
+        paged += page["items"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    streamed = client.get("/invoices/", params={**params, "format": "ndjson"}).text.splitlines()
+    assert paged == everything
+    assert len(streamed) == len(everything)
+    ids = [invoice["id"] for invoice in everything]
+    assert len(set(ids)) == len(ids)
+    return set(ids)
+
+
+def test_index_results_match_a_full_scan_after_writes(client):
+    customers = [
+        client.post("/customers/", params={"name": f"Scan {n}", "email": f"scan{n}@example.com"}).json()["id"]
+        for n in range(3)
+    ]
+    items = [client.post("/items/", params={"name": f"Part {n}", "price": 1.5 * (n + 1)}).json()["id"] for n in range(4)]
+    started = datetime.now(timezone.utc)
+
+    def check():
+        for filters in (
+            {"customer_id": customers[0]},
+            {"item_id": items[1]},
+            {"min_total": 10, "max_total": 40},
+            {"created_from": started},
+            {"customer_id": customers[1], "min_total": 12},
+            {"item_id": items[2], "max_total": 30},
+            {"min_total": 5, "created_from": started},
+        ):
+            assert indexed(client, **filters) == scan(client, **filters), filters
+
+    rows = [
+        {"customer_id": customers[n % 3], "items": [
+            {"item_id": items[n % 4], "quantity": n % 5 + 1}, {"item_id": items[(n + 1) % 4], "quantity": 2},
+        ]}
+        for n in range(60)
+    ]
+    assert client.post("/invoices/bulk", json=rows).status_code == 200
+    check()
+
+    # Inserts one at a time, then price changes that move totals across
+    # the range bounds once invoices are re-priced
+    for n in range(10):
+        lines = [{"item_id": items[n % 4], "quantity": n + 3}]
+        assert client.post("/invoices/", params={"customer_id": customers[n % 3]}, json=lines).status_code == 200
+    check()
+    for item_id, price in zip(items, (4.25, 0.5, 9.75, 3.0)):
+        assert client.patch(f"/items/{item_id}", params={"price": price}).status_code == 200
+    assert client.post("/invoices/reprice").json()["changed"] > 0
+    check()
@@ -0,0 +1,73 @@
+"""
+Creating and pricing invoices: reference checks and exact cent totals.
+"""
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def customer(client):
+    return client.post("/customers/", params={"name": "Grace", "email": "grace@example.com"}).json()["id"]
+
+
+def new_item(client, price):
+    return client.post("/items/", params={"name": f"Priced {price}", "price": price}).json()["id"]
+
+
+def test_unknown_customer_is_rejected_on_every_path(client):
+    item = new_item(client, 1)
+    missing = str(uuid4())
+    lines = [{"item_id": item, "quantity": 1}]
+
+    single = client.post("/invoices/", params={"customer_id": missing}, json=lines)
+    assert single.status_code == 422
+    assert single.json()["detail"] == f"Unknown customer_id: {missing}"
+    keyed = client.post(
+        "/invoices/", params={"customer_id": missing}, json=lines, headers={"Idempotency-Key": f"k-{uuid4()}"}
+    )
+    assert keyed.status_code == 422
+    bulk = client.post("/invoices/bulk", json=[{"customer_id": missing, "items": lines}])
+    assert bulk.status_code == 422
+    assert bulk.json()["detail"]["rows"] == [{"row": 0, "errors": [f"customer_id: unknown customer {missing}"]}]
+
+    ids = {invoice["customer_id"] for invoice in client.get("/invoices/", params={"item_id": item}).json()}
+    assert missing not in ids
+
+
+def test_unknown_item_is_rejected(client, customer):
+    known = new_item(client, 2)
+    missing = str(uuid4())
+    lines = [{"item_id": known, "quantity": 1}, {"item_id": missing, "quantity": 2}]
+
+    single = client.post("/invoices/", params={"customer_id": customer}, json=lines)
+    assert single.status_code == 422
+    assert single.json()["detail"] == f"Unknown item_id: {missing}"
+    bulk = client.post("/invoices/bulk", json=[{"customer_id": customer, "items": lines}])
+    assert bulk.status_code == 422
+    assert bulk.json()["detail"]["rows"] == [{"row": 0, "errors": [f"items.1.item_id: unknown item {missing}"]}]
+    assert client.get(f"/customers/{customer}/invoices").json() == []
+
+
+@pytest.mark.parametrize("prices, quantities, total", [
+    # Binary floats would give 0.30000000000000004 and 8.024999999999999
+    ((0.1, 0.2), (1, 1), 0.3),
+    ((2.675,), (3,), 8.04),
+    ((1.005, 0.07), (7, 3), 7.28),
+    ((19.99,), (1_000_003,), 19_990_059.97),
+])
+def test_totals_are_exact_to_the_cent(client, customer, prices, quantities, total):
+    lines = [{"item_id": new_item(client, price), "quantity": quantity} for price, quantity in zip(prices, quantities)]
+    single = client.post("/invoices/", params={"customer_id": customer}, json=lines).json()
+    bulk = client.post("/invoices/bulk", json=[{"customer_id": customer, "items": lines}]).json()
+    assert single["total_amount"] == total
+    assert bulk[0]["total_amount"] == total
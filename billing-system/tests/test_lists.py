@@ -0,0 +1,98 @@
+"""
+List endpoints: whole arrays, keyset pages and NDJSON streams.
+"""
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def create_items(client, count):
+    rows = [{"name": f"part-{n}", "price": n + 0.5} for n in range(count)]
+    response = client.post("/items/bulk", json=rows)
+    assert response.status_code == 200
+    return [item["id"] for item in response.json()]
+
+
+def walk(client, path, limit, **params):
+    """Every row of path, a page of limit at a time"""
+    rows = []
+    cursor = None
+    while True:
+        page = client.get(path, params={**params, "limit": limit, **({"cursor": cursor} if cursor else {})}).json()
+        rows += page["items"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return rows
+
+
+def test_plain_get_returns_every_row_as_an_array(client):
+    created = create_items(client, 150)
+    everything = client.get("/items/").json()
+    assert isinstance(everything, list)
+    assert [item["id"] for item in everything[-150:]] == created
+
+
+def test_pages_walk_every_row_once(client):
+    create_items(client, 95)
+    assert walk(client, "/items/", 40) == client.get("/items/").json()
+    first = client.get("/items/", params={"limit": 40}).json()
+    assert len(first["items"]) == 40 and first["next_cursor"]
+
+
+def test_range_pages_resume_by_key_when_rows_move_in_front(client):
+    customer = client.post("/customers/", params={"name": "Keyset", "email": "keyset@example.com"}).json()
+    item = client.post("/items/", params={"name": "Unit", "price": 1}).json()
+
+    def invoice(total):
+        lines = [{"item_id": item["id"], "quantity": total}]
+        assert client.post("/invoices/", params={"customer_id": customer["id"]}, json=lines).status_code == 200
+
+    for total in range(7000, 7020, 2):
+        invoice(total)
+    params = {"min_total": 7000, "max_total": 7100, "limit": 4}
+    first = client.get("/invoices/", params=params).json()
+    assert [row["total_amount"] for row in first["items"]] == [7000, 7002, 7004, 7006]
+
+    # Rows sorting before the cursor shift positions, not what comes next
+    invoice(7001)
+    invoice(7003)
+    invoice(7007)
+    rest = walk(client, "/invoices/", 4, min_total=7000, max_total=7100, cursor=first["next_cursor"])
+    assert [row["total_amount"] for row in rest] == [7007, 7008, 7010, 7012, 7014, 7016, 7018]
+
+
+def test_creation_order_pages_of_a_customer(client):
+    customer = client.post("/customers/", params={"name": "Pages", "email": "pages@example.com"}).json()
+    item = client.post("/items/", params={"name": "Bolt", "price": 0.25}).json()
+    rows = [{"customer_id": customer["id"], "items": [{"item_id": item["id"], "quantity": n + 1}]} for n in range(11)]
+    created = [invoice["id"] for invoice in client.post("/invoices/bulk", json=rows).json()]
+
+    path = f"/customers/{customer['id']}/invoices"
+    assert [invoice["id"] for invoice in walk(client, path, 3)] == created
+    assert [invoice["id"] for invoice in client.get(path).json()] == created
+
+
+def test_ndjson_streams_rows_after_the_cursor(client):
+    create_items(client, 300)
+    everything = client.get("/items/").json()
+    response = client.get("/items/", params={"format": "ndjson"})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == everything
+
+    cursor = client.get("/items/", params={"limit": 10}).json()["next_cursor"]
+    streamed = client.get("/items/", params={"format": "ndjson", "cursor": cursor, "limit": 5}).text.splitlines()
+    assert [json.loads(line) for line in streamed] == everything[10:15]
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "WyJwIiwtMSwiMDAwMDAwMDAtMDAwMC0wMDAwLTAwMDAtMDAwMDAwMDAwMDAxIl0"])
+def test_invalid_cursor_is_rejected(client, cursor):
+    assert client.get("/items/", params={"cursor": cursor}).status_code == 422
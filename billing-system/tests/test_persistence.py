@@ -0,0 +1,147 @@
+"""
+The write log and snapshots (app/storage/persistence.py) shared by several
+workers. The test process holds one replica; tests/store_worker.py runs
+the others.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import store_worker
+from app.storage.indexes import InvoiceIndex
+from app.storage.memory import customers, invoice_index, invoices, items, rollups, write_lock
+from app.storage.persistence import (
+    INVOICE, RECORD, SEGMENT_NAME, SNAPSHOT_NAME, Persistence, _clear, _record
+)
+from app.storage.rollups import Rollups
+
+BILLING_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_worker(data_dir, *steps, backend="dict"):
+    """Run store_worker.py's steps in another process; returns its store"""
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", store_worker.__file__, str(data_dir), *steps],
+        env=dict(os.environ, PYTHONPATH=BILLING_DIR, STORAGE_BACKEND=backend),
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def records(path):
+    """(offset, kind) of every record in a log segment"""
+    data = path.read_bytes()
+    found = []
+    offset = 0
+    while offset < len(data):
+        length, _, kind = RECORD.unpack_from(data, offset)
+        found.append((offset, kind))
+        offset += RECORD.size + length
+    return found
+
+
+@pytest.fixture
+def open_store():
+    """
+    Opens Persistence instances on this process's store; closes them and
+    empties the store after the test
+    """
+    opened = []
+
+    def open_store(data_dir):
+        store = Persistence(str(data_dir), fsync_interval=0, snapshot_records=1_000_000)
+        store.open()
+        opened.append(store)
+        return store
+
+    yield open_store
+    for store in opened:
+        store.close()
+    with write_lock:
+        for collection in (customers, items, invoices):
+            _clear(collection)
+        invoice_index.replace(InvoiceIndex())
+        rollups.replace(Rollups())
+
+
+def test_restart_replays_the_log(tmp_path):
+    written = run_worker(tmp_path, "write:3", "reprice:4", "write:2")
+    assert len(written["invoices"]) == 5
+    assert written["items"][0]["price"] == 4.0
+    assert run_worker(tmp_path) == written
+
+
+def test_uncommitted_tail_is_truncated(tmp_path, open_store):
+    written = run_worker(tmp_path, "write:3")
+    segment = tmp_path / SEGMENT_NAME.format(1)
+    committed = segment.stat().st_size
+    # A writer died after logging an invoice, before its COMMIT, halfway
+    # through the next record
+    invoice = json.dumps(written["invoices"][0] | {"id": "00000000-0000-0000-0000-000000000063"})
+    with open(segment, "ab") as f:
+        f.write(_record(INVOICE, invoice.encode()))
+        f.write(_record(INVOICE, invoice.encode())[:RECORD.size + 4])
+
+    open_store(tmp_path)
+    assert store_worker.dump() == written
+    assert segment.stat().st_size == committed
+
+
+def test_checksum_mismatch_stops_the_replay(tmp_path, open_store):
+    run_worker(tmp_path, "write:3")
+    segment = tmp_path / SEGMENT_NAME.format(1)
+    # Flip a byte in the second invoice's payload: it and everything after
+    # it are dropped, even the intact third transaction
+    second = [offset for offset, kind in records(segment) if kind == INVOICE][1]
+    data = bytearray(segment.read_bytes())
+    data[second + RECORD.size + 10] ^= 0xFF
+    segment.write_bytes(bytes(data))
+
+    open_store(tmp_path)
+    assert [invoice.total_amount for invoice in invoices.values()] == [2.5]
+    assert segment.stat().st_size == second
+
+
+def test_snapshot_and_tail_recover_the_same_store_on_both_backends(tmp_path):
+    recovered = {}
+    for backend in ("dict", "columnar"):
+        data_dir = tmp_path / backend
+        written = run_worker(data_dir, "write:5", "snapshot", "write:3", "reprice:4", "write:2", backend=backend)
+        assert (data_dir / SNAPSHOT_NAME.format(2)).exists()
+        assert not (data_dir / SEGMENT_NAME.format(1)).exists()
+        recovered[backend] = run_worker(data_dir, backend=backend)
+        assert recovered[backend] == written
+    assert recovered["dict"] == recovered["columnar"]
+
+
+def test_follower_resyncs_when_the_next_segment_is_pruned(tmp_path, open_store, monkeypatch):
+    run_worker(tmp_path, "write:3")
+    follower = open_store(tmp_path)
+    # Another worker rotates to segment 2 while this one is behind
+    run_worker(tmp_path, "write:2", "snapshot")
+
+    # ... and rotates again, pruning segment 2, after this one read the
+    # ROTATE naming segment 2 but before it opened it
+    newest = {}
+    open_segment = follower._open_segment
+
+    def rotated_meanwhile(segment, create=False):
+        if segment == 2 and not newest:
+            newest.update(run_worker(tmp_path, "write:1", "snapshot"))
+        return open_segment(segment, create)
+
+    monkeypatch.setattr(follower, "_open_segment", rotated_meanwhile)
+    follower.catch_up()
+
+    assert newest
+    assert follower.resyncs == 1
+    assert follower.segment == 3
+    assert not (tmp_path / SEGMENT_NAME.format(2)).exists()
+    assert store_worker.dump() == newest
+
+    # Its writes land in the live segment, where other workers find them
+    store_worker.write(1)
+    assert len(run_worker(tmp_path)["invoices"]) == 7
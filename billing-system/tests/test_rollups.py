@@ -0,0 +1,69 @@
+"""
+Incrementally maintained rollups against rebuilds, and /reports/verify.
+"""
+import threading
+from uuid import UUID, uuid4
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.invoice import Invoice, InvoiceItem
+from app.storage.columnar import ColumnarInvoices
+from app.storage.memory import rollups
+from app.storage.rollups import Rollups
+
+CUSTOMERS = [UUID(int=n) for n in (1, 2, 3)]
+ITEMS = [UUID(int=n) for n in (10, 11)]
+
+
+def invoice(n, total):
+    lines = [InvoiceItem(item_id=ITEMS[n % 2], quantity=n % 4 + 1), InvoiceItem(item_id=ITEMS[0], quantity=1)]
+    return Invoice(id=UUID(int=1000 + n), customer_id=CUSTOMERS[n % 3], items=lines, total_amount=total)
+
+
+def test_deltas_land_exactly_where_a_rebuild_does():
+    maintained = Rollups()
+    stored = {}
+    for n in range(300):
+        stored[n] = invoice(n, 0.1)
+        maintained.update(None, stored[n])
+    # Re-pricing back and forth leaves float sums off by a few ulps; cents do not drift
+    for price in (0.7, 0.3, 1.15, 0.1):
+        for n, old in stored.items():
+            stored[n] = old.model_copy(update={"total_amount": price * (n % 3 + 1)})
+            maintained.update(old, stored[n])
+
+    mismatches, rebuilt = maintained.verify(stored.values())
+    assert mismatches == []
+    assert maintained.totals == rebuilt.totals
+    assert maintained.total()["revenue"] == 60.0
+    assert maintained.customer(CUSTOMERS[2]) == {"invoices": 100, "revenue": 30.0}
+
+    packed = ColumnarInvoices(threading.RLock())
+    for stored_invoice in stored.values():
+        packed[stored_invoice.id] = stored_invoice
+    columns = Rollups.rebuild_columns(packed)
+    assert columns.totals == rebuilt.totals
+    assert dict(columns.customers) == dict(rebuilt.customers)
+    assert dict(columns.items) == dict(rebuilt.items)
+
+
+def test_verify_reports_and_repairs_a_drifted_rollup():
+    with TestClient(app) as client:
+        customer = client.post("/customers/", params={"name": "Rolled", "email": "rolled@example.com"}).json()["id"]
+        item = client.post("/items/", params={"name": "Roll", "price": 0.1}).json()["id"]
+        for quantity in (1, 2, 3):
+            lines = [{"item_id": item, "quantity": quantity}]
+            assert client.post("/invoices/", params={"customer_id": customer}, json=lines).status_code == 200
+        assert client.get(f"/reports/customers/{customer}").json()["revenue"] == 0.6
+        assert client.post("/reports/verify").json() == {"consistent": True, "repaired": False, "mismatches": []}
+
+        rollups.customers[UUID(customer)]["revenue_cents"] += 1
+        report = client.post("/reports/verify", params={"repair": True}).json()
+        assert report["consistent"] is False and report["repaired"] is True
+        assert report["mismatches"] == [{
+            "scope": "customer", "id": customer, "field": "revenue_cents", "maintained": 61, "expected": 60,
+        }]
+        assert client.post("/reports/verify").json()["consistent"] is True
+        assert client.get(f"/reports/customers/{customer}").json()["revenue"] == 0.6
+        assert client.get(f"/reports/customers/{uuid4()}").json()["revenue"] == 0.0
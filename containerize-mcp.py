@@ -1,7 +1,15 @@
-from fastmcp import FastMCP
+from fastmcp import FastMCP, Context
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+import asyncio
 import os
-import shutil
-import subprocess
+from collections import Counter
+
+from tools import bluegreen, build_cache, build_context, containerize, docker_api, docker_build, k8s_deploy, metrics
+from tools.container_monitor import LOGS, STATS, ContainerMonitors, logs_report, stats_report
+from tools.jobs import JobManager, QueueFullError
+from tools.proxy import BALANCING_MODES, TcpProxy
+from tools.wheelhouse import Wheelhouse
  
 # ============================================================
 # Paths & Docker Settings
@@ -18,24 +26,140 @@ TEMPLATE_DOCKERFILE_PATH = (
  
 IMAGE_NAME = "python-app:latest"
 CONTAINER_NAME = "python-app-container"
+APP_PORT = 8001
+
+BUILD_CACHE_PATH = os.path.join(PROJECT_PATH, "manifest", build_cache.MANIFEST_NAME)
+
+# Dependency wheels and per-requirements locks shared by every project this
+# server containerizes; images install from them without network access
+WHEELHOUSE_PATH = os.environ.get(
+    "MCP_WHEELHOUSE", os.path.join(os.path.expanduser("~"), ".cache", "mcp-containerization", "wheelhouse")
+)
+
+# "auto" prefers the Docker Engine API (DOCKER_HOST or the local unix
+# socket) and falls back to the `wsl docker` CLI; "api" / "cli" force one
+DOCKER_BACKEND = "auto"
+DOCKER_HOST = os.environ.get("DOCKER_HOST", "")
+DOCKER_CLI = ("wsl", "docker")
+
+# Build/deploy jobs running at once, and jobs allowed to wait in the queue
+MAX_CONCURRENT_JOBS = 2
+MAX_PENDING_JOBS = 8
+
+# Blue/green deploys and local replica sets: the proxy holds APP_PORT and
+# balances across containers on spare ports; new containers must pass
+# HEALTH_PATH before taking traffic
+DEPLOY_STRATEGIES = ("recreate", "blue_green")
+MAX_LOCAL_REPLICAS = 16
+PROXY_HOST = "127.0.0.1"
+HEALTH_PATH = "/health"
+HEALTH_TIMEOUT_SECONDS = 60
+DRAIN_TIMEOUT_SECONDS = 10
+
+# Named volume for the billing store's write log and snapshots, so data
+# survives container replacement. Every container mounts it: replicas (and
+# the blue and green sets during a cutover) share the store through the log
+DATA_VOLUME = "billing-data"
+DATA_MOUNT_PATH = "/data"
+DATA_ENVIRONMENT = {"DATA_DIR": DATA_MOUNT_PATH}
+
+# Container logs and stats are followed into ring buffers of this many
+# lines / samples (one sample kept per interval), for at most
+# MONITORED_CONTAINERS containers (two followed streams each, which the
+# Engine API backend keeps out of the pool execs use); streams nobody reads
+# stop after MONITOR_IDLE_SECONDS
+CONTAINER_LOG_LINES = 2000
+CONTAINER_STATS_SAMPLES = 300
+CONTAINER_STATS_INTERVAL_SECONDS = 2
+MONITORED_CONTAINERS = 8
+MONITOR_IDLE_SECONDS = 600
+
+# Kubernetes API server (e.g. `kubectl proxy --port=8080`, or the cluster
+# URL with a bearer token and CA file) and the manifest templates
+K8S_TEMPLATE_DIR = (
+    r"D:\sarvan\AI starts here\GitHub MCP server\GitHub Agent"
+    r"\mcp-containerization-server\templates\k8s"
+)
+K8S_API_SERVER = os.environ.get("KUBE_API_SERVER", "http://127.0.0.1:8080")
+K8S_TOKEN = os.environ.get("KUBE_TOKEN", "")
+K8S_CA_FILE = os.environ.get("KUBE_CA_FILE", "")
+K8S_NAMESPACE = os.environ.get("KUBE_NAMESPACE", "default")
+K8S_APP_NAME = "billing-api"
+K8S_ROLLOUT_TIMEOUT_SECONDS = 300
+ 
+# ============================================================
+# Create MCP Server
+# ============================================================
+mcp = FastMCP("Containerization MCP Server")
+jobs = JobManager(max_concurrency=MAX_CONCURRENT_JOBS, max_pending=MAX_PENDING_JOBS)
+deployment = bluegreen.Deployment(TcpProxy(PROXY_HOST, APP_PORT, health_path=HEALTH_PATH))
+shared_wheelhouse = Wheelhouse(WHEELHOUSE_PATH)
+monitors = ContainerMonitors(
+    MONITORED_CONTAINERS, MONITOR_IDLE_SECONDS, log_lines=CONTAINER_LOG_LINES,
+    stats_samples=CONTAINER_STATS_SAMPLES, sample_interval=CONTAINER_STATS_INTERVAL_SECONDS
+)
+
+metrics.registry.register(metrics.Gauge(
+    "mcp_jobs", "Known jobs by kind and status", ("kind", "status"),
+    lambda: dict(Counter((job.kind, job.status) for job in jobs.list()))
+))
+metrics.registry.register(metrics.Gauge(
+    "mcp_proxy_upstreams", "Replicas the traffic proxy balances across", (),
+    lambda: {(): len(deployment.containers) if deployment.proxy.running else 0}
+))
  
 # ============================================================
 # Helper Functions
 # ============================================================
-def windows_to_wsl_path(windows_path: str) -> str:
+_docker_backend = None
+_docker_backend_lock = asyncio.Lock()
+ 
+async def get_docker_backend():
     """
-    Convert Windows path (D:\\path) to WSL path (/mnt/d/path)
+    Connect the docker backend once and reuse it (and its pooled
+    connections) for every job
     """
-    path = windows_path.replace("\\", "/")
-    if len(path) > 1 and path[1] == ":":
-        drive_letter = path[0].lower()
-        path = f"/mnt/{drive_letter}/{path[3:]}"
-    return path
+    global _docker_backend
+    async with _docker_backend_lock:
+        if _docker_backend is None:
+            _docker_backend = await docker_api.connect_backend(
+                DOCKER_BACKEND, DOCKER_HOST, DOCKER_CLI, max_follows=2 * MONITORED_CONTAINERS
+            )
+            print(f"🔌 Docker backend: {_docker_backend.name}")
+    return _docker_backend
+ 
+def live_container(container: str) -> str:
+    """
+    The container a logs/stats call means: the one named, else the first
+    replica behind the proxy, else the directly published container
+    """
+    return container or (deployment.containers[0] if deployment.containers else CONTAINER_NAME)
+ 
+async def follow_job(job, ctx: Context) -> str:
+    """
+    Relay a job's output and step progress to the client as MCP log and
+    progress notifications until the job finishes
+    """
+    async for event in job.events():
+        if event[0] == "progress":
+            _, completed, total, message = event
+            await ctx.report_progress(progress=completed, total=total or None)
+            if message:
+                await ctx.info(message)
+        else:
+            await ctx.debug(event[1])
+    return job.summary(tail=0)
  
 # ============================================================
-# Create MCP Server
+# Metrics Endpoint
 # ============================================================
-mcp = FastMCP("Containerization MCP Server")
+@mcp.custom_route("/metrics", methods=["GET"])
+async def prometheus_metrics(request: Request) -> PlainTextResponse:
+    """
+    Tool latencies, deploy phase durations, build cache results and job
+    counts in the Prometheus text format
+    """
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
  
 # ============================================================
 # Tool 0 (Guidance / Hint Tool – boosts discoverability)
@@ -48,11 +172,15 @@ mcp = FastMCP("Containerization MCP Server")
         "as a container accessible on localhost."
     )
 )
+@metrics.timed_tool("containerize_and_deploy_python_project")
 def containerize_and_deploy_python_project() -> str:
     return (
         "To containerize and deploy a Python application locally, follow these steps:\n"
         "1. Prepare the Python project for Docker containerization\n"
-        "2. Build the Docker image and deploy the application\n\n"
+        "2. Build the Docker image and deploy the application\n"
+        "3. Follow the build/deploy job until it completes\n"
+        "4. Optionally roll the image out to Kubernetes with several replicas\n"
+        "5. Watch the running container's logs and resource stats\n\n"
         "I can perform these steps for you."
     )
  
@@ -62,11 +190,20 @@ def containerize_and_deploy_python_project() -> str:
 @mcp.tool(
     name="prepare_python_project_for_docker",
     description=(
-        "Prepares a Python project for Docker by copying a Dockerfile template "
-        "into the project manifest directory."
+        "Prepares a Python project for Docker by inspecting it (requirements, "
+        "ASGI entry point, port) and rendering an optimized multi-stage "
+        "Dockerfile into the project manifest directory, plus a .dockerignore "
+        "that keeps the build context to what the application imports. Set buildkit=false "
+        "to avoid BuildKit-only syntax such as pip cache mounts. With wheelhouse=true "
+        "(the default) dependencies are locked once per requirements.txt and installed "
+        "offline from a wheelhouse shared by all projects; wheelhouse=false lets pip "
+        "resolve and download them inside every build. fast_start=true (the default) "
+        "bakes bytecode for the application and every dependency that is never "
+        "checked against the sources, cutting container cold start."
     )
 )
-def prepare_python_project_for_docker() -> str:
+@metrics.timed_tool("prepare_python_project_for_docker")
+def prepare_python_project_for_docker(buildkit: bool = True, wheelhouse: bool = True, fast_start: bool = True) -> str:
     print("🛠️ prepare_python_project_for_docker invoked")
  
     if not os.path.exists(PROJECT_PATH):
@@ -75,17 +212,48 @@ def prepare_python_project_for_docker() -> str:
     if not os.path.exists(TEMPLATE_DOCKERFILE_PATH):
         return f"❌ Dockerfile template not found at: {TEMPLATE_DOCKERFILE_PATH}"
  
+    phases = metrics.Phases("prepare")
+    try:
+        with phases.time("inspect"):
+            spec = containerize.inspect_project(PROJECT_PATH)
+    except FileNotFoundError:
+        return f"❌ requirements.txt not found in: {PROJECT_PATH}"
+ 
     manifest_dir = os.path.join(PROJECT_PATH, "manifest")
     os.makedirs(manifest_dir, exist_ok=True)
  
     destination = os.path.join(manifest_dir, "Dockerfile")
-    shutil.copyfile(TEMPLATE_DOCKERFILE_PATH, destination)
+    with phases.time("render"):
+        with open(destination, "w", encoding="utf-8") as f:
+            f.write(containerize.render_dockerfile(spec, TEMPLATE_DOCKERFILE_PATH, buildkit, wheelhouse, fast_start))
+        containerize.save_project_spec(manifest_dir, spec)
  
+    # Only what the application imports is sent to the daemon
+    with phases.time("dockerignore"):
+        dockerignore = build_context.generate_dockerignore(PROJECT_PATH, spec)
+        with open(os.path.join(PROJECT_PATH, build_context.DOCKERIGNORE_NAME), "w", encoding="utf-8") as f:
+            f.write(dockerignore)
+    kept = sum(1 for line in dockerignore.splitlines() if line.startswith("!"))
+ 
+    warnings = "".join(f"⚠️ {warning}\n" for warning in spec["warnings"])
+    dependencies = (
+        f"🔒 Dependencies: locked on first build, then installed offline from {WHEELHOUSE_PATH}\n"
+        if wheelhouse else ""
+    )
     return (
         "✅ Python project prepared for Docker successfully.\n"
-        f"📄 Dockerfile template copied to: {destination}\n"
+        f"📄 Dockerfile rendered to: {destination}\n"
+        f"🐍 Python {spec['python_version']} | 🚪 Entry point: {spec['entry_point']} "
+        f"| 🔌 Port: {spec['port']}\n"
+        f"🏗️ Multi-stage build (wheels → deps → runtime), "
+        f"{'BuildKit pip cache mounts, ' if buildkit and not wheelhouse else ''}precompiled bytecode"
+        f"{' for the app and all dependencies, unchecked (fast start)' if fast_start else ''}\n"
+        f"{dependencies}"
+        f"🙈 .dockerignore generated: build context limited to {kept} imported files\n"
+        f"{warnings}"
         "📦 The project is now ready for containerization.\n"
-        "➡️ Next recommended step: build and deploy the Python application."
+        "➡️ Next recommended step: build and deploy the Python application.\n"
+        f"{phases.report()}"
     )
  
 # ============================================================
@@ -95,12 +263,44 @@ def prepare_python_project_for_docker() -> str:
     name="build_and_deploy_python_application",
     description=(
         "Builds a Docker image for a Python application and deploys it "
-        "as a running container accessible on localhost."
+        "as a running container accessible on localhost. Runs as a background "
+        "job and returns a job ID; use get_job_status to follow it. "
+        "Set wait=true to stream build progress and wait for the result. "
+        "strategy=\"blue_green\" redeploys with zero downtime: the new container "
+        "must pass /health before traffic is switched, otherwise it is rolled back. "
+        "replicas=N runs N containers behind a local load balancer "
+        "(balancing=\"round_robin\" or \"least_connections\") on the same port. "
+        "Billing data lives on a persistent volume shared by all replicas "
+        "and kept across redeploys; each container runs one worker per CPU "
+        "it is allowed. Dependencies come from the locked wheelhouse when the "
+        "project was prepared for it; refresh_dependencies=true re-resolves "
+        "them from the package index to pick up new releases. The result reports "
+        "the cold start (container start to first healthy response); "
+        "profile_imports=true also profiles the entry module's imports in the "
+        "new container (python -X importtime)."
     )
 )
-def build_and_deploy_python_application() -> str:
+@metrics.timed_tool("build_and_deploy_python_application")
+async def build_and_deploy_python_application(
+    ctx: Context,
+    wait: bool = False,
+    strategy: str = "recreate",
+    replicas: int = 1,
+    balancing: str = "round_robin",
+    refresh_dependencies: bool = False,
+    profile_imports: bool = False
+) -> str:
     print("🐳 build_and_deploy_python_application invoked")
  
+    if strategy not in DEPLOY_STRATEGIES:
+        return f"❌ Unknown deploy strategy: {strategy}. Use one of: {', '.join(DEPLOY_STRATEGIES)}"
+ 
+    if not 1 <= replicas <= MAX_LOCAL_REPLICAS:
+        return f"❌ replicas must be between 1 and {MAX_LOCAL_REPLICAS}."
+ 
+    if balancing not in BALANCING_MODES:
+        return f"❌ Unknown balancing mode: {balancing}. Use one of: {', '.join(BALANCING_MODES)}"
+ 
     dockerfile_path = os.path.join(PROJECT_PATH, "manifest", "Dockerfile")
  
     if not os.path.exists(dockerfile_path):
@@ -109,53 +309,208 @@ def build_and_deploy_python_application() -> str:
             "➡️ Please prepare the project for Docker first."
         )
  
-    try:
-        wsl_project_path = windows_to_wsl_path(PROJECT_PATH)
-        wsl_dockerfile_path = windows_to_wsl_path(dockerfile_path)
- 
-        # Remove existing container if present
-        subprocess.run(
-            ["wsl", "docker", "rm", "-f", CONTAINER_NAME],
-            capture_output=True,
-            text=True
+    spec = containerize.load_project_spec(os.path.dirname(dockerfile_path))
+    container_port = spec.get("port", APP_PORT)
+    ports = {container_port: APP_PORT}
+    profile_module = spec.get("entry_point", "").partition(":")[0] if profile_imports else None
+ 
+    async def deploy(job):
+        backend = await get_docker_backend()
+        if strategy == "blue_green" or replicas > 1:
+            deployment.proxy.balancing = balancing
+            return await bluegreen.blue_green_deploy(
+                job, backend, deployment, PROJECT_PATH, dockerfile_path, IMAGE_NAME, CONTAINER_NAME,
+                BUILD_CACHE_PATH, container_port, replicas, HEALTH_PATH, HEALTH_TIMEOUT_SECONDS,
+                DRAIN_TIMEOUT_SECONDS, {DATA_VOLUME: DATA_MOUNT_PATH}, DATA_ENVIRONMENT,
+                shared_wheelhouse, refresh_dependencies, profile_module
+            )
+        if deployment.proxy.running:
+            # Leaving the proxy: the container takes APP_PORT back
+            await bluegreen.shutdown(backend, deployment)
+        return await docker_build.build_and_deploy(
+            job, backend, PROJECT_PATH, dockerfile_path, IMAGE_NAME, CONTAINER_NAME, BUILD_CACHE_PATH, ports,
+            {DATA_VOLUME: DATA_MOUNT_PATH}, DATA_ENVIRONMENT, HEALTH_PATH, HEALTH_TIMEOUT_SECONDS,
+            shared_wheelhouse, refresh_dependencies, profile_module
         )
  
-        # Build Docker image
-        build_cmd = [
-            "wsl", "docker", "build",
-            "-f", wsl_dockerfile_path,
-            "-t", IMAGE_NAME,
-            wsl_project_path
-        ]
-        build = subprocess.run(build_cmd, capture_output=True, text=True)
- 
-        if build.returncode != 0:
-            return f"❌ Docker image build failed:\n{build.stderr}"
- 
-        # Run Docker container with port exposure
-        run_cmd = [
-            "wsl", "docker", "run",
-            "-d",
-            "--name", CONTAINER_NAME,
-            "-p", "8001:8001",
-            IMAGE_NAME
-        ]
-        run = subprocess.run(run_cmd, capture_output=True, text=True)
- 
-        if run.returncode != 0:
-            return f"❌ Docker container failed to start:\n{run.stderr}"
+    try:
+        job = jobs.submit("build_and_deploy", deploy, key=CONTAINER_NAME)
+    except QueueFullError as e:
+        return f"❌ Build queue is full ({e}). Try again once a job finishes."
  
-        return (
-            "✅ Python application deployed successfully using Docker.\n"
-            f"🐳 Image: {IMAGE_NAME}\n"
-            f"📦 Container: {CONTAINER_NAME}\n"
-            f"🆔 Container ID: {run.stdout.strip()}\n"
-            f"🌐 Application URL: http://localhost:8000\n"
-            f"📘 API Docs (if FastAPI): http://localhost:8000/docs"
+    if wait:
+        return await follow_job(job, ctx)
+ 
+    return (
+        "🕒 Build and deploy job queued.\n"
+        f"🆔 Job ID: {job.id}\n"
+        "➡️ Use get_job_status with this job ID to follow progress, "
+        "or cancel_job to stop it."
+    )
+ 
+# ============================================================
+# Tool 3: Job Status
+# ============================================================
+@mcp.tool(
+    name="get_job_status",
+    description=(
+        "Reports the status, recent output and result of a build/deploy job. "
+        "Without a job ID, lists all known jobs. Set wait=true to stream the "
+        "job's progress until it finishes."
+    )
+)
+@metrics.timed_tool("get_job_status")
+async def get_job_status(ctx: Context, job_id: str = "", wait: bool = False) -> str:
+    if not job_id:
+        known = jobs.list()
+        if not known:
+            return "📭 No jobs have been submitted yet."
+        return "\n".join(
+            f"🆔 {job.id} | {job.kind} | {job.status} | {job.elapsed:.1f}s" for job in known
         )
  
-    except FileNotFoundError:
-        return "❌ Docker is not installed or not accessible via WSL."
+    job = jobs.get(job_id)
+    if job is None:
+        return f"❌ Unknown job ID: {job_id}"
+    if wait and not job.finished:
+        return await follow_job(job, ctx)
+    return job.summary()
+ 
+# ============================================================
+# Tool 4: Cancel Job
+# ============================================================
+@mcp.tool(
+    name="cancel_job",
+    description="Cancels a queued or running build/deploy job."
+)
+@metrics.timed_tool("cancel_job")
+async def cancel_job(job_id: str) -> str:
+    job = jobs.get(job_id)
+    if job is None:
+        return f"❌ Unknown job ID: {job_id}"
+    if not jobs.cancel(job_id):
+        return f"ℹ️ Job {job_id} already finished with status: {job.status}"
+    return f"🛑 Cancellation requested for job {job_id}."
+ 
+# ============================================================
+# Tool 5: Deploy to Kubernetes
+# ============================================================
+@mcp.tool(
+    name="deploy_python_application_to_kubernetes",
+    description=(
+        "Rolls the built image out to Kubernetes: renders Deployment, Service "
+        "and (when max_replicas > replicas) HorizontalPodAutoscaler manifests "
+        "with resource limits, /health probes and a surge-first rolling update, "
+        "applies them with server-side apply and waits for the rollout. "
+        "Runs as a background job; set wait=true to follow it."
+    )
+)
+@metrics.timed_tool("deploy_python_application_to_kubernetes")
+async def deploy_python_application_to_kubernetes(
+    ctx: Context,
+    replicas: int = 2,
+    max_replicas: int = 0,
+    image: str = "",
+    wait: bool = False
+) -> str:
+    print("☸️ deploy_python_application_to_kubernetes invoked")
+ 
+    if replicas < 1:
+        return "❌ replicas must be at least 1."
+ 
+    if not os.path.isdir(K8S_TEMPLATE_DIR):
+        return f"❌ Kubernetes templates not found at: {K8S_TEMPLATE_DIR}"
+ 
+    manifest_dir = os.path.join(PROJECT_PATH, "manifest")
+    spec = containerize.load_project_spec(manifest_dir)
+    if not image:
+        # Roll out the exact build, not whatever the floating tag points at
+        built = build_cache.load_manifest(BUILD_CACHE_PATH).get("built") or {}
+        image = built.get("tag") or IMAGE_NAME
+ 
+    settings = {
+        "image": image,
+        "port": spec.get("port", APP_PORT),
+        "replicas": replicas,
+        "max_replicas": max_replicas,
+        "health_path": HEALTH_PATH,
+    }
+ 
+    async def rollout(job):
+        client = k8s_deploy.KubeClient(K8S_API_SERVER, K8S_TOKEN, K8S_NAMESPACE, K8S_CA_FILE)
+        try:
+            return await k8s_deploy.deploy(
+                job, client, K8S_TEMPLATE_DIR, K8S_APP_NAME, settings, K8S_ROLLOUT_TIMEOUT_SECONDS
+            )
+        finally:
+            await client.close()
+ 
+    try:
+        job = jobs.submit("k8s_deploy", rollout, key=f"k8s/{K8S_NAMESPACE}/{K8S_APP_NAME}")
+    except QueueFullError as e:
+        return f"❌ Build queue is full ({e}). Try again once a job finishes."
+ 
+    if wait:
+        return await follow_job(job, ctx)
+ 
+    return (
+        "🕒 Kubernetes rollout job queued.\n"
+        f"🆔 Job ID: {job.id}\n"
+        "➡️ Use get_job_status with this job ID to follow progress, "
+        "or cancel_job to stop it."
+    )
+ 
+# ============================================================
+# Tool 6: Container Logs
+# ============================================================
+@mcp.tool(
+    name="tail_container_logs",
+    description=(
+        "Returns new log lines of a deployed container (default: the application, "
+        "or its first replica). Logs are followed in the background into a bounded "
+        "buffer; every answer ends with a cursor, and passing it back as since= "
+        "returns only lines logged after it. limit caps the lines returned (newest "
+        "kept); wait_seconds waits for new lines when there are none yet."
+    )
+)
+@metrics.timed_tool("tail_container_logs")
+async def tail_container_logs(
+    container: str = "",
+    since: int = 0,
+    limit: int = 100,
+    wait_seconds: float = 0
+) -> str:
+    if not 1 <= limit <= CONTAINER_LOG_LINES:
+        return f"❌ limit must be between 1 and {CONTAINER_LOG_LINES}."
+    monitor = monitors.get(await get_docker_backend(), live_container(container))
+    lines, skipped, cursor = await monitor.read(LOGS, since, limit, min(wait_seconds, 60))
+    return logs_report(monitor, lines, skipped, cursor)
+ 
+# ============================================================
+# Tool 7: Container Stats
+# ============================================================
+@mcp.tool(
+    name="container_stats",
+    description=(
+        "Returns sampled resource usage of a deployed container (default: the "
+        "application, or its first replica): CPU %, memory and network rates, "
+        "with averages and peaks. Stats are streamed in the background into a "
+        "bounded buffer; pass the returned cursor back as since= to get only "
+        "newer samples, e.g. to compare before and after a redeploy."
+    )
+)
+@metrics.timed_tool("container_stats")
+async def container_stats(
+    container: str = "",
+    since: int = 0,
+    limit: int = 30,
+    wait_seconds: float = 0
+) -> str:
+    if not 1 <= limit <= CONTAINER_STATS_SAMPLES:
+        return f"❌ limit must be between 1 and {CONTAINER_STATS_SAMPLES}."
+    monitor = monitors.get(await get_docker_backend(), live_container(container))
+    samples, skipped, cursor = await monitor.read(STATS, since, limit, min(wait_seconds, 60))
+    return stats_report(monitor, samples, skipped, cursor)
  
 # ============================================================
 # Run MCP Server (HTTP)
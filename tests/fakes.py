@@ -0,0 +1,599 @@
+"""
+In-process stand-ins for the daemons the MCP server talks to, so backends
+can be exercised without Docker installed. Test support only: the tests
+import it as `fakes`, benchmarks.mcp_tools as `tests.fakes`.
+
+    daemon = FakeDockerDaemon()
+    endpoint = await daemon.start()          # tcp://127.0.0.1:<port>
+    backend = EngineApiBackend(endpoint)
+
+FakeKubeApiServer does the same for tools.k8s_deploy.KubeClient.
+
+The fakes speak just enough HTTP/1.1 (keep-alive, Content-Length and chunked
+bodies, streamed chunked responses) for tools.http_pool, and record every
+request they receive.
+"""
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import re
+import tarfile
+import time
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# What `python -X importtime -c "import app.main"` writes, abridged
+IMPORTTIME_SAMPLE = """\
+import time: self [us] | cumulative | imported package
+import time:       412 |        412 |   _io
+import time:       958 |       1370 | encodings
+import time:      1873 |       3105 | site
+import time:     31050 |      31050 |         pydantic_core._pydantic_core
+import time:     42700 |      73750 |       pydantic.main
+import time:     18203 |      91953 |     fastapi.routing
+import time:     60427 |     152380 |   fastapi
+import time:     24418 |      24418 |     starlette.applications
+import time:     98510 |      98510 |       numpy.core
+import time:      4102 |     102612 |     numpy
+import time:      8890 |     111502 |   app.services.rollups
+import time:      9127 |       9127 |   app.api.routes.invoices
+import time:      2105 |     299532 | app.main
+"""
+
+
+# ============================================================
+# Minimal HTTP Server
+# ============================================================
+REASONS = {
+    200: "OK", 201: "Created", 204: "No Content", 304: "Not Modified",
+    400: "Bad Request", 404: "Not Found", 409: "Conflict", 415: "Unsupported Media Type",
+    422: "Unprocessable Entity", 500: "Internal Server Error",
+}
+
+
+class FakeHttpServer:
+    """
+    Subclasses register routes as (method, regex, handler). Handlers receive
+    (match, query, headers, body) and return (status, payload) where payload
+    is bytes, a JSON-serializable object, or an async iterator of bytes
+    (sent chunked).
+    """
+
+    def __init__(self):
+        self.routes = []
+        self.requests = []
+        self.connections = 0
+        self._server = None
+        self._writers = set()
+
+    def route(self, method: str, pattern: str, handler) -> None:
+        self.routes.append((method, re.compile(f"^{pattern}$"), handler))
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0, unix_path: str = None) -> str:
+        if unix_path:
+            self._server = await asyncio.start_unix_server(self._serve, unix_path)
+            return f"unix://{unix_path}"
+        self._server = await asyncio.start_server(self._serve, host, port)
+        bound_port = self._server.sockets[0].getsockname()[1]
+        return f"tcp://{host}:{bound_port}"
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+            # Let connection handlers observe the close and exit
+            while self._writers:
+                await asyncio.sleep(0.01)
+
+    def normalize_path(self, path: str) -> str:
+        return path
+
+    async def _read_body(self, reader, headers) -> bytes:
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = bytearray()
+            while True:
+                size = int((await reader.readline()).split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    await reader.readline()
+                    return bytes(body)
+                body += await reader.readexactly(size)
+                await reader.readexactly(2)
+        length = int(headers.get("content-length", "0"))
+        return await reader.readexactly(length) if length else b""
+
+    async def _serve(self, reader, writer) -> None:
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await self._read_body(reader, headers)
+
+                parts = urlsplit(target)
+                path = self.normalize_path(unquote(parts.path))
+                query = parse_qs(parts.query)
+                self.requests.append((method, path, query))
+                status, payload = await self._dispatch(method, path, query, headers, body)
+                await self._respond(writer, status, payload)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _dispatch(self, method, path, query, headers, body):
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if match and route_method == method:
+                return await handler(match, query, headers, body)
+        return 404, {"message": f"page not found: {method} {path}"}
+
+    async def _respond(self, writer, status, payload) -> None:
+        head = f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}\r\n"
+        if hasattr(payload, "__aiter__"):
+            writer.write((head + "Transfer-Encoding: chunked\r\n\r\n").encode())
+            async for chunk in payload:
+                writer.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                await writer.drain()
+            writer.write(b"0\r\n\r\n")
+        else:
+            if payload is None:
+                data = b""
+            elif isinstance(payload, bytes):
+                data = payload
+            else:
+                data = json.dumps(payload).encode()
+            content_type = "application/json" if payload is not None and not isinstance(payload, bytes) else "text/plain"
+            writer.write(
+                (head + f"Content-Type: {content_type}\r\nContent-Length: {len(data)}\r\n\r\n").encode() + data
+            )
+        await writer.drain()
+
+
+# ============================================================
+# Fake Docker Engine
+# ============================================================
+def _json_lines(messages, delay: float = 0.0):
+    async def stream():
+        for message in messages:
+            if delay:
+                await asyncio.sleep(delay)
+            yield (json.dumps(message) + "\r\n").encode()
+    return stream()
+
+
+def _proto(*fields) -> bytes:
+    """
+    Encode (field number, value) pairs as a protobuf message: ints as
+    varints, str and bytes as length-delimited fields
+    """
+    def varint(value):
+        out = bytearray()
+        while value > 0x7F:
+            out.append(value & 0x7F | 0x80)
+            value >>= 7
+        out.append(value)
+        return bytes(out)
+
+    data = bytearray()
+    for field, value in fields:
+        if isinstance(value, int):
+            data += varint(field << 3) + varint(value)
+        else:
+            value = value.encode() if isinstance(value, str) else value
+            data += varint(field << 3 | 2) + varint(len(value)) + value
+    return bytes(data)
+
+
+def _proto_timestamp(seconds: float) -> bytes:
+    return _proto((1, int(seconds)), (2, int(seconds % 1 * 1e9)))
+
+
+def _buildkit_trace(vertexes=(), logs=()) -> dict:
+    """
+    A version=2 /build progress message: a StatusResponse (vertexes = 1,
+    logs = 3), base64 encoded
+    """
+    status = _proto(*[(1, vertex) for vertex in vertexes], *[(3, log) for log in logs])
+    return {"id": "moby.buildkit.trace", "aux": base64.b64encode(status).decode()}
+
+
+class FakeDockerDaemon(FakeHttpServer):
+    """
+    Implements the subset of the Docker Engine API used by
+    tools.docker_api.EngineApiBackend. Builds "succeed" by hashing the
+    uploaded context; a Dockerfile containing FAIL makes them fail.
+    version=2 builds answer with BuildKit trace messages, unless the daemon
+    was created with buildkit=False (it then reports itself as Windows).
+    Containers log whatever emit_log() gives them and report synthetic
+    stats every stats_interval seconds while running. Every exec exits with
+    exec_result: (exit code, output), by default a short `python -X
+    importtime` profile.
+    """
+
+    def __init__(self, step_delay: float = 0.0, stats_interval: float = 1.0, buildkit: bool = True):
+        super().__init__()
+        self.step_delay = step_delay
+        self.buildkit = buildkit
+        self.stats_interval = stats_interval
+        self.images = {}
+        self.containers = {}
+        self.builds = []
+        self.execs = {}
+        self.exec_result = (0, IMPORTTIME_SAMPLE)
+
+        self.route("GET", r"/_ping", self._ping)
+        self.route("GET", r"/version", self._version)
+        self.route("POST", r"/build", self._build)
+        self.route("GET", r"/images/(?P<name>.+)/json", self._inspect_image)
+        self.route("POST", r"/images/(?P<name>.+)/tag", self._tag_image)
+        self.route("POST", r"/containers/create", self._create_container)
+        self.route("POST", r"/containers/(?P<name>[^/]+)/start", self._start_container)
+        self.route("POST", r"/containers/(?P<name>[^/]+)/stop", self._stop_container)
+        self.route("GET", r"/containers/(?P<name>[^/]+)/json", self._inspect_container)
+        self.route("GET", r"/containers/(?P<name>[^/]+)/logs", self._container_logs)
+        self.route("GET", r"/containers/(?P<name>[^/]+)/stats", self._container_stats)
+        self.route("DELETE", r"/containers/(?P<name>[^/]+)", self._remove_container)
+        self.route("POST", r"/containers/(?P<name>[^/]+)/exec", self._create_exec)
+        self.route("POST", r"/exec/(?P<id>[^/]+)/start", self._start_exec)
+        self.route("GET", r"/exec/(?P<id>[^/]+)/json", self._inspect_exec)
+
+    def normalize_path(self, path: str) -> str:
+        return re.sub(r"^/v\d+\.\d+", "", path)
+
+    def _find_container(self, name_or_id: str):
+        if name_or_id in self.containers:
+            return self.containers[name_or_id]
+        for container in self.containers.values():
+            if container["Id"].startswith(name_or_id):
+                return container
+        return None
+
+    async def _ping(self, match, query, headers, body):
+        return 200, b"OK"
+
+    async def _version(self, match, query, headers, body):
+        return 200, {
+            "Version": "fake", "ApiVersion": "1.41", "Arch": "amd64", "Os": "linux" if self.buildkit else "windows",
+        }
+
+    async def _build(self, match, query, headers, body):
+        dockerfile_name = query.get("dockerfile", ["Dockerfile"])[0]
+        with tarfile.open(fileobj=io.BytesIO(body)) as tar:
+            members = tar.getnames()
+            member = tar.extractfile(dockerfile_name) if dockerfile_name in members else None
+            dockerfile = member.read().decode() if member else ""
+        version = query.get("version", ["1"])[0]
+        self.builds.append({"tags": query.get("t", []), "files": members, "size": len(body), "version": version})
+
+        if version == "2" and not self.buildkit:
+            return 400, {"message": "buildkit not supported by daemon"}
+        if not dockerfile:
+            return 200, _json_lines([{"error": f"Cannot locate specified Dockerfile: {dockerfile_name}"}])
+
+        instructions = [
+            line.strip() for line in dockerfile.splitlines()
+            if line.strip() and not line.strip().startswith("#")
+        ]
+        image_id = "sha256:" + hashlib.sha256(body).hexdigest()
+        if version == "2":
+            return 200, _json_lines(self._buildkit_messages(instructions, image_id, query), self.step_delay)
+
+        messages = []
+        for index, instruction in enumerate(instructions, start=1):
+            messages.append({"stream": f"Step {index}/{len(instructions)} : {instruction}\n"})
+            if "FAIL" in instruction:
+                messages.append({"error": f"The command '{instruction}' returned a non-zero code: 1"})
+                return 200, _json_lines(messages, self.step_delay)
+            messages.append({"stream": f" ---> {hashlib.sha256(instruction.encode()).hexdigest()[:12]}\n"})
+
+        self._tag_built(image_id, query)
+        messages.append({"aux": {"ID": image_id}})
+        messages.append({"stream": f"Successfully built {image_id[7:19]}\n"})
+        return 200, _json_lines(messages, self.step_delay)
+
+    def _buildkit_messages(self, instructions, image_id: str, query):
+        """
+        What BuildKit streams for the instructions: each step's vertex once
+        started and once completed (or failed), with a log line for RUN steps
+        """
+        messages = []
+        for index, instruction in enumerate(instructions, start=1):
+            digest = "sha256:" + hashlib.sha256(instruction.encode()).hexdigest()
+            name = f"[{index}/{len(instructions)}] {instruction}"
+            started = _proto_timestamp(time.time())
+            messages.append(_buildkit_trace([_proto((1, digest), (3, name), (5, started))]))
+            if instruction.startswith("RUN"):
+                messages.append(_buildkit_trace(logs=[_proto((1, digest), (3, 1), (4, f"ran {instruction[4:]}\n"))]))
+            if "FAIL" in instruction:
+                error = f'process "/bin/sh -c {instruction[4:]}" did not complete successfully: exit code: 1'
+                messages.append(_buildkit_trace([_proto((1, digest), (3, name), (5, started), (7, error))]))
+                messages.append({"errorDetail": {"message": error}, "error": error})
+                return messages
+            completed = _proto_timestamp(time.time())
+            messages.append(_buildkit_trace([_proto((1, digest), (3, name), (5, started), (6, completed))]))
+
+        self._tag_built(image_id, query)
+        messages.append({"id": "moby.image.id", "aux": {"ID": image_id}})
+        return messages
+
+    def _tag_built(self, image_id: str, query) -> None:
+        for tag in query.get("t", []):
+            self.images[tag if ":" in tag.split("/")[-1] else f"{tag}:latest"] = image_id
+
+    async def _inspect_image(self, match, query, headers, body):
+        name = match["name"]
+        image_id = self.images.get(name) or self.images.get(f"{name}:latest")
+        if image_id is None and name in self.images.values():
+            image_id = name
+        if image_id is None:
+            return 404, {"message": f"No such image: {name}"}
+        return 200, {"Id": image_id, "RepoTags": [t for t, i in self.images.items() if i == image_id]}
+
+    async def _tag_image(self, match, query, headers, body):
+        source = match["name"]
+        image_id = self.images.get(source) or self.images.get(f"{source}:latest")
+        if image_id is None:
+            return 404, {"message": f"No such image: {source}"}
+        self.images[f"{query['repo'][0]}:{query.get('tag', ['latest'])[0]}"] = image_id
+        return 201, None
+
+    async def _create_container(self, match, query, headers, body):
+        name = query.get("name", [""])[0]
+        config = json.loads(body)
+        if name in self.containers:
+            return 409, {"message": f'Conflict. The container name "/{name}" is already in use'}
+        image = config["Image"]
+        image_id = self.images.get(image) or self.images.get(f"{image}:latest")
+        if image_id is None:
+            return 404, {"message": f"No such image: {image}"}
+        container_id = hashlib.sha256(f"{name}{time.time()}".encode()).hexdigest()
+        self.containers[name] = {
+            "Id": container_id,
+            "Name": f"/{name}",
+            "Image": image_id,
+            "Config": config,
+            "State": {"Running": False, "Status": "created"},
+            "Logs": [],
+        }
+        return 201, {"Id": container_id, "Warnings": []}
+
+    async def _start_container(self, match, query, headers, body):
+        container = self._find_container(match["name"])
+        if container is None:
+            return 404, {"message": f"No such container: {match['name']}"}
+        container["State"] = {"Running": True, "Status": "running", "StartedAt": time.time()}
+        return 204, None
+
+    async def _stop_container(self, match, query, headers, body):
+        container = self._find_container(match["name"])
+        if container is None:
+            return 404, {"message": f"No such container: {match['name']}"}
+        container["State"] = {"Running": False, "Status": "exited"}
+        return 204, None
+
+    async def _inspect_container(self, match, query, headers, body):
+        container = self._find_container(match["name"])
+        if container is None:
+            return 404, {"message": f"No such container: {match['name']}"}
+        return 200, container
+
+    def _following(self, name: str, container: dict) -> bool:
+        """
+        Whether a streamed logs/stats response for container goes on
+        """
+        return (
+            self._server.is_serving()
+            and self._find_container(name) is container
+            and container["State"]["Running"]
+        )
+
+    def emit_log(self, name: str, line: str, stream: int = 1) -> None:
+        """
+        Make a container log a line (stream 1: stdout, 2: stderr)
+        """
+        stamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime()) + f".{time.time_ns() % 10 ** 9:09d}Z"
+        self._find_container(name)["Logs"].append((time.time(), stream, f"{stamp} {line}\n"))
+
+    async def _container_logs(self, match, query, headers, body):
+        container = self._find_container(match["name"])
+        if container is None:
+            return 404, {"message": f"No such container: {match['name']}"}
+        logs = container["Logs"]
+        since = float(query.get("since", ["0"])[0])
+        tail = query.get("tail", ["all"])[0]
+        start = 0 if tail == "all" else max(len(logs) - int(tail), 0)
+        follow = query.get("follow", ["0"])[0] in ("1", "true")
+
+        async def stream():
+            position = start
+            while True:
+                while position < len(logs):
+                    logged_at, kind, line = logs[position]
+                    position += 1
+                    if logged_at >= since:
+                        data = line.encode()
+                        # Multiplexed frame, as for containers without a TTY
+                        yield bytes([kind, 0, 0, 0]) + len(data).to_bytes(4, "big") + data
+                if not follow or not self._following(match["name"], container):
+                    return
+                await asyncio.sleep(0.02)
+        return 200, stream()
+
+    async def _container_stats(self, match, query, headers, body):
+        container = self._find_container(match["name"])
+        if container is None:
+            return 404, {"message": f"No such container: {match['name']}"}
+
+        async def stream():
+            cpu = system = received = 0
+            previous = {}
+            while self._following(match["name"], container):
+                cpu += int(self.stats_interval * 0.25e9)
+                system += int(self.stats_interval * 2e9)
+                received += 1500
+                current = {"cpu_usage": {"total_usage": cpu}, "system_cpu_usage": system, "online_cpus": 2}
+                yield (json.dumps({
+                    "cpu_stats": current,
+                    "precpu_stats": previous,
+                    "memory_stats": {"usage": 60 << 20, "limit": 2 << 30, "stats": {"inactive_file": 10 << 20}},
+                    "networks": {"eth0": {"rx_bytes": received, "tx_bytes": received * 2}},
+                }) + "\n").encode()
+                previous = current
+                if query.get("stream", ["1"])[0] in ("0", "false"):
+                    return
+                await asyncio.sleep(self.stats_interval)
+        return 200, stream()
+
+    async def _remove_container(self, match, query, headers, body):
+        container = self._find_container(match["name"])
+        if container is None:
+            return 404, {"message": f"No such container: {match['name']}"}
+        if container["State"]["Running"] and query.get("force", ["0"])[0] not in ("1", "true"):
+            return 409, {"message": "You cannot remove a running container"}
+        del self.containers[container["Name"][1:]]
+        return 204, None
+
+    async def _create_exec(self, match, query, headers, body):
+        container = self._find_container(match["name"])
+        if container is None:
+            return 404, {"message": f"No such container: {match['name']}"}
+        if not container["State"]["Running"]:
+            return 409, {"message": f"Container {container['Id']} is not running"}
+        exec_id = hashlib.sha256(f"{container['Id']}{time.time_ns()}".encode()).hexdigest()
+        self.execs[exec_id] = {"ID": exec_id, "Config": json.loads(body), "Running": False, "ExitCode": None}
+        return 201, {"Id": exec_id}
+
+    async def _start_exec(self, match, query, headers, body):
+        process = self.execs.get(match["id"])
+        if process is None:
+            return 404, {"message": f"No such exec instance: {match['id']}"}
+        code, output = self.exec_result
+        process["ExitCode"] = code
+        data = output.encode()
+        # Multiplexed like a TTY-less container's logs; everything on stderr as importtime writes
+        return 200, bytes([2, 0, 0, 0]) + len(data).to_bytes(4, "big") + data
+
+    async def _inspect_exec(self, match, query, headers, body):
+        process = self.execs.get(match["id"])
+        if process is None:
+            return 404, {"message": f"No such exec instance: {match['id']}"}
+        return 200, process
+
+
+# ============================================================
+# Fake Kubernetes API Server
+# ============================================================
+class FakeKubeApiServer(FakeHttpServer):
+    """
+    Accepts server-side apply patches for namespaced objects and simulates
+    Deployment rollouts: every status read brings `rollout_step` more
+    replicas up to date. Set fail_rollout to report ProgressDeadlineExceeded.
+    Applied manifests are stored as the YAML text received; only the fields
+    the rollout needs (replicas, image) are read back out of it.
+    """
+
+    OBJECT_PATH = r"/(?:api|apis/[^/]+)/(?P<version>[^/]+)/namespaces/(?P<namespace>[^/]+)/(?P<resource>[^/]+)/(?P<name>[^/]+)"
+
+    def __init__(self, rollout_step: int = 1, fail_rollout: bool = False):
+        super().__init__()
+        self.rollout_step = rollout_step
+        self.fail_rollout = fail_rollout
+        self.objects = {}
+        self.applies = []
+
+        self.route("PATCH", self.OBJECT_PATH, self._apply)
+        self.route("GET", self.OBJECT_PATH, self._get)
+        self.route("DELETE", self.OBJECT_PATH, self._delete)
+
+    @staticmethod
+    def _key(match):
+        return match["namespace"], match["resource"], match["name"]
+
+    async def _apply(self, match, query, headers, body):
+        if headers.get("content-type") != "application/apply-patch+yaml":
+            return 415, {"kind": "Status", "message": "server-side apply requires application/apply-patch+yaml"}
+        if not query.get("fieldManager"):
+            return 422, {"kind": "Status", "message": "fieldManager is required for apply requests"}
+        manifest = body.decode()
+        name = re.search(r"^metadata:\n(?:\s+.*\n)*?\s+name: (\S+)", manifest, re.MULTILINE)
+        if not name or name.group(1) != match["name"]:
+            return 400, {"kind": "Status", "message": "metadata.name does not match the request path"}
+        image = re.search(r"^\s+image: (\S*)$", manifest, re.MULTILINE)
+        if match["resource"] == "deployments" and not (image and image.group(1)):
+            return 422, {"kind": "Status", "message": "spec.template.spec.containers[0].image: Required value"}
+        if query.get("dryRun"):
+            return 200, {"metadata": {"name": match["name"]}}
+
+        self.applies.append(self._key(match))
+        previous = self.objects.get(self._key(match))
+        if previous is not None and previous["manifest"] == manifest:
+            return 200, self._render(previous)
+
+        replicas = re.search(r"^  replicas: (\d+)$", manifest, re.MULTILINE)
+        obj = previous or {"generation": 0, "updated": 0, "old": 0}
+        obj["old"] = obj.get("desired", 0)
+        obj.update(
+            resource=match["resource"],
+            name=match["name"],
+            manifest=manifest,
+            generation=obj["generation"] + 1,
+            desired=int(replicas.group(1)) if replicas else 1,
+            updated=0,
+            observed=obj["generation"],
+        )
+        self.objects[self._key(match)] = obj
+        return 200, self._render(obj)
+
+    def _render(self, obj):
+        rendered = {"metadata": {"name": obj["name"], "generation": obj["generation"]}, "spec": {}}
+        if obj["resource"] != "deployments":
+            return rendered
+        rendered["spec"]["replicas"] = obj["desired"]
+        rendered["status"] = {
+            "observedGeneration": obj["observed"],
+            "replicas": obj["updated"] + obj["old"],
+            "updatedReplicas": obj["updated"],
+            "availableReplicas": obj["updated"],
+        }
+        if self.fail_rollout:
+            rendered["status"]["conditions"] = [{
+                "type": "Progressing",
+                "reason": "ProgressDeadlineExceeded",
+                "message": f'ReplicaSet "{obj["name"]}" has timed out progressing.',
+            }]
+        return rendered
+
+    async def _get(self, match, query, headers, body):
+        obj = self.objects.get(self._key(match))
+        if obj is None:
+            return 404, {"kind": "Status", "message": f'{match["resource"]} "{match["name"]}" not found'}
+        if obj["resource"] == "deployments" and not self.fail_rollout:
+            # Advance the simulated rollout one step per status read
+            if obj["observed"] < obj["generation"]:
+                obj["observed"] = obj["generation"]
+            elif obj["updated"] < obj["desired"]:
+                obj["updated"] = min(obj["desired"], obj["updated"] + self.rollout_step)
+            else:
+                obj["old"] = 0
+        return 200, self._render(obj)
+
+    async def _delete(self, match, query, headers, body):
+        if self.objects.pop(self._key(match), None) is None:
+            return 404, {"kind": "Status", "message": f'{match["resource"]} "{match["name"]}" not found'}
+        return 200, {"kind": "Status", "status": "Success"}
@@ -0,0 +1,132 @@
+"""
+tools.bluegreen against fakes.FakeDockerDaemon: a new color that does
+not become healthy is rolled back and the live one keeps serving; a healthy
+one takes the traffic and the old color is retired once drained.
+"""
+import asyncio
+
+import pytest
+
+from fakes import FakeDockerDaemon
+from tools import bluegreen, health
+from tools.docker_api import EngineApiBackend
+from tools.jobs import Job, JobFailed
+from tools.proxy import TcpProxy, find_free_port
+
+HOST = bluegreen.UPSTREAM_HOST
+LIVE_PORT = 41001
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / "main.py").write_text("print('hello')\n")
+    (tmp_path / "Dockerfile").write_text('FROM python:3.11-slim\nCOPY main.py .\nCMD ["python", "main.py"]\n')
+    return tmp_path
+
+
+def with_live_blue(scenario, live_port: int = LIVE_PORT):
+    """
+    Run scenario(daemon, backend, deployment) with app-blue-1 serving on
+    live_port behind the proxy
+    """
+    async def main():
+        daemon = FakeDockerDaemon()
+        backend = EngineApiBackend(await daemon.start())
+        proxy = TcpProxy(HOST, find_free_port(), health_path=None)
+        deployment = bluegreen.Deployment(proxy)
+        try:
+            daemon.images["app:live"] = "sha256:live"
+            await backend.run_container("app:live", "app-blue-1", {8000: live_port})
+            proxy.set_upstreams([(HOST, live_port)])
+            await proxy.start()
+            deployment.color, deployment.containers = "blue", ["app-blue-1"]
+            deployment.host_ports, deployment.image_id = [live_port], "sha256:live"
+            return await scenario(daemon, backend, deployment)
+        finally:
+            await proxy.stop()
+            await backend.close()
+            await daemon.stop()
+
+    return asyncio.run(main())
+
+
+def deploy(job, backend, deployment, project, **options):
+    return bluegreen.blue_green_deploy(
+        job, backend, deployment, str(project), str(project / "Dockerfile"), "app", "app",
+        str(project / "manifest" / "build.json"), 8000, **options
+    )
+
+
+def test_unhealthy_replica_rolls_the_new_color_back(project, monkeypatch):
+    wait_until_healthy = health.wait_until_healthy
+    healthy_ports = []
+
+    async def first_replica_healthy(host, port, path, timeout, interval):
+        # The fake daemon publishes no ports: only the first replica answers
+        if not healthy_ports:
+            healthy_ports.append(port)
+            return 0.0
+        return await wait_until_healthy(host, port, path, timeout, interval)
+
+    monkeypatch.setattr(health, "wait_until_healthy", first_replica_healthy)
+
+    async def scenario(daemon, backend, deployment):
+        job = Job("deploy")
+        with pytest.raises(JobFailed) as failure:
+            await deploy(job, backend, deployment, project, replicas=2, health_timeout=0.2)
+        return daemon, deployment, job, str(failure.value)
+
+    daemon, deployment, job, error = with_live_blue(scenario)
+    assert error.startswith("New replica never became healthy (http://127.0.0.1:")
+    assert error.endswith("↩️ Rolled back: app-blue-1 still serving.")
+    assert "↩️ Rolling back: removing app-green-1, app-green-2" in job.log_lines
+
+    # Both green replicas are gone, the healthy one included; blue is untouched
+    assert len(healthy_ports) == 1
+    assert list(daemon.containers) == ["app-blue-1"]
+    assert daemon.containers["app-blue-1"]["State"]["Running"]
+    assert (deployment.color, deployment.containers, deployment.image_id) == ("blue", ["app-blue-1"], "sha256:live")
+    assert [upstream.address for upstream in deployment.proxy.upstreams] == [(HOST, LIVE_PORT)]
+
+
+@pytest.mark.parametrize("client_stays, retired", [
+    (False, "🧹 Retired app-blue-1"),
+    (True, "🧹 Retired app-blue-1 (1 connection(s) still open after 0.3s were cut off)"),
+])
+def test_old_color_is_drained_before_it_is_retired(project, monkeypatch, client_stays, retired):
+    async def healthy(host, port, path, timeout, interval):
+        return 0.0
+
+    monkeypatch.setattr(health, "wait_until_healthy", healthy)
+    live_port = find_free_port(HOST)
+
+    async def scenario(daemon, backend, deployment):
+        answered = asyncio.Event()
+
+        async def slow_request(reader, writer):
+            answered.set()
+            await reader.read()
+            writer.close()
+
+        replica = await asyncio.start_server(slow_request, HOST, live_port)
+        reader, writer = await asyncio.open_connection(HOST, deployment.proxy.port)
+        try:
+            writer.write(b"GET /report HTTP/1.1\r\n\r\n")
+            await answered.wait()
+            if not client_stays:
+                # The request finishes while the new color takes over
+                asyncio.get_running_loop().call_later(0.05, writer.write_eof)
+            job = Job("deploy")
+            report = await deploy(job, backend, deployment, project, drain_timeout=0.3)
+            return daemon, deployment, job, report
+        finally:
+            writer.close()
+            replica.close()
+            await replica.wait_closed()
+
+    daemon, deployment, job, report = with_live_blue(scenario, live_port)
+    assert retired in job.log_lines
+    assert "🧹 Retired: app-blue-1" in report
+    assert list(daemon.containers) == ["app-green-1"]
+    assert (deployment.color, deployment.containers) == ("green", ["app-green-1"])
+    assert [upstream.port for upstream in deployment.proxy.upstreams] == deployment.host_ports
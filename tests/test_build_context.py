@@ -0,0 +1,90 @@
+"""
+The generated .dockerignore kept in step with the application's imports,
+and the tar the context is sent as.
+"""
+import io
+import os
+import tarfile
+
+from tools import build_context, containerize
+
+
+def write(path, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def prepare(project) -> dict:
+    write(project / "requirements.txt", "fastapi\nuvicorn\n")
+    write(project / "app" / "__init__.py", "")
+    write(project / "app" / "main.py", "from fastapi import FastAPI\nfrom app import routes\n\napp = FastAPI()\n")
+    write(project / "app" / "routes.py", "ROUTES = []\n")
+    write(project / "scripts" / "seed.py", "print('not part of the app')\n")
+    spec = containerize.inspect_project(str(project))
+    write(project / build_context.DOCKERIGNORE_NAME, build_context.generate_dockerignore(str(project), spec))
+    # As if prepare ran a while ago
+    os.utime(project / build_context.DOCKERIGNORE_NAME, (1, 1))
+    return spec
+
+
+def context_files(project):
+    return {arcname for arcname, _ in build_context.BuildContext(str(project), str(project / "Dockerfile")).files()}
+
+
+def test_new_import_is_added_to_the_context(tmp_path):
+    spec = prepare(tmp_path)
+    assert "app/routes.py" in context_files(tmp_path)
+
+    write(tmp_path / "app" / "billing.py", "RATE = 0.2\n")
+    with open(tmp_path / "app" / "routes.py", "a", encoding="utf-8") as f:
+        f.write("from app.billing import RATE\n")
+    assert "app/billing.py" not in context_files(tmp_path)
+
+    assert build_context.refresh_dockerignore(str(tmp_path), spec)
+    files = context_files(tmp_path)
+    assert "app/billing.py" in files
+    assert "scripts/seed.py" not in files
+
+
+def test_unchanged_imports_leave_the_file_alone(tmp_path):
+    spec = prepare(tmp_path)
+    path = tmp_path / build_context.DOCKERIGNORE_NAME
+    before = path.read_text()
+
+    # A change that adds no import is checked once, then remembered
+    with open(tmp_path / "app" / "routes.py", "a", encoding="utf-8") as f:
+        f.write("ROUTES.append('/health')\n")
+    assert not build_context.refresh_dockerignore(str(tmp_path), spec)
+    assert path.read_text() == before
+    assert os.path.getmtime(path) > 1
+
+
+def test_hand_written_dockerignore_is_kept(tmp_path):
+    spec = prepare(tmp_path)
+    write(tmp_path / build_context.DOCKERIGNORE_NAME, "scripts\n")
+    os.utime(tmp_path / build_context.DOCKERIGNORE_NAME, (1, 1))
+    assert not build_context.refresh_dockerignore(str(tmp_path), spec)
+    assert (tmp_path / build_context.DOCKERIGNORE_NAME).read_text() == "scripts\n"
+
+
+def test_large_files_are_streamed_in_chunks(tmp_path):
+    prepare(tmp_path)
+    wheel = os.urandom(1_000_003)
+    write(tmp_path / "Dockerfile", "FROM python:3.11-slim\n")
+    (tmp_path / "big.whl").write_bytes(wheel)
+    extra_files = {".wheelhouse/big.whl": str(tmp_path / "big.whl")}
+    context = build_context.BuildContext(str(tmp_path), str(tmp_path / "Dockerfile"), extra_files)
+
+    chunks = list(context.iter_tar(chunk_size=64 * 1024))
+    # The wheel is sent while it is read, not buffered whole
+    assert len(chunks) > 15
+    assert max(map(len, chunks)) < 64 * 1024 + tarfile.RECORDSIZE
+    archive = b"".join(chunks)
+    assert len(archive) % tarfile.RECORDSIZE == 0
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        assert tar.getnames()[:2] == ["manifest/Dockerfile", ".wheelhouse/big.whl"]
+        assert tar.extractfile(".wheelhouse/big.whl").read() == wheel
+        assert {member.mtime for member in tar.getmembers()} == {0}
+    # Deterministic whatever the chunk size
+    assert b"".join(context.iter_tar(chunk_size=1000)) == archive
@@ -0,0 +1,96 @@
+"""
+tools.build_progress.BuildProgress on BuildKit plain and classic builder output.
+"""
+from tools.build_progress import BuildProgress
+
+BUILDKIT_OUTPUT = """\
+#1 [internal] load build definition from Dockerfile
+#1 transferring dockerfile: 512B done
+#1 DONE 0.0s
+#5 [builder 1/3] FROM docker.io/library/python:3.11-slim
+#5 DONE 0.4s
+#6 [builder 2/3] COPY requirements.txt .
+#6 CACHED
+#7 [builder 3/3] RUN pip wheel -r requirements.txt
+#7 0.512 Collecting fastapi
+#7 DONE 12.3s
+#8 [stage-1 1/2] COPY --from=builder /wheels /wheels
+#8 DONE 0.7s
+#9 [stage-1 2/2] RUN pip install /wheels/*
+#9 [stage-1 2/2] RUN pip install /wheels/*
+#9 DONE 3.1s
+"""
+
+CLASSIC_OUTPUT = """\
+Step 1/3 : FROM python:3.11-slim
+ ---> 2f2b1a0c
+Step 2/3 : COPY requirements.txt .
+ ---> Using cache
+ ---> 8d3c9e11
+Step 3/3 : RUN pip install -r requirements.txt
+ ---> Running in 3b1f
+Successfully built 5e6f7a8b
+"""
+
+
+def feed(progress, output):
+    return [message for message in map(progress.feed, output.splitlines()) if message]
+
+
+def test_buildkit_steps_across_stages():
+    progress = BuildProgress()
+    messages = feed(progress, BUILDKIT_OUTPUT)
+    assert messages == [
+        "▶️ [builder 1/3] FROM docker.io/library/python:3.11-slim",
+        "✔️ [builder 1/3] FROM docker.io/library/python:3.11-slim (0.4s)",
+        "▶️ [builder 2/3] COPY requirements.txt .",
+        "♻️ [builder 2/3] COPY requirements.txt . (cached)",
+        "▶️ [builder 3/3] RUN pip wheel -r requirements.txt",
+        "✔️ [builder 3/3] RUN pip wheel -r requirements.txt (12.3s)",
+        "▶️ [stage-1 1/2] COPY --from=builder /wheels /wheels",
+        "✔️ [stage-1 1/2] COPY --from=builder /wheels /wheels (0.7s)",
+        "▶️ [stage-1 2/2] RUN pip install /wheels/*",
+        "✔️ [stage-1 2/2] RUN pip install /wheels/* (3.1s)",
+    ]
+    # Internal vertexes are not steps; a repeated step line counts once
+    assert (progress.completed, progress.total) == (5, 5)
+
+    timings = progress.timings(top=2).splitlines()
+    assert timings[0] == "⏱️ Build steps: 5 finished, 1 cached"
+    assert timings[1:] == [
+        "     12.3s  [builder 3/3] RUN pip wheel -r requirements.txt",
+        "      3.1s  [stage-1 2/2] RUN pip install /wheels/*",
+    ]
+
+
+def test_buildkit_error_is_reported_once():
+    progress = BuildProgress()
+    feed(progress, "#7 [3/4] RUN pip install -r requirements.txt\n")
+    assert progress.feed("#7 ERROR: process did not complete successfully") == (
+        "❌ [3/4] RUN pip install -r requirements.txt: process did not complete successfully"
+    )
+    assert progress.feed("#7 ERROR: process did not complete successfully") is None
+    assert (progress.completed, progress.total) == (1, 4)
+
+
+def test_classic_steps_and_cache_hits():
+    progress = BuildProgress()
+    messages = feed(progress, CLASSIC_OUTPUT)
+    assert messages == [
+        "▶️ [1/3] FROM python:3.11-slim",
+        "▶️ [2/3] COPY requirements.txt .",
+        "♻️ [2/3] COPY requirements.txt . (cached)",
+        "▶️ [3/3] RUN pip install -r requirements.txt",
+    ]
+    # Each step closes the previous one; the last closes when the build ends
+    assert (progress.completed, progress.total) == (2, 3)
+    progress.finish()
+    assert (progress.completed, progress.total) == (3, 3)
+    assert progress.timings().startswith("⏱️ Build steps: 3 finished, 1 cached")
+
+
+def test_nothing_to_report_before_any_step():
+    progress = BuildProgress()
+    assert progress.feed("Sending build context to Docker daemon  2.048kB") is None
+    assert progress.timings() == ""
+    assert (progress.completed, progress.total) == (0, 0)
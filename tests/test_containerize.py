@@ -0,0 +1,114 @@
+"""
+tools.containerize: project inspection and the Dockerfile rendered from it.
+"""
+import os
+
+import pytest
+
+from tools import containerize
+
+TEMPLATE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates", "docker", "Dockerfile")
+
+EXPECTED = """\
+# syntax=docker/dockerfile:1
+# Generated by the containerization MCP server for app.main:app
+
+# ---- wheels: build every dependency wheel once, reusing pip's cache ----
+FROM python:3.12-slim AS wheels
+ENV PIP_DISABLE_PIP_VERSION_CHECK=1
+WORKDIR /wheels
+COPY requirements.txt requirements.txt
+RUN --mount=type=cache,target=/root/.cache/pip pip wheel --wheel-dir /wheels -r requirements.txt
+
+# ---- deps: install the wheels into a self-contained virtualenv ----
+FROM python:3.12-slim AS deps
+ENV PIP_DISABLE_PIP_VERSION_CHECK=1
+COPY --from=wheels /wheels /wheels
+RUN python -m venv /opt/venv \\
+ && /opt/venv/bin/pip install --no-index --find-links=/wheels -r /wheels/requirements.txt
+
+# ---- runtime: interpreter, virtualenv and precompiled application only ----
+FROM python:3.12-slim AS runtime
+ENV PATH=/opt/venv/bin:$PATH \\
+    PYTHONDONTWRITEBYTECODE=1 \\
+    PYTHONUNBUFFERED=1
+WORKDIR /app
+COPY --from=deps /opt/venv /opt/venv
+COPY app ./app
+RUN python -m compileall -q -j 0 app
+
+EXPOSE 8000
+CMD ["python", "-m", "app.serve", "--host", "0.0.0.0", "--port", "8000"]
+"""
+
+
+def write(path, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+@pytest.fixture
+def spec(tmp_path):
+    write(tmp_path / "requirements.txt", "fastapi==0.110.0\nuvicorn[standard]  # server\n\n")
+    write(tmp_path / ".python-version", "3.12.1\n")
+    write(tmp_path / "app" / "__init__.py", "")
+    write(tmp_path / "app" / "main.py", "from fastapi import FastAPI\n\napp = FastAPI()\n")
+    write(
+        tmp_path / "app" / "serve.py",
+        "import uvicorn\n\nif __name__ == '__main__':\n    uvicorn.run('app.main:app', host='0.0.0.0', port=8000)\n",
+    )
+    write(tmp_path / "tests" / "test_main.py", "app = FastAPI()\n")
+    return containerize.inspect_project(str(tmp_path))
+
+
+def render(tmp_path, spec, **options) -> str:
+    """Render the Dockerfile into tmp_path and return its text"""
+    path = tmp_path / "Dockerfile"
+    write(path, containerize.render_dockerfile(spec, TEMPLATE, **options))
+    return path.read_text(encoding="utf-8")
+
+
+def test_inspection(spec):
+    assert spec["entry_point"] == "app.main:app"
+    assert (spec["launcher"], spec["port"], spec["python_version"]) == ("app.serve", 8000, "3.12")
+    assert spec["requirements"] == ["fastapi==0.110.0", "uvicorn[standard]"]
+    # tests/ is never shipped in the image
+    assert spec["sources"] == ["app"]
+
+
+def test_buildkit_dockerfile(tmp_path, spec):
+    assert render(tmp_path, spec) == EXPECTED
+    assert containerize.requires_buildkit(str(tmp_path / "Dockerfile"))
+    assert not containerize.uses_wheelhouse(str(tmp_path / "Dockerfile"))
+
+
+def test_classic_builder_dockerfile(tmp_path, spec):
+    dockerfile = render(tmp_path, spec, buildkit=False)
+    assert dockerfile == EXPECTED.replace(containerize.BUILDKIT_SYNTAX, "").replace(containerize.PIP_CACHE_MOUNT, "")
+    assert not containerize.requires_buildkit(str(tmp_path / "Dockerfile"))
+
+
+def test_wheelhouse_dockerfile(tmp_path, spec):
+    dockerfile = render(tmp_path, spec, wheelhouse=True)
+    assert "# ---- wheels: the locked wheels from the shared wheelhouse, no network needed ----" in dockerfile
+    assert "WORKDIR /wheels\nCOPY .wheelhouse/ ./\n" in dockerfile
+    assert "pip wheel" not in dockerfile
+    assert containerize.uses_wheelhouse(str(tmp_path / "Dockerfile"))
+
+
+def test_fast_start_dockerfile(tmp_path, spec):
+    dockerfile = render(tmp_path, spec, fast_start=True)
+    assert (
+        "RUN python -m venv /opt/venv \\\n"
+        " && /opt/venv/bin/pip install --no-compile --no-index --find-links=/wheels -r /wheels/requirements.txt \\\n"
+        " && /opt/venv/bin/python -m compileall -q -j 0 --invalidation-mode unchecked-hash /opt/venv/lib\n"
+    ) in dockerfile
+    assert "RUN python -m compileall -q -j 0 --invalidation-mode unchecked-hash app\n" in dockerfile
+
+
+def test_without_launcher_uvicorn_serves_the_entry_point(tmp_path, spec):
+    spec = dict(spec, launcher=None, sources=["app", "static"])
+    dockerfile = render(tmp_path, spec)
+    assert dockerfile.endswith('CMD ["uvicorn", "app.main:app", "--host", "0.0.0.0", "--port", "8000"]\n')
+    assert "COPY app ./app\nCOPY static ./static\nRUN python -m compileall -q -j 0 app static\n" in dockerfile
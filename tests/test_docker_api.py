@@ -0,0 +1,242 @@
+"""
+EngineApiBackend against fakes.FakeDockerDaemon.
+"""
+import asyncio
+
+import pytest
+
+from fakes import FakeDockerDaemon
+from tools.build_context import BuildContext
+from tools.build_progress import BuildProgress
+from tools.docker_api import EngineApiBackend
+from tools.docker_cli import DockerError
+
+CLASSIC_DOCKERFILE = """\
+FROM python:3.11-slim
+COPY main.py .
+RUN pip install -r requirements.txt
+CMD ["python", "main.py"]
+"""
+BUILDKIT_DOCKERFILE = "# syntax=docker/dockerfile:1\n" + CLASSIC_DOCKERFILE.replace(
+    "RUN pip", "RUN --mount=type=cache,target=/root/.cache/pip pip"
+)
+
+
+class RecordingFallback:
+    name = "cli"
+
+    def __init__(self):
+        self.builds = []
+
+    async def build(self, context, tags, on_line):
+        self.builds.append(tags)
+        on_line("built by the CLI")
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / "main.py").write_text("print('hello')\n")
+    (tmp_path / "requirements.txt").write_text("fastapi\n")
+    return tmp_path
+
+
+def context_for(project, dockerfile: str) -> BuildContext:
+    path = project / "Dockerfile"
+    path.write_text(dockerfile)
+    return BuildContext(str(project), str(path))
+
+
+def with_daemon(scenario, **options):
+    """
+    Run scenario(daemon, backend) against a fresh fake daemon
+    """
+    async def main():
+        daemon = FakeDockerDaemon(**options)
+        backend = EngineApiBackend(await daemon.start(), fallback=RecordingFallback())
+        try:
+            return await scenario(daemon, backend)
+        finally:
+            await backend.close()
+            await daemon.stop()
+    return asyncio.run(main())
+
+
+# ============================================================
+# Builds
+# ============================================================
+def test_classic_build_streams_steps_and_tags_image(project):
+    async def scenario(daemon, backend):
+        lines = []
+        await backend.build(context_for(project, CLASSIC_DOCKERFILE), ["app:1"], lines.append)
+        assert daemon.builds[-1]["version"] == "1"
+        assert {"Dockerfile", "main.py"} <= set(daemon.builds[-1]["files"])
+        assert await backend.inspect_image_id("app:1") == daemon.images["app:1"]
+        return lines
+
+    lines = with_daemon(scenario, step_delay=0.001)
+    assert lines[0] == "Step 1/4 : FROM python:3.11-slim"
+    assert lines[-1].startswith("Successfully built ")
+    progress = BuildProgress()
+    for line in lines:
+        progress.feed(line)
+    progress.finish()
+    assert (progress.completed, progress.total) == (4, 4)
+
+
+def test_buildkit_dockerfile_builds_through_the_api(project):
+    async def scenario(daemon, backend):
+        lines = []
+        await backend.build(context_for(project, BUILDKIT_DOCKERFILE), ["app:2"], lines.append)
+        assert daemon.builds[-1]["version"] == "2"
+        assert backend.fallback.builds == []
+        assert "app:2" in daemon.images
+        return lines
+
+    lines = with_daemon(scenario)
+    assert lines[0] == "#1 [1/4] FROM python:3.11-slim"
+    assert "#3 ran --mount=type=cache,target=/root/.cache/pip pip install -r requirements.txt" in lines
+    assert lines[-1].startswith("#4 DONE ")
+    progress = BuildProgress()
+    for line in lines:
+        progress.feed(line)
+    progress.finish()
+    assert (progress.completed, progress.total) == (4, 4)
+
+
+def test_buildkit_dockerfile_falls_back_to_cli_without_daemon_buildkit(project):
+    async def scenario(daemon, backend):
+        lines = []
+        await backend.build(context_for(project, BUILDKIT_DOCKERFILE), ["app:3"], lines.append)
+        assert daemon.builds == []
+        assert backend.fallback.builds == [["app:3"]]
+        return lines
+
+    assert with_daemon(scenario, buildkit=False)[-1] == "built by the CLI"
+
+
+@pytest.mark.parametrize("dockerfile, prefix", [
+    (CLASSIC_DOCKERFILE.replace("pip install", "FAIL pip install"), "ERROR: The command 'RUN FAIL"),
+    (BUILDKIT_DOCKERFILE.replace("pip install", "FAIL pip install"), "#3 ERROR: process"),
+])
+def test_failed_build_raises_daemon_error(project, dockerfile, prefix):
+    async def scenario(daemon, backend):
+        lines = []
+        with pytest.raises(DockerError) as failure:
+            await backend.build(context_for(project, dockerfile), ["app:4"], lines.append)
+        assert "app:4" not in daemon.images
+        return lines, str(failure.value)
+
+    lines, message = with_daemon(scenario)
+    assert any(line.startswith(prefix) for line in lines)
+    assert "FAIL pip install" in message
+
+
+def test_rejected_build_raises_the_daemon_message(project):
+    async def main():
+        daemon = FakeDockerDaemon(buildkit=False)
+        backend = EngineApiBackend(await daemon.start())
+        try:
+            with pytest.raises(DockerError, match="^buildkit not supported by daemon$"):
+                await backend.build(context_for(project, BUILDKIT_DOCKERFILE), ["app:5"], lambda line: None)
+        finally:
+            await backend.close()
+            await daemon.stop()
+
+    asyncio.run(main())
+
+
+# ============================================================
+# Containers and Errors
+# ============================================================
+def test_run_and_remove_container(project):
+    async def scenario(daemon, backend):
+        await backend.build(context_for(project, CLASSIC_DOCKERFILE), ["app:1"], lambda line: None)
+        container_id = await backend.run_container(
+            "app:1", "app-blue", {8000: 8001}, volumes={"billing-data": "/data"}, environment={"WORKERS": "2"}
+        )
+        config = daemon.containers["app-blue"]["Config"]
+        assert daemon.containers["app-blue"]["Id"] == container_id
+        assert config["HostConfig"]["PortBindings"] == {"8000/tcp": [{"HostPort": "8001"}]}
+        assert config["HostConfig"]["Binds"] == ["billing-data:/data"]
+        assert config["Env"] == ["WORKERS=2"]
+        assert await backend.running_container_image("app-blue") == daemon.images["app:1"]
+
+        await backend.remove_container("app-blue")
+        assert "app-blue" not in daemon.containers
+        assert await backend.running_container_image("app-blue") == ""
+        # Removing what is already gone is not an error
+        await backend.remove_container("app-blue")
+
+    with_daemon(scenario)
+
+
+def test_daemon_errors_carry_the_daemon_message(project):
+    async def scenario(daemon, backend):
+        with pytest.raises(DockerError, match="^No such image: missing:latest$"):
+            await backend.run_container("missing:latest", "app", {8000: 8001})
+
+        await backend.build(context_for(project, CLASSIC_DOCKERFILE), ["app:1"], lambda line: None)
+        await backend.run_container("app:1", "app", {8000: 8001})
+        with pytest.raises(DockerError, match='The container name "/app" is already in use'):
+            await backend.run_container("app:1", "app", {8000: 8002})
+
+        assert await backend.inspect_image_id("missing:latest") == ""
+
+    with_daemon(scenario)
+
+
+def test_unreachable_daemon_is_a_docker_error():
+    async def main():
+        daemon = FakeDockerDaemon()
+        endpoint = await daemon.start()
+        await daemon.stop()
+        backend = EngineApiBackend(endpoint)
+        try:
+            assert not await backend.ping()
+            with pytest.raises(DockerError, match="^Docker Engine API unreachable at "):
+                await backend.architecture()
+        finally:
+            await backend.close()
+
+    asyncio.run(main())
+
+
+def test_calls_reuse_one_keep_alive_connection(project):
+    async def scenario(daemon, backend):
+        await backend.build(context_for(project, CLASSIC_DOCKERFILE), ["app:1"], lambda line: None)
+        for color in ("blue", "green", "blue", "green"):
+            await backend.run_container("app:1", f"app-{color}", {8000: 8001})
+            await backend.running_container_image(f"app-{color}")
+            await backend.remove_container(f"app-{color}")
+        assert await backend.architecture() == "amd64"
+        assert backend.http.connections_opened == 1
+        assert daemon.connections == 1
+        assert len(daemon.requests) == 18
+
+    with_daemon(scenario)
+
+
+def test_followed_streams_leave_room_for_exec(project):
+    async def scenario(daemon, backend):
+        await backend.build(context_for(project, CLASSIC_DOCKERFILE), ["app:1"], lambda line: None)
+        follows = []
+        # As many containers as the monitor follows, logs and stats each
+        for n in range(8):
+            await backend.run_container("app:1", f"app-{n}", {8000: 9000 + n})
+            follows.append(asyncio.create_task(backend.follow_logs(f"app-{n}", lambda line: None)))
+            follows.append(asyncio.create_task(backend.follow_stats(f"app-{n}", lambda sample: None)))
+        while backend.following < 16:
+            await asyncio.sleep(0.01)
+        try:
+            code, output = await asyncio.wait_for(backend.exec_in_container("app-0", ["python", "-c", "1"]), 5)
+            assert code == 0 and output
+            # One more follow is refused instead of waiting for a connection
+            with pytest.raises(DockerError, match="^Already following 16 log/stats streams"):
+                await asyncio.wait_for(backend.follow_logs("app-0", lambda line: None), 5)
+        finally:
+            for task in follows:
+                task.cancel()
+            await asyncio.gather(*follows, return_exceptions=True)
+        assert backend.following == 0
+
+    with_daemon(scenario, stats_interval=0.05)
@@ -0,0 +1,29 @@
+"""
+tools.http_pool against a fakes.FakeHttpServer.
+"""
+import asyncio
+
+from fakes import FakeHttpServer
+from tools.http_pool import HttpPool
+
+
+def test_iter_lines_cuts_a_line_that_never_ends():
+    async def endless(match, query, headers, body):
+        async def stream():
+            for _ in range(64):
+                yield b"x" * 16384
+            yield b"\nnext\n"
+        return 200, stream()
+
+    async def main():
+        server = FakeHttpServer()
+        server.route("GET", "/lines", endless)
+        pool = HttpPool(await server.start())
+        try:
+            async with pool.stream("GET", "/lines") as response:
+                return [line async for line in response.iter_lines(max_length=1000)]
+        finally:
+            await pool.close()
+            await server.stop()
+
+    assert asyncio.run(main()) == ["x" * 1000, "next"]
@@ -0,0 +1,116 @@
+"""
+tools.jobs.JobManager: concurrency, per-key ordering and cancellation.
+"""
+import asyncio
+
+import pytest
+
+from tools.jobs import CANCELLED, FAILED, QUEUED, RUNNING, SUCCEEDED, JobFailed, JobManager, QueueFullError
+
+
+def recording(events, name, delay=0.01, gate=None):
+    """A job body that records when it starts and ends"""
+    async def body(job):
+        events.append(("start", name))
+        if gate is not None:
+            await gate.wait()
+        await asyncio.sleep(delay)
+        events.append(("end", name))
+        return name
+    return body
+
+
+async def finished(*jobs):
+    await asyncio.gather(*(job.task for job in jobs))
+
+
+def test_jobs_sharing_a_key_run_one_after_another():
+    async def main():
+        events = []
+        manager = JobManager(max_concurrency=3)
+        first = manager.submit("build", recording(events, "first"), key="app")
+        second = manager.submit("build", recording(events, "second"), key="app")
+        other = manager.submit("build", recording(events, "other"), key="other-app")
+        await finished(first, second, other)
+        assert [job.status for job in (first, second, other)] == [SUCCEEDED] * 3
+        assert second.result == "second"
+        return events
+
+    events = asyncio.run(main())
+    assert events.index(("end", "first")) < events.index(("start", "second"))
+    # A different key does not wait for them
+    assert events.index(("start", "other")) < events.index(("end", "first"))
+
+
+def test_concurrency_is_bounded():
+    async def main():
+        running = []
+        peak = []
+
+        async def body(job):
+            running.append(job.id)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(job.id)
+
+        manager = JobManager(max_concurrency=2, max_pending=10)
+        await finished(*[manager.submit("build", body) for _ in range(6)])
+        return max(peak)
+
+    assert asyncio.run(main()) == 2
+
+
+def test_cancelling_a_running_job_lets_the_next_one_with_its_key_run():
+    async def main():
+        events = []
+        manager = JobManager()
+        stuck = manager.submit("deploy", recording(events, "stuck", gate=asyncio.Event()), key="app")
+        waiting = manager.submit("deploy", recording(events, "waiting"), key="app")
+        queued = manager.submit("deploy", recording(events, "queued"), key="app")
+        await asyncio.sleep(0.01)
+        assert (stuck.status, waiting.status) == (RUNNING, QUEUED)
+
+        # A queued job is cancelled without ever running
+        assert manager.cancel(queued.id)
+        assert manager.cancel(stuck.id)
+        await finished(stuck, waiting, queued)
+        assert [job.status for job in (stuck, waiting, queued)] == [CANCELLED, SUCCEEDED, CANCELLED]
+        assert not manager.cancel(stuck.id)
+        assert not manager.cancel("no-such-job")
+        return events
+
+    assert asyncio.run(main()) == [("start", "stuck"), ("start", "waiting"), ("end", "waiting")]
+
+
+def test_failures_are_recorded():
+    async def main():
+        async def refuses(job):
+            raise JobFailed("Dockerfile not found")
+
+        async def crashes(job):
+            raise KeyError("image")
+
+        manager = JobManager()
+        failed, crashed = manager.submit("build", refuses), manager.submit("build", crashes)
+        await finished(failed, crashed)
+        return failed, crashed
+
+    failed, crashed = asyncio.run(main())
+    assert (failed.status, failed.error) == (FAILED, "Dockerfile not found")
+    assert (crashed.status, crashed.error) == (FAILED, "KeyError: 'image'")
+    assert "❌ Dockerfile not found" in failed.summary()
+
+
+def test_queue_full_is_refused():
+    async def main():
+        gate = asyncio.Event()
+        manager = JobManager(max_concurrency=1, max_pending=2)
+        jobs = [manager.submit("build", recording([], n, gate=gate)) for n in range(2)]
+        with pytest.raises(QueueFullError, match="^2 jobs already queued or running$"):
+            manager.submit("build", recording([], "third"))
+        gate.set()
+        await finished(*jobs)
+        # Finished jobs no longer count
+        await finished(manager.submit("build", recording([], "fourth")))
+
+    asyncio.run(main())
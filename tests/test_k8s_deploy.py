@@ -0,0 +1,112 @@
+"""
+tools.k8s_deploy.deploy() against fakes.FakeKubeApiServer.
+"""
+import asyncio
+import os
+
+import pytest
+
+from fakes import FakeKubeApiServer
+from tools import k8s_deploy
+from tools.jobs import Job, JobFailed
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates", "k8s")
+NAME = "billing-api"
+DEPLOYMENT = ("default", "deployments", NAME)
+SERVICE = ("default", "services", NAME)
+HPA = ("default", "horizontalpodautoscalers", NAME)
+
+
+def with_server(scenario, **options):
+    """
+    Run scenario(server, client) against a fresh fake API server
+    """
+    async def main():
+        server = FakeKubeApiServer(**options)
+        endpoint = await server.start()
+        client = k8s_deploy.KubeClient(endpoint.replace("tcp://", "http://"))
+        try:
+            return await scenario(server, client)
+        finally:
+            await client.close()
+            await server.stop()
+    return asyncio.run(main())
+
+
+def deploy(client, job=None, **settings):
+    return k8s_deploy.deploy(
+        job or Job("k8s_deploy"), client, TEMPLATE_DIR, NAME, {"image": "billing-api:1", **settings},
+        timeout=5.0, poll_interval=0.0
+    )
+
+
+def applied_replicas(server, key=DEPLOYMENT) -> str:
+    manifest = server.objects[key]["manifest"]
+    return next(line.split(":")[1].strip() for line in manifest.splitlines() if line.startswith("  replicas:"))
+
+
+def test_plain_replicas_roll_out_without_hpa():
+    async def scenario(server, client):
+        job = Job("k8s_deploy")
+        result = await deploy(client, job, replicas=3)
+        assert set(server.objects) == {DEPLOYMENT, SERVICE}
+        assert applied_replicas(server) == "3"
+        # One dry run and one real apply per object
+        assert sorted(server.applies) == sorted([DEPLOYMENT, SERVICE])
+        assert job.progress[:2] == (3, 3)
+        # A leftover autoscaler from an earlier autoscaled deploy is removed
+        assert ("DELETE", "/apis/autoscaling/v2/namespaces/default/horizontalpodautoscalers/billing-api", {}) \
+            in server.requests
+        return result
+
+    result = with_server(scenario, rollout_step=1)
+    assert result.startswith(f"✅ {NAME} rolled out to Kubernetes")
+    assert "📦 Replicas: 3 (autoscaling off)" in result
+
+
+def test_autoscaling_applies_hpa():
+    async def scenario(server, client):
+        result = await deploy(client, replicas=2, max_replicas=6, cpu_target=60)
+        assert set(server.objects) == {DEPLOYMENT, SERVICE, HPA}
+        assert "  minReplicas: 2\n  maxReplicas: 6\n" in server.objects[HPA]["manifest"]
+        assert applied_replicas(server) == "2"
+        return result
+
+    assert "📈 Autoscaling: 2-6 replicas at 60% CPU" in with_server(scenario, rollout_step=2)
+
+
+def test_redeploy_keeps_the_replica_count_the_hpa_scaled_to():
+    async def scenario(server, client):
+        await deploy(client, replicas=2, max_replicas=6)
+        # The HPA scaled the deployment up under load
+        server.objects[DEPLOYMENT]["desired"] = 5
+        await deploy(client, image="billing-api:2", replicas=2, max_replicas=6)
+        assert applied_replicas(server) == "5"
+        assert "image: billing-api:2" in server.objects[DEPLOYMENT]["manifest"]
+
+        # Below the minimum the HPA would scale up anyway; apply the minimum
+        server.objects[DEPLOYMENT]["desired"] = 1
+        await deploy(client, image="billing-api:3", replicas=2, max_replicas=6)
+        assert applied_replicas(server) == "2"
+
+    with_server(scenario, rollout_step=5)
+
+
+def test_progress_deadline_exceeded_fails_the_job():
+    async def scenario(server, client):
+        with pytest.raises(JobFailed, match="Rollout exceeded its progress deadline: .*timed out progressing"):
+            await deploy(client, replicas=2)
+        # The objects were applied; only the rollout failed
+        assert DEPLOYMENT in server.objects
+
+    with_server(scenario, fail_rollout=True)
+
+
+def test_invalid_manifest_changes_nothing():
+    async def scenario(server, client):
+        with pytest.raises(JobFailed, match="422 spec.template.spec.containers\\[0\\].image: Required value"):
+            await deploy(client, image="")
+        assert server.objects == {}
+        assert server.applies == []
+
+    with_server(scenario)
@@ -0,0 +1,93 @@
+"""
+tools.proxy.TcpProxy: round-robin and least-connections selection, and
+failing over from replicas that refuse connections.
+"""
+import asyncio
+
+from tools.proxy import UNAVAILABLE_RESPONSE, TcpProxy, find_free_port
+
+HOST = "127.0.0.1"
+
+
+def ports(upstreams):
+    return [upstream.port for upstream in upstreams]
+
+
+def test_round_robin_skips_unhealthy_upstreams():
+    proxy = TcpProxy(HOST, 0)
+    proxy.set_upstreams([(HOST, 1), (HOST, 2), (HOST, 3)])
+    assert ports(proxy.pick() for _ in range(6)) == [1, 2, 3, 1, 2, 3]
+
+    proxy.upstreams[1].healthy = False
+    assert set(ports(proxy.pick() for _ in range(4))) == {1, 3}
+    assert proxy.pick(exclude=[proxy.upstreams[0], proxy.upstreams[2]]) is None
+
+
+def test_least_connections_prefers_idle_upstreams():
+    proxy = TcpProxy(HOST, 0, balancing="least_connections")
+    proxy.set_upstreams([(HOST, 1), (HOST, 2), (HOST, 3)])
+    for upstream, active in zip(proxy.upstreams, (4, 1, 2)):
+        upstream.active = active
+    assert ports(proxy.pick() for _ in range(3)) == [2, 2, 2]
+
+    # Ties are spread rather than always going to the first upstream
+    for upstream in proxy.upstreams:
+        upstream.active = 0
+    assert sorted(ports(proxy.pick() for _ in range(3))) == [1, 2, 3]
+
+
+def test_switching_upstreams_keeps_counters_of_those_that_stay():
+    proxy = TcpProxy(HOST, 0)
+    proxy.set_upstreams([(HOST, 1), (HOST, 2)])
+    proxy.upstreams[1].active = 3
+    removed = proxy.set_upstreams([(HOST, 2), (HOST, 4)])
+    assert ports(removed) == [1]
+    assert [(upstream.port, upstream.active) for upstream in proxy.upstreams] == [(2, 3), (4, 0)]
+
+
+async def start_replica(name: bytes):
+    """A replica that answers every connection with its name"""
+    async def answer(reader, writer):
+        await reader.read(1024)
+        writer.write(name)
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(answer, HOST, 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+async def request(port: int) -> bytes:
+    reader, writer = await asyncio.open_connection(HOST, port)
+    writer.write(b"GET / HTTP/1.1\r\n\r\n")
+    writer.write_eof()
+    response = await reader.read()
+    writer.close()
+    return response
+
+
+def test_connections_are_balanced_and_fail_over():
+    async def main():
+        (blue, blue_port), (green, green_port) = await start_replica(b"blue"), await start_replica(b"green")
+        refusing = find_free_port(HOST)
+        proxy = TcpProxy(HOST, find_free_port(HOST), health_path=None)
+        proxy.set_upstreams([(HOST, blue_port), (HOST, refusing), (HOST, green_port)])
+        await proxy.start()
+        try:
+            answers = [await request(proxy.port) for _ in range(4)]
+            assert await proxy.drain(proxy.upstreams, timeout=1.0)
+            status = [(upstream.healthy, upstream.total, upstream.active) for upstream in proxy.upstreams]
+
+            blue.close()
+            green.close()
+            await asyncio.gather(blue.wait_closed(), green.wait_closed())
+            unavailable = await request(proxy.port)
+        finally:
+            await proxy.stop()
+        return answers, status, unavailable
+
+    answers, status, unavailable = asyncio.run(main())
+    # The refusing replica's turn fails over to another one, and it is skipped after that
+    assert answers == [b"blue", b"blue", b"green", b"blue"]
+    assert status == [(True, 3, 0), (False, 0, 0), (True, 1, 0)]
+    assert unavailable == UNAVAILABLE_RESPONSE
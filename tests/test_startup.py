@@ -0,0 +1,71 @@
+"""
+tools.startup import profiles from `python -X importtime` output.
+"""
+import asyncio
+
+from fakes import IMPORTTIME_SAMPLE, FakeDockerDaemon
+from tools import startup
+from tools.docker_api import EngineApiBackend
+from tools.jobs import Job
+
+REPORT = (
+    "🧩 Import profile of app.main: 300ms in 10 modules — "
+    "numpy 103ms | fastapi 79ms | pydantic 43ms | pydantic_core 31ms | starlette 24ms | app 20ms\n"
+    "🐢 Slowest modules: numpy.core 99ms, fastapi 60ms, pydantic.main 43ms, "
+    "pydantic_core._pydantic_core 31ms, starlette.applications 24ms"
+)
+
+
+def test_parse_importtime():
+    imports = startup.parse_importtime(IMPORTTIME_SAMPLE)
+    # The header line is skipped; nesting comes from the indentation
+    assert len(imports) == 13
+    assert imports[:4] == [
+        ("_io", 412, 412, 1),
+        ("encodings", 958, 1370, 0),
+        ("site", 1873, 3105, 0),
+        ("pydantic_core._pydantic_core", 31050, 31050, 4),
+    ]
+    assert imports[-1] == ("app.main", 2105, 299532, 0)
+
+
+def test_module_imports_leave_out_interpreter_startup():
+    imports = startup.parse_importtime(IMPORTTIME_SAMPLE)
+    own = startup.module_imports(imports, "app.main")
+    assert [name for name, _, _, _ in own] == [
+        "pydantic_core._pydantic_core", "pydantic.main", "fastapi.routing", "fastapi", "starlette.applications",
+        "numpy.core", "numpy", "app.services.rollups", "app.api.routes.invoices", "app.main",
+    ]
+    assert startup.module_imports(imports, "site") == [("site", 1873, 3105, 0)]
+    assert startup.module_imports(imports, "fastapi") == []
+
+
+def test_import_profile_report(monkeypatch):
+    assert startup.import_profile_report(IMPORTTIME_SAMPLE, "app.main") == REPORT
+    assert startup.import_profile_report("", "app.main") == "⚠️ Import profile: no -X importtime output for app.main"
+
+    monkeypatch.setattr(startup, "TOP_PACKAGES", 2)
+    first_line = startup.import_profile_report(IMPORTTIME_SAMPLE, "app.main").splitlines()[0]
+    assert first_line.endswith("— numpy 103ms | fastapi 79ms | other 118ms")
+
+
+def test_profile_imports_in_a_container():
+    async def main():
+        daemon = FakeDockerDaemon()
+        backend = EngineApiBackend(await daemon.start())
+        try:
+            daemon.images["app:latest"] = "sha256:app"
+            await backend.run_container("app", "app-1", {8000: 41002})
+            reports = [await startup.profile_imports(Job("deploy"), backend, "app-1", "app.main")]
+            daemon.exec_result = (1, "Traceback (most recent call last):\nModuleNotFoundError: No module named 'app'\n")
+            reports.append(await startup.profile_imports(Job("deploy"), backend, "app-1", "app.main"))
+            command = next(iter(daemon.execs.values()))["Config"]["Cmd"]
+            return reports, command
+        finally:
+            await backend.close()
+            await daemon.stop()
+
+    (profiled, failed), command = asyncio.run(main())
+    assert command == ["python", "-X", "importtime", "-c", "import app.main"]
+    assert profiled == REPORT
+    assert failed == "⚠️ Import profile failed (exit code 1): ModuleNotFoundError: No module named 'app'"
@@ -0,0 +1,87 @@
+"""
+tools.wheelhouse locks: wheel pins, the lock files and reusing a lock.
+"""
+import asyncio
+import hashlib
+import json
+import os
+
+import pytest
+
+from tools.jobs import Job
+from tools.wheelhouse import Wheelhouse, _wheel_pin, lock_key
+
+CORE_WHEEL = "pydantic_core-2.23.4-cp311-cp311-manylinux_2_17_x86_64.manylinux2014_x86_64.whl"
+WHEELS = {
+    CORE_WHEEL: b"core",
+    "fastapi-0.115.0-py3-none-any.whl": b"fastapi",
+    "uvloop-0.21.0-1-cp311-cp311-manylinux_2_17_x86_64.whl": b"uvloop",
+}
+
+
+@pytest.mark.parametrize("filename, pin", [
+    (CORE_WHEEL, ("pydantic_core", "2.23.4")),
+    ("fastapi-0.115.0-py3-none-any.whl", ("fastapi", "0.115.0")),
+    # A build tag is not part of the version
+    ("uvloop-0.21.0-1-cp311-cp311-manylinux_2_17_x86_64.whl", ("uvloop", "0.21.0")),
+])
+def test_wheel_pin(filename, pin):
+    assert _wheel_pin(filename) == pin
+
+
+def test_lock_key_ignores_requirement_order():
+    assert lock_key(["fastapi", "uvloop"], "3.11", "x86_64") == lock_key(["uvloop", "fastapi"], "3.11", "x86_64")
+    assert lock_key(["fastapi"], "3.11", "x86_64") != lock_key(["fastapi"], "3.12", "x86_64")
+    assert lock_key(["fastapi"], "3.11", "x86_64") != lock_key(["fastapi"], "3.11", "aarch64")
+
+
+@pytest.fixture
+def locked(tmp_path):
+    """A wheelhouse holding the lock of a resolution that downloaded WHEELS"""
+    wheelhouse = Wheelhouse(str(tmp_path / "wheelhouse"))
+    os.makedirs(wheelhouse.wheels_dir)
+    resolved = tmp_path / "wheelhouse" / "resolve-1"
+    resolved.mkdir()
+    for filename, content in WHEELS.items():
+        (resolved / filename).write_bytes(content)
+    (resolved / "fastapi-0.115.0.tar.gz").write_bytes(b"not a wheel")
+    key = lock_key(["uvloop", "fastapi"], "3.11", "x86_64")
+    return wheelhouse, wheelhouse._adopt(str(resolved), key, ["uvloop", "fastapi"], "3.11", "x86_64")
+
+
+def test_lock_files(locked):
+    wheelhouse, lock = locked
+    sha256 = {filename: hashlib.sha256(content).hexdigest() for filename, content in WHEELS.items()}
+    assert sorted(os.listdir(wheelhouse.wheels_dir)) == sorted(WHEELS)
+    assert not os.path.exists(os.path.join(wheelhouse.path, "resolve-1"))
+
+    assert lock["requirements"] == ["fastapi", "uvloop"]
+    assert [(wheel["name"], wheel["version"], wheel["sha256"]) for wheel in lock["wheels"]] == [
+        ("fastapi", "0.115.0", sha256["fastapi-0.115.0-py3-none-any.whl"]),
+        ("pydantic_core", "2.23.4", sha256[CORE_WHEEL]),
+        ("uvloop", "0.21.0", sha256["uvloop-0.21.0-1-cp311-cp311-manylinux_2_17_x86_64.whl"]),
+    ]
+    with open(wheelhouse._lock_path(lock["key"], "json"), encoding="utf-8") as f:
+        assert json.load(f) == lock
+
+    files = wheelhouse.context_files(lock)
+    with open(files[".wheelhouse/requirements.txt"], encoding="utf-8") as f:
+        requirements_txt = f.read()
+    assert requirements_txt == (
+        "# Locked for CPython 3.11 on linux/x86_64 from: fastapi, uvloop\n"
+        + "".join(f"{wheel['name']}=={wheel['version']} --hash=sha256:{wheel['sha256']}\n" for wheel in lock["wheels"])
+    )
+    assert set(files) == {".wheelhouse/requirements.txt", *(f".wheelhouse/{name}" for name in WHEELS)}
+
+
+def test_lock_is_reused_until_a_wheel_goes_missing(locked, tmp_path):
+    wheelhouse, lock = locked
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text("fastapi\nuvloop\n")
+    job = Job("build")
+    # No pip run: the lock for these requirements already exists
+    assert asyncio.run(wheelhouse.ensure_lock(job, str(requirements), "3.11", "amd64")) == lock
+    assert job.log_lines[-1] == f"🔒 Dependencies locked (3 wheels, key {lock['key'][:12]})"
+
+    os.remove(os.path.join(wheelhouse.wheels_dir, "fastapi-0.115.0-py3-none-any.whl"))
+    assert wheelhouse.load_lock(lock["key"]) is None
@@ -0,0 +1,244 @@
+"""
+Zero-downtime blue/green redeploys and local replica sets behind
+tools.proxy.TcpProxy.
+
+The proxy owns the application's public port and balances across the live
+color's replicas. A redeploy builds the image while the live containers keep
+serving, starts the new color's replicas on spare ports, waits for every
+one's /health endpoint, then switches the proxy to them and retires the old
+color once its open connections have drained (or drain_timeout has passed). If any new replica never
+becomes healthy the whole new color is removed and the live one is left
+untouched.
+"""
+import asyncio
+import time
+
+from tools import build_cache, health, startup
+from tools.docker_build import (
+    ensure_image, fingerprint_context, image_report, build_report, up_to_date_report
+)
+from tools.docker_cli import DockerError
+from tools.jobs import JobFailed
+from tools.metrics import build_cache_requests
+from tools.proxy import find_free_port
+
+COLORS = ("blue", "green")
+UPSTREAM_HOST = "127.0.0.1"
+
+
+class Deployment:
+    """
+    What the traffic proxy currently routes to
+    """
+
+    def __init__(self, proxy):
+        self.proxy = proxy
+        self.color = None
+        self.containers = []
+        self.host_ports = []
+        self.image_id = ""
+
+
+def color_containers(container_name: str, color: str, replicas: int):
+    return [f"{container_name}-{color}-{index}" for index in range(1, replicas + 1)]
+
+
+async def _remove_all(backend, containers) -> None:
+    await asyncio.gather(*(backend.remove_container(name) for name in containers))
+
+
+async def _is_up_to_date(backend, deployment: Deployment, image_id: str, replicas: int) -> bool:
+    if not deployment.proxy.running or len(deployment.containers) != replicas:
+        return False
+    running = await asyncio.gather(*(backend.running_container_image(name) for name in deployment.containers))
+    return all(running_image == image_id for running_image in running)
+
+
+class ProxyStartFailed(Exception):
+    """
+    The proxy could not listen on the public port; restarted tells whether
+    the directly published container that held it is serving again
+    """
+
+    def __init__(self, restarted: bool):
+        super().__init__("traffic proxy failed to start")
+        self.restarted = restarted
+
+
+async def _take_over_port(backend, proxy, container_name: str, host_ports) -> None:
+    """
+    First cutover: the public port still belongs to a directly published
+    container. It is stopped rather than removed so that it can be started
+    again if the proxy cannot listen, and only removed once the proxy does.
+    """
+    direct = bool(await backend.running_container_image(container_name))
+    if direct:
+        await backend.stop_container(container_name)
+    proxy.set_upstreams([(UPSTREAM_HOST, port) for port in host_ports])
+    try:
+        await proxy.start()
+    except BaseException as e:
+        if direct:
+            await backend.start_container(container_name)
+        if isinstance(e, OSError):
+            raise ProxyStartFailed(direct) from e
+        raise
+    await backend.remove_container(container_name)
+
+
+async def shutdown(backend, deployment: Deployment) -> None:
+    """
+    Stop the proxy and remove the live replicas, e.g. before switching back
+    to a single directly published container
+    """
+    await deployment.proxy.stop()
+    deployment.proxy.set_upstreams([])
+    await _remove_all(backend, deployment.containers)
+    deployment.color = None
+    deployment.containers = []
+    deployment.host_ports = []
+    deployment.image_id = ""
+
+
+# ============================================================
+# Blue/Green Pipeline
+# ============================================================
+async def blue_green_deploy(
+    job,
+    backend,
+    deployment: Deployment,
+    project_path: str,
+    dockerfile_path: str,
+    image_name: str,
+    container_name: str,
+    cache_path: str,
+    container_port: int,
+    replicas: int = 1,
+    health_path: str = "/health",
+    health_timeout: float = 60.0,
+    drain_timeout: float = 10.0,
+    volumes: dict = None,
+    environment: dict = None,
+    wheelhouse=None,
+    refresh_dependencies: bool = False,
+    profile_module: str = None
+) -> str:
+    try:
+        return await _blue_green_deploy(
+            job, backend, deployment, project_path, dockerfile_path, image_name, container_name,
+            cache_path, container_port, replicas, health_path, health_timeout, drain_timeout,
+            volumes, environment, wheelhouse, refresh_dependencies, profile_module
+        )
+    except DockerError as e:
+        raise JobFailed(str(e))
+
+
+async def _blue_green_deploy(
+    job, backend, deployment, project_path, dockerfile_path, image_name, container_name,
+    cache_path, container_port, replicas, health_path, health_timeout, drain_timeout,
+    volumes, environment, wheelhouse, refresh_dependencies, profile_module
+):
+    proxy = deployment.proxy
+    context, manifest = await fingerprint_context(
+        job, backend, project_path, dockerfile_path, cache_path, wheelhouse, refresh_dependencies
+    )
+
+    if build_cache.is_cache_hit(manifest):
+        if await _is_up_to_date(backend, deployment, manifest["built"]["image_id"], replicas):
+            build_cache_requests.inc(result="up_to_date")
+            return (
+                up_to_date_report(manifest, ", ".join(deployment.containers))
+                + f"\n⚖️ Replicas ({proxy.balancing}): {proxy.status()}"
+            )
+
+    # Build while the live replicas keep serving
+    image = await ensure_image(job, backend, context, manifest, image_name, cache_path)
+
+    color = COLORS[1] if deployment.color == COLORS[0] else COLORS[0]
+    new_containers = color_containers(container_name, color, replicas)
+    host_ports = []
+    for _ in new_containers:
+        port = find_free_port(UPSTREAM_HOST)
+        while port in host_ports:
+            port = find_free_port(UPSTREAM_HOST)
+        host_ports.append(port)
+    with job.phase("remove"):
+        await _remove_all(backend, new_containers)
+
+    job.log(f"🚀 Starting {replicas} {color} replica(s) on ports {', '.join(map(str, host_ports))}")
+    started = time.perf_counter()
+    try:
+        with job.phase("run"):
+            container_ids = await asyncio.gather(*(
+                backend.run_container(image["digest_tag"], name, {container_port: port}, volumes, environment)
+                for name, port in zip(new_containers, host_ports)
+            ))
+    except DockerError as e:
+        await _remove_all(backend, new_containers)
+        raise JobFailed(f"Docker container failed to start:\n{e}")
+
+    # Health-gated cutover: anything short of every replica healthy rolls back
+    job.log(f"🩺 Waiting for {health_path} on {replicas} replica(s)")
+    try:
+        with job.phase("health"):
+            await asyncio.gather(*(
+                health.wait_until_healthy(UPSTREAM_HOST, port, health_path, health_timeout, startup.HEALTH_POLL_SECONDS)
+                for port in host_ports
+            ))
+        # The replicas start together: the slowest one is the deploy's cold start
+        cold_start = startup.record_cold_start(time.perf_counter() - started, "blue_green")
+        if not proxy.running:
+            await _take_over_port(backend, proxy, container_name, host_ports)
+    except BaseException as e:
+        job.log(f"↩️ Rolling back: removing {', '.join(new_containers)}")
+        await _remove_all(backend, new_containers)
+        if isinstance(e, TimeoutError):
+            raise JobFailed(
+                f"New replica never became healthy ({e}).\n"
+                f"↩️ Rolled back: {', '.join(deployment.containers) or 'previous deployment'} still serving."
+            )
+        if isinstance(e, ProxyStartFailed):
+            raise JobFailed(
+                f"Traffic proxy could not listen on port {proxy.port}: {e.__cause__}\n"
+                + (f"↩️ Rolled back: {container_name} restarted and serving again." if e.restarted
+                   else "Nothing is serving on that port.")
+            )
+        raise
+
+    removed = proxy.set_upstreams([(UPSTREAM_HOST, port) for port in host_ports])
+    previous = deployment.containers
+    deployment.color = color
+    deployment.containers = new_containers
+    deployment.host_ports = host_ports
+    deployment.image_id = manifest["built"]["image_id"]
+    job.log(f"🔀 Traffic switched to {', '.join(new_containers)}")
+
+    # Retire the old color once its connections have finished, or drain_timeout has passed:
+    # the proxy only stops routing to it, removing the containers cuts what is still open
+    with job.phase("drain"):
+        drained = await proxy.drain(removed, drain_timeout)
+        still_open = sum(upstream.active for upstream in removed)
+        await _remove_all(backend, previous)
+    if previous:
+        job.log(
+            f"🧹 Retired {', '.join(previous)}"
+            + ("" if drained else f" ({still_open} connection(s) still open after {drain_timeout:g}s were cut off)")
+        )
+
+    # One replica is representative: they all run the same image
+    if profile_module:
+        cold_start += "\n" + await startup.profile_imports(job, backend, new_containers[0], profile_module)
+
+    return (
+        "✅ Python application redeployed with zero downtime (blue/green).\n"
+        f"{image_report(image_name, image)}\n"
+        f"📦 Live replicas ({color}): {', '.join(new_containers)}, all healthy\n"
+        f"{cold_start}\n"
+        f"🆔 Container IDs: {', '.join(container_id[:12] for container_id in container_ids)}\n"
+        f"⚖️ Load balancing: {proxy.balancing} across {replicas} replica(s), "
+        f"health checks on {proxy.health_path}\n"
+        f"🧹 Retired: {', '.join(previous) or 'nothing (first proxied deploy)'}\n"
+        f"🌐 Application URL: http://localhost:{proxy.port}\n"
+        f"📘 API Docs (if FastAPI): http://localhost:{proxy.port}/docs"
+        + build_report(image)
+    )
@@ -0,0 +1,100 @@
+"""
+Content-addressed build cache for the Docker build step.
+
+The build inputs (application sources, requirements.txt and the rendered
+Dockerfile) are fingerprinted into a manifest persisted under the project's
+manifest directory. Files whose mtime and size did not change since the last
+fingerprint keep their previous hash, so an unchanged project costs one
+stat() per file instead of re-reading every byte.
+
+The inputs are exactly the files of the filtered build context (see
+tools.build_context), so files excluded by .dockerignore never trigger a
+rebuild.
+"""
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = ".build-cache.json"
+
+
+# ============================================================
+# Fingerprinting
+# ============================================================
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(context, previous: dict = None) -> dict:
+    """
+    Fingerprint the build inputs, re-hashing only files whose mtime or size
+    changed since the previous manifest. Returns a new manifest carrying the
+    per-file entries and the overall build digest.
+    """
+    previous_files = (previous or {}).get("files", {})
+    files = {}
+    rehashed = 0
+
+    for relative, absolute in context.files():
+        st = os.stat(absolute)
+        old = previous_files.get(relative)
+        if old and old["mtime_ns"] == st.st_mtime_ns and old["size"] == st.st_size:
+            sha = old["sha256"]
+        else:
+            sha = hash_file(absolute)
+            rehashed += 1
+        files[relative] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": sha}
+
+    digest = hashlib.sha256()
+    for relative in sorted(files):
+        digest.update(f"{relative}\0{files[relative]['sha256']}\n".encode())
+
+    manifest = {
+        "digest": digest.hexdigest(),
+        "files": files,
+        "rehashed": rehashed,
+    }
+    if previous and "built" in previous:
+        manifest["built"] = previous["built"]
+    return manifest
+
+
+def image_tag(image_name: str, digest: str) -> str:
+    """
+    Content-addressed tag for an image built from the given digest,
+    e.g. python-app:build-1a2b3c4d5e6f
+    """
+    repository = image_name.rsplit(":", 1)[0] if ":" in image_name.split("/")[-1] else image_name
+    return f"{repository}:build-{digest[:12]}"
+
+
+def is_cache_hit(manifest: dict) -> bool:
+    built = manifest.get("built")
+    return bool(built) and built.get("digest") == manifest["digest"]
+
+
+def record_build(manifest: dict, tag: str, image_id: str) -> None:
+    manifest["built"] = {"digest": manifest["digest"], "tag": tag, "image_id": image_id}
+
+
+# ============================================================
+# Persistence
+# ============================================================
+def load_manifest(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(path: str, manifest: dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
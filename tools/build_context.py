@@ -0,0 +1,439 @@
+"""
+Build context minimization and packaging.
+
+prepare writes a .dockerignore generated from what the application actually
+imports, and every build refreshes it when a file it keeps has changed since
+(an edit may have added an import); the build step then streams a filtered,
+deterministic tar of the project to the daemon instead of pointing it at the
+whole directory:
+
+- only files the .dockerignore keeps are sent (plus the Dockerfile under
+  manifest/Dockerfile, and any extra files from outside the project such as
+  the locked wheels of tools.wheelhouse),
+- entries are sorted and their metadata normalized (mtime, owner, mode), so
+  identical inputs always produce byte-identical tars,
+- the tar is produced chunk by chunk while it is being uploaded.
+"""
+import ast
+import asyncio
+import os
+import re
+import tarfile
+import time
+
+DOCKERFILE_ARCNAME = "manifest/Dockerfile"
+DOCKERIGNORE_NAME = ".dockerignore"
+# First line of the .dockerignore files generate_dockerignore writes
+GENERATED_HEADER = "# Generated by the containerization MCP server"
+
+# Used when the project has no .dockerignore yet
+DEFAULT_IGNORE_PATTERNS = [
+    "manifest",
+    ".git",
+    ".venv",
+    "venv",
+    "**/__pycache__",
+    "**/*.py[cod]",
+    "**/.pytest_cache",
+    "**/.mypy_cache",
+]
+
+CHUNK_SIZE = 256 * 1024
+
+
+# ============================================================
+# .dockerignore Matching
+# ============================================================
+def _translate(pattern: str):
+    """
+    Translate a .dockerignore pattern into a regex using Docker's rules:
+    `*` and `?` stay within one path segment, `**` spans segments.
+    """
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+            continue
+        if c == "*":
+            regex += "[^/]*"
+        elif c == "?":
+            regex += "[^/]"
+        elif c == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                regex += re.escape(c)
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                regex += f"[{body}]"
+                i = end
+        else:
+            regex += re.escape(c)
+        i += 1
+    return re.compile(f"^{regex}$")
+
+
+class DockerIgnore:
+    def __init__(self, patterns):
+        self.rules = []
+        for pattern in patterns:
+            pattern = pattern.strip()
+            if not pattern or pattern.startswith("#"):
+                continue
+            negated = pattern.startswith("!")
+            pattern = os.path.normpath(pattern.lstrip("!").strip()).replace(os.sep, "/").lstrip("/")
+            self.rules.append((negated, pattern, _translate(pattern)))
+
+    @classmethod
+    def load(cls, project_path: str) -> "DockerIgnore":
+        path = os.path.join(project_path, DOCKERIGNORE_NAME)
+        if not os.path.exists(path):
+            return cls(DEFAULT_IGNORE_PATTERNS)
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(f.read().splitlines())
+
+    def ignored(self, relative: str) -> bool:
+        """
+        Last matching rule wins; a rule matching a directory applies to
+        everything below it.
+        """
+        parts = relative.split("/")
+        candidates = ["/".join(parts[:n]) for n in range(1, len(parts) + 1)]
+        ignored = False
+        for negated, _, regex in self.rules:
+            if any(regex.match(candidate) for candidate in candidates):
+                ignored = not negated
+        return ignored
+
+    def can_prune(self, directory: str) -> bool:
+        """
+        True when an ignored directory cannot contain re-included files, so
+        the walk does not need to descend into it.
+        """
+        if not self.ignored(directory):
+            return False
+        for negated, pattern, _ in self.rules:
+            if not negated:
+                continue
+            literal = re.split(r"[*?\[]", pattern, 1)[0]
+            if not literal or literal.startswith(directory + "/") or directory.startswith(literal.rstrip("/")):
+                return False
+        return True
+
+
+# ============================================================
+# Import Analysis
+# ============================================================
+def _resolve_module(project_path: str, module: str):
+    base = module.replace(".", "/")
+    for candidate in (f"{base}.py", f"{base}/__init__.py"):
+        if os.path.isfile(os.path.join(project_path, candidate)):
+            return candidate
+    return None
+
+
+def _imported_modules(tree, package: str):
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                parts = package.split(".") if package else []
+                parts = parts[: len(parts) - (node.level - 1)]
+                base = ".".join(parts + ([node.module] if node.module else []))
+            else:
+                base = node.module or ""
+            if base:
+                yield base
+            for alias in node.names:
+                yield f"{base}.{alias.name}" if base else alias.name
+        elif isinstance(node, ast.Call) and node.args and isinstance(node.args[0], ast.Constant):
+            # importlib.import_module("pkg.mod") / __import__("pkg.mod")
+            func = node.func
+            name = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", "")
+            if name in ("import_module", "__import__") and isinstance(node.args[0].value, str):
+                yield node.args[0].value
+
+
+def find_imported_files(project_path: str, entry_file: str):
+    """
+    Follow imports from the entry module and return the project's own
+    source files it can load, including every package __init__.py on the way.
+    """
+    seen = set()
+    queue = [entry_file]
+    while queue:
+        relative = queue.pop()
+        if relative in seen:
+            continue
+        seen.add(relative)
+
+        parts = relative.split("/")[:-1]
+        for n in range(1, len(parts) + 1):
+            init = "/".join(parts[:n]) + "/__init__.py"
+            if os.path.isfile(os.path.join(project_path, init)):
+                queue.append(init)
+
+        queue += [resolved for resolved in _imported_files(project_path, relative) if resolved not in seen]
+    return sorted(seen)
+
+
+def _imported_files(project_path: str, relative: str):
+    """
+    The project files the module at relative imports directly
+    """
+    with open(os.path.join(project_path, relative), "r", encoding="utf-8", errors="replace") as f:
+        try:
+            tree = ast.parse(f.read())
+        except SyntaxError:
+            return []
+    package = ".".join(relative.split("/")[:-1])
+    resolved = (_resolve_module(project_path, module) for module in _imported_modules(tree, package))
+    return [path for path in resolved if path]
+
+
+def generate_dockerignore(project_path: str, spec: dict) -> str:
+    """
+    Exclude everything except requirements, the modules reachable from the
+    entry point (and launcher), and non-Python data files sitting in those
+    packages.
+    """
+    keep = [spec["requirements_file"]]
+    if spec.get("entry_file"):
+        imported = find_imported_files(project_path, spec["entry_file"])
+        if spec.get("launcher_file"):
+            imported = sorted(set(imported) | set(find_imported_files(project_path, spec["launcher_file"])))
+        keep += imported
+        for directory in sorted({os.path.dirname(relative) for relative in imported if "/" in relative}):
+            for name in sorted(os.listdir(os.path.join(project_path, directory))):
+                path = os.path.join(project_path, directory, name)
+                if os.path.isfile(path) and not name.endswith((".py", ".pyc", ".pyo")):
+                    keep.append(f"{directory}/{name}")
+    else:
+        keep += spec["sources"]
+
+    lines = [
+        f"{GENERATED_HEADER} from the imports of {spec['entry_point']}",
+        "# Everything is excluded, then only what the application needs is re-included.",
+        "*",
+    ]
+    lines += [f"!{path}" for path in keep]
+    lines += ["**/__pycache__", "**/*.py[cod]"]
+    return "\n".join(lines) + "\n"
+
+
+def _changed_since(project_path: str, kept, moment: float):
+    """
+    The kept files, and directories holding them, modified (or removed)
+    after moment
+    """
+    watched = set(kept) | {os.path.dirname(relative) for relative in kept}
+    changed = []
+    for relative in sorted(watched):
+        try:
+            if os.path.getmtime(os.path.join(project_path, relative)) > moment:
+                changed.append(relative)
+        except OSError:
+            changed.append(relative)
+    return changed
+
+
+def refresh_dockerignore(project_path: str, spec: dict) -> bool:
+    """
+    Regenerate a generated .dockerignore when what it keeps changed since it
+    was written: an edited module may import a new one, a package directory
+    may hold a new data file. Unchanged files cost a stat each and edited
+    modules a parse; hand-written .dockerignore files are left alone.
+    Returns True when it was rewritten.
+    """
+    path = os.path.join(project_path, DOCKERIGNORE_NAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            current = f.read()
+        written = os.path.getmtime(path)
+    except OSError:
+        return False
+    if not spec or not current.startswith(GENERATED_HEADER):
+        return False
+    kept = {line[1:] for line in current.splitlines() if line.startswith("!")}
+    changed = _changed_since(project_path, kept, written)
+    if not changed:
+        return False
+
+    def still_covered(relative):
+        return (
+            relative.endswith(".py") and os.path.isfile(os.path.join(project_path, relative))
+            and kept.issuperset(_imported_files(project_path, relative))
+        )
+
+    if all(still_covered(relative) for relative in changed):
+        updated = current
+    else:
+        updated = generate_dockerignore(project_path, spec)
+    if updated == current:
+        # Still right: mark it checked so the same edits are not parsed again
+        os.utime(path)
+        return False
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(updated)
+    return True
+
+
+# ============================================================
+# Build Context
+# ============================================================
+class _ChunkWriter:
+    """
+    Buffer for the tar being produced that hands out what has been written
+    so far in chunks, counting the bytes handed out
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.offset = 0
+
+    def write(self, data) -> int:
+        self.buffer += data
+        return len(data)
+
+    def tell(self) -> int:
+        return self.offset + len(self.buffer)
+
+    def drain(self) -> bytes:
+        data = bytes(self.buffer)
+        self.offset += len(data)
+        self.buffer.clear()
+        return data
+
+
+def _normalized_info(tar, absolute: str, arcname: str):
+    info = tar.gettarinfo(absolute, arcname=arcname)
+    info.mtime = 0
+    info.uid = info.gid = 0
+    info.uname = info.gname = ""
+    info.mode = 0o755 if info.mode & 0o111 else 0o644
+    return info
+
+
+def human_size(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+class BuildContext:
+    def __init__(self, project_path: str, dockerfile_path: str, extra_files: dict = None):
+        """
+        extra_files maps arcname -> absolute path for files sent from outside
+        the project; they take precedence over project files of the same name
+        """
+        self.project_path = project_path
+        self.dockerfile_path = dockerfile_path
+        self.extra_files = extra_files or {}
+        self.ignore = DockerIgnore.load(project_path)
+        self.sent_bytes = 0
+        self.upload_seconds = 0.0
+
+    def files(self):
+        """
+        Yield (arcname, absolute_path) for every file in the context, sorted
+        """
+        yield DOCKERFILE_ARCNAME, self.dockerfile_path
+        for arcname in sorted(self.extra_files):
+            yield arcname, self.extra_files[arcname]
+
+        for root, dirs, files in os.walk(self.project_path):
+            relative_root = os.path.relpath(root, self.project_path).replace(os.sep, "/")
+            prefix = "" if relative_root == "." else relative_root + "/"
+            dirs[:] = sorted(d for d in dirs if not self.ignore.can_prune(prefix + d))
+            for name in sorted(files):
+                relative = prefix + name
+                if not self.ignore.ignored(relative) and relative not in self.extra_files:
+                    yield relative, os.path.join(root, name)
+
+    def raw_size(self) -> int:
+        """
+        Bytes docker would have been sent for the unfiltered project directory
+        """
+        total = 0
+        for root, _, files in os.walk(self.project_path):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+    def extra_size(self) -> int:
+        return sum(os.path.getsize(path) for path in self.extra_files.values())
+
+    def iter_tar(self, chunk_size: int = CHUNK_SIZE):
+        """
+        Yield the context as deterministic tar chunks of about chunk_size
+        bytes. File contents are read chunk by chunk as well, so neither the
+        archive nor any one file in it (a large locked wheel, say) is ever
+        held in memory whole.
+        """
+        sink = _ChunkWriter()
+        # tarfile only builds the headers (file type, hard links, long names); the
+        # members are written here so that a file's data can be yielded as it is read
+        tar = tarfile.TarFile(fileobj=sink, mode="w", format=tarfile.GNU_FORMAT)
+        for arcname, absolute in self.files():
+            info = _normalized_info(tar, absolute, arcname)
+            sink.write(info.tobuf(tar.format, tar.encoding, tar.errors))
+            if info.size:
+                with open(absolute, "rb") as f:
+                    remaining = info.size
+                    while remaining:
+                        data = f.read(min(remaining, chunk_size))
+                        if not data:
+                            raise OSError(f"{absolute} changed size while the build context was sent")
+                        sink.write(data)
+                        remaining -= len(data)
+                        if len(sink.buffer) >= chunk_size:
+                            yield sink.drain()
+                sink.write(tarfile.NUL * (-info.size % tarfile.BLOCKSIZE))
+            if len(sink.buffer) >= chunk_size:
+                yield sink.drain()
+        # End-of-archive blocks, padded to a whole record as tarfile does
+        sink.write(tarfile.NUL * (2 * tarfile.BLOCKSIZE))
+        sink.write(tarfile.NUL * (-sink.tell() % tarfile.RECORDSIZE))
+        yield sink.drain()
+
+    async def stream(self):
+        """
+        Async tar stream that reads files off the event loop and counts the
+        bytes sent and the time until the consumer took the last chunk
+        """
+        started = time.perf_counter()
+        chunks = self.iter_tar()
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            self.sent_bytes += len(chunk)
+            yield chunk
+        self.upload_seconds = time.perf_counter() - started
+
+    def size_report(self, raw_size: int) -> str:
+        # Extra files are sent whole; the saving is on the project directory
+        extra = self.extra_size()
+        project_sent = self.sent_bytes - extra
+        # Tar headers can outweigh tiny projects; never report a negative saving
+        saved = max(0.0, 100 * (1 - project_sent / raw_size)) if raw_size else 0
+        return (
+            f"📦 Build context: {human_size(self.sent_bytes)} sent "
+            f"(project directory {human_size(raw_size)}, {saved:.1f}% trimmed"
+            + (f"; {human_size(extra)} of locked wheels" if extra else "")
+            + ")"
+        )
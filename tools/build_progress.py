@@ -0,0 +1,144 @@
+"""
+Incremental parser for `docker build --progress=plain` output.
+
+BuildKit prints one line per event, prefixed with the vertex number:
+
+    #6 [builder 3/5] COPY requirements.txt .
+    #6 DONE 0.1s
+    #7 [builder 4/5] RUN pip install ...
+    #7 CACHED
+
+The parser keeps one small record per build step (never the raw log), which
+is enough to report "step N of M" progress and per-layer timings. The classic
+builder's "Step 3/5 : COPY ..." lines (as streamed by the Engine API's
+/build endpoint) are understood as well.
+"""
+import re
+import time
+
+STEP_RE = re.compile(r"^#(\d+) \[(?:(\S+) )?(\d+)/(\d+)\] (.*)$")
+DONE_RE = re.compile(r"^#(\d+) DONE (\d+(?:\.\d+)?)s$")
+CACHED_RE = re.compile(r"^#(\d+) CACHED$")
+ERROR_RE = re.compile(r"^#(\d+) ERROR:? ?(.*)$")
+LEGACY_STEP_RE = re.compile(r"^Step (\d+)/(\d+) : (.*)$")
+LEGACY_CACHED_RE = re.compile(r"^ ---> Using cache$")
+
+
+class BuildStep:
+    __slots__ = ("stage", "index", "total", "instruction", "started", "duration", "cached", "error")
+
+    def __init__(self, stage, index, total, instruction):
+        self.stage = stage
+        self.index = index
+        self.total = total
+        self.instruction = instruction
+        self.started = time.monotonic()
+        self.duration = None
+        self.cached = False
+        self.error = None
+
+    @property
+    def finished(self) -> bool:
+        return self.duration is not None or self.cached or self.error is not None
+
+    @property
+    def label(self) -> str:
+        prefix = f"{self.stage} " if self.stage else ""
+        return f"[{prefix}{self.index}/{self.total}] {self.instruction}"
+
+
+class BuildProgress:
+    def __init__(self):
+        self.steps = {}
+        self.stage_totals = {}
+        self._legacy_current = None
+
+    @property
+    def total(self) -> int:
+        return sum(self.stage_totals.values())
+
+    @property
+    def completed(self) -> int:
+        return sum(1 for step in self.steps.values() if step.finished)
+
+    def feed(self, line: str):
+        """
+        Consume one output line. Returns a short progress message when a step
+        starts or finishes, otherwise None.
+        """
+        match = STEP_RE.match(line)
+        if match:
+            vertex, stage, index, total, instruction = match.groups()
+            if vertex in self.steps:
+                return None
+            step = BuildStep(stage, int(index), int(total), instruction)
+            self.steps[vertex] = step
+            self.stage_totals[stage] = max(self.stage_totals.get(stage, 0), step.total)
+            return f"▶️ {step.label}"
+
+        match = DONE_RE.match(line)
+        if match:
+            step = self.steps.get(match.group(1))
+            if step and step.duration is None:
+                step.duration = float(match.group(2))
+                return f"✔️ {step.label} ({step.duration:.1f}s)"
+            return None
+
+        match = CACHED_RE.match(line)
+        if match:
+            step = self.steps.get(match.group(1))
+            if step and not step.cached:
+                step.cached = True
+                step.duration = 0.0
+                return f"♻️ {step.label} (cached)"
+            return None
+
+        match = ERROR_RE.match(line)
+        if match:
+            step = self.steps.get(match.group(1))
+            if step and step.error is None:
+                step.error = match.group(2)
+                return f"❌ {step.label}: {step.error}"
+            return None
+
+        match = LEGACY_STEP_RE.match(line)
+        if match:
+            index, total, instruction = match.groups()
+            now = time.monotonic()
+            if self._legacy_current is not None:
+                self._legacy_current.duration = now - self._legacy_current.started
+            step = BuildStep(None, int(index), int(total), instruction)
+            self.steps[f"legacy-{index}"] = step
+            self.stage_totals[None] = step.total
+            self._legacy_current = step
+            return f"▶️ {step.label}"
+
+        if LEGACY_CACHED_RE.match(line) and self._legacy_current is not None:
+            step = self._legacy_current
+            if not step.cached:
+                step.cached = True
+                step.duration = 0.0
+                return f"♻️ {step.label} (cached)"
+
+        return None
+
+    def finish(self) -> None:
+        """
+        Close the step that was running when the classic builder exited
+        """
+        if self._legacy_current is not None and self._legacy_current.duration is None:
+            self._legacy_current.duration = time.monotonic() - self._legacy_current.started
+
+    def timings(self, top: int = 5) -> str:
+        """
+        Human readable breakdown of the slowest build steps
+        """
+        finished = [step for step in self.steps.values() if step.duration is not None]
+        if not finished:
+            return ""
+        cached = sum(1 for step in finished if step.cached)
+        lines = [f"⏱️ Build steps: {len(finished)} finished, {cached} cached"]
+        for step in sorted(finished, key=lambda s: s.duration, reverse=True)[:top]:
+            if not step.cached:
+                lines.append(f"   {step.duration:6.1f}s  {step.label}")
+        return "\n".join(lines)
@@ -0,0 +1,266 @@
+"""
+Incremental, bounded views of a running container's logs and resource use.
+
+A ContainerMonitor follows one container through the docker backend with a
+single streamed log follow and a single stats stream, however often the
+tools ask, instead of a `docker logs` / `docker stats` process per call.
+Lines and stats samples land in fixed-size ring buffers whose items are
+numbered: a caller passes back the cursor it was given and only receives
+what arrived after it. When a stream ends (the container stopped or was
+replaced by a redeploy) the next read starts following again.
+
+ContainerMonitors keeps a bounded set of monitors and stops the streams of
+any that nobody has read for idle_timeout seconds.
+"""
+import asyncio
+import itertools
+import time
+from collections import OrderedDict, deque
+
+from tools.build_context import human_size
+from tools.docker_cli import DockerError
+
+LOGS = "logs"
+STATS = "stats"
+
+# How long a read that just (re)started a stream waits for its first data
+STARTUP_WAIT_SECONDS = {LOGS: 1.0, STATS: 3.0}
+# A log backlog arrives in a burst; it is complete once this long passes
+# without a new line
+QUIET_SECONDS = 0.2
+
+
+class RingBuffer:
+    """
+    The last `capacity` items appended, numbered from 1 in append order
+    """
+
+    def __init__(self, capacity: int):
+        self.items = deque(maxlen=capacity)
+        self.last = 0
+        self.changed = asyncio.Event()
+
+    def append(self, item) -> None:
+        self.items.append(item)
+        self.last += 1
+        self.changed.set()
+
+    def since(self, cursor: int, limit: int):
+        """
+        The newest `limit` items numbered after cursor, and how many items
+        after cursor are not included (evicted, or beyond limit)
+        """
+        if not 0 <= cursor <= self.last:
+            # A cursor from before a server restart
+            cursor = 0
+        new = self.last - cursor
+        count = min(new, len(self.items), limit)
+        return list(itertools.islice(self.items, len(self.items) - count, None)), new - count
+
+
+class ContainerMonitor:
+    def __init__(
+        self,
+        backend,
+        container: str,
+        log_lines: int = 2000,
+        stats_samples: int = 300,
+        sample_interval: float = 2.0,
+        initial_tail: int = 200
+    ):
+        self.backend = backend
+        self.container = container
+        self.sample_interval = sample_interval
+        self.initial_tail = initial_tail
+        self.buffers = {LOGS: RingBuffer(log_lines), STATS: RingBuffer(stats_samples)}
+        self.errors = {LOGS: None, STATS: None}
+        self.tasks = {}
+        self.last_read = time.monotonic()
+        self._logs_ended_at = None
+        self._last_sample = None
+
+    # ============================================================
+    # Followers
+    # ============================================================
+    def _start(self, kind: str) -> bool:
+        """
+        Follow `kind` unless already following; True when a stream was started
+        """
+        task = self.tasks.get(kind)
+        if task is not None and not task.done():
+            return False
+        follow = self._follow_logs if kind == LOGS else self._follow_stats
+        self.tasks[kind] = asyncio.create_task(self._run(kind, follow))
+        return True
+
+    async def _run(self, kind: str, follow) -> None:
+        self.errors[kind] = None
+        try:
+            await follow()
+        except DockerError as e:
+            self.errors[kind] = str(e)
+        finally:
+            # Wake readers waiting for data that will not come
+            self.buffers[kind].changed.set()
+
+    async def _follow_logs(self) -> None:
+        # After a stream ended, continue from that moment rather than
+        # replaying the tail (a redeployed container's lines are all newer)
+        try:
+            await self.backend.follow_logs(
+                self.container, self.buffers[LOGS].append, self.initial_tail, self._logs_ended_at
+            )
+        finally:
+            self._logs_ended_at = time.time()
+
+    async def _follow_stats(self) -> None:
+        await self.backend.follow_stats(self.container, self._add_sample)
+
+    def _add_sample(self, sample: dict) -> None:
+        """
+        Keep one sample per sample_interval, with network rates since the
+        previous one kept
+        """
+        previous = self._last_sample
+        if previous is not None:
+            elapsed = sample["time"] - previous["time"]
+            if elapsed < self.sample_interval * 0.9:
+                return
+            for key in ("net_rx_bytes", "net_tx_bytes"):
+                sample[f"{key}_per_second"] = max(sample[key] - previous[key], 0) / elapsed
+        self._last_sample = sample
+        self.buffers[STATS].append(sample)
+
+    def following(self, kind: str) -> bool:
+        task = self.tasks.get(kind)
+        return task is not None and not task.done()
+
+    def stop(self) -> None:
+        for task in self.tasks.values():
+            task.cancel()
+
+    # ============================================================
+    # Reads
+    # ============================================================
+    async def read(self, kind: str, since: int = 0, limit: int = 100, wait: float = 0.0):
+        """
+        (items after since, items skipped, cursor for the next read). With
+        nothing new yet, waits up to `wait` seconds for it.
+        """
+        self.last_read = time.monotonic()
+        buffer = self.buffers[kind]
+        if self._start(kind):
+            wait = max(wait, STARTUP_WAIT_SECONDS[kind])
+        await self._wait_for_new(kind, since, wait)
+        items, skipped = buffer.since(since, limit)
+        return items, skipped, buffer.last
+
+    async def _wait_for_new(self, kind: str, since: int, wait: float) -> None:
+        buffer = self.buffers[kind]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait
+        while self.following(kind):
+            arrived = buffer.last > since
+            remaining = deadline - loop.time()
+            if remaining <= 0 or (arrived and kind == STATS):
+                return
+            buffer.changed.clear()
+            try:
+                await asyncio.wait_for(buffer.changed.wait(), QUIET_SECONDS if arrived else remaining)
+            except asyncio.TimeoutError:
+                if arrived:
+                    return
+
+
+class ContainerMonitors:
+    """
+    Monitors by container name: at most max_containers, least recently
+    read dropped first
+    """
+
+    def __init__(self, max_containers: int = 8, idle_timeout: float = 600.0, **options):
+        self.max_containers = max_containers
+        self.idle_timeout = idle_timeout
+        self.options = options
+        self.monitors = OrderedDict()
+        self._reaper = None
+
+    def get(self, backend, container: str) -> ContainerMonitor:
+        monitor = self.monitors.get(container)
+        if monitor is None or monitor.backend is not backend:
+            if monitor is not None:
+                monitor.stop()
+            monitor = self.monitors[container] = ContainerMonitor(backend, container, **self.options)
+        self.monitors.move_to_end(container)
+        while len(self.monitors) > self.max_containers:
+            _, evicted = self.monitors.popitem(last=False)
+            evicted.stop()
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap())
+        return monitor
+
+    async def _reap(self) -> None:
+        while self.monitors:
+            await asyncio.sleep(self.idle_timeout / 4)
+            cutoff = time.monotonic() - self.idle_timeout
+            for container, monitor in list(self.monitors.items()):
+                if monitor.last_read < cutoff:
+                    monitor.stop()
+                    del self.monitors[container]
+
+    def close(self) -> None:
+        for monitor in self.monitors.values():
+            monitor.stop()
+        self.monitors.clear()
+        if self._reaper is not None:
+            self._reaper.cancel()
+
+
+# ============================================================
+# Reports
+# ============================================================
+def _footer(monitor: ContainerMonitor, kind: str, cursor: int, skipped: int, noun: str) -> str:
+    lines = []
+    if skipped:
+        lines.append(f"✂️ {skipped} older {noun} since your cursor not shown (buffer or limit)")
+    if monitor.errors[kind]:
+        lines.append(f"⚠️ {monitor.errors[kind]}")
+    elif not monitor.following(kind):
+        lines.append("⏹️ Stream ended (container stopped or replaced); the next call follows it again")
+    lines.append(f"🔖 Cursor: {cursor} (pass since={cursor} to get only newer {noun})")
+    return "\n".join(lines)
+
+
+def logs_report(monitor: ContainerMonitor, lines, skipped: int, cursor: int) -> str:
+    head = f"📜 Logs of {monitor.container}: {len(lines)} new line{'' if len(lines) == 1 else 's'}"
+    body = "".join(f"\n   {line}" for line in lines)
+    return f"{head}{body}\n{_footer(monitor, LOGS, cursor, skipped, 'lines')}"
+
+
+def _rate(sample: dict, key: str) -> str:
+    rate = sample.get(f"{key}_per_second")
+    return "—" if rate is None else f"{human_size(rate)}/s"
+
+
+def stats_report(monitor: ContainerMonitor, samples, skipped: int, cursor: int) -> str:
+    head = (
+        f"📊 Stats of {monitor.container}: {len(samples)} new sample{'' if len(samples) == 1 else 's'} "
+        f"(one per {monitor.sample_interval:g}s)"
+    )
+    lines = [head]
+    if samples:
+        lines.append("   time      CPU      memory                  net rx      net tx")
+        for sample in samples:
+            memory = f"{human_size(sample['memory_bytes'])} / {human_size(sample['memory_limit_bytes'])}"
+            lines.append(
+                f"   {time.strftime('%H:%M:%S', time.localtime(sample['time']))}  "
+                f"{sample['cpu_percent']:6.1f}%  {memory:<22}  "
+                f"{_rate(sample, 'net_rx_bytes'):<10}  {_rate(sample, 'net_tx_bytes')}"
+            )
+        cpu = [sample["cpu_percent"] for sample in samples]
+        lines.append(
+            f"📈 CPU avg {sum(cpu) / len(cpu):.1f}% | peak {max(cpu):.1f}%  "
+            f"🧠 Memory peak {human_size(max(sample['memory_bytes'] for sample in samples))}"
+        )
+    lines.append(_footer(monitor, STATS, cursor, skipped, "samples"))
+    return "\n".join(lines)
@@ -0,0 +1,258 @@
+"""
+Project inspection and Dockerfile rendering for the prepare step.
+
+inspect_project() works out what the image needs (requirements file, ASGI
+entry point, listen port, Python version, and a launcher script if the
+project has one) and render_dockerfile() fills the
+multi-stage template in templates/docker/Dockerfile with it. The result is
+stored next to the Dockerfile as manifest/project.json so the deploy step
+publishes the right port.
+"""
+import json
+import os
+import re
+from string import Template
+
+PROJECT_SPEC_NAME = "project.json"
+
+DEFAULT_PYTHON_VERSION = "3.11"
+DEFAULT_PORT = 8001
+DEFAULT_APP = "app.main:app"
+
+APP_RE = re.compile(r"^(\w+)\s*=\s*(FastAPI|Starlette)\(", re.MULTILINE)
+PORT_RE = re.compile(r"uvicorn\.run\([^)]*\bport\s*=\s*(\d+)")
+LAUNCHER_RE = re.compile(r"uvicorn\.run\(\s*[\"']([\w.]+:\w+)[\"']")
+PYTHON_VERSION_RE = re.compile(r"(\d+\.\d+)")
+
+# Directories never scanned for the entry point
+SKIP_DIRS = {"manifest", "tests", "__pycache__", ".git", ".venv", "venv", ".pytest_cache", ".mypy_cache"}
+
+PIP_CACHE_MOUNT = "--mount=type=cache,target=/root/.cache/pip "
+BUILDKIT_SYNTAX = "# syntax=docker/dockerfile:1\n"
+
+# Where the build context carries the locked wheels (see tools.wheelhouse)
+WHEELHOUSE_ARCNAME = ".wheelhouse"
+
+# Fast start: bytecode the interpreter loads without checking it against the
+# sources (no stat per imported module); safe because image files never change
+FAST_START_COMPILE = "--invalidation-mode unchecked-hash "
+
+
+# ============================================================
+# Project Inspection
+# ============================================================
+def _iter_python_files(project_path: str):
+    for root, dirs, files in os.walk(project_path):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+        for name in sorted(files):
+            if name.endswith(".py"):
+                absolute = os.path.join(root, name)
+                yield os.path.relpath(absolute, project_path).replace(os.sep, "/"), absolute
+
+
+def _module_name(relative: str) -> str:
+    module = relative[:-3].replace("/", ".")
+    return module[: -len(".__init__")] if module.endswith(".__init__") else module
+
+
+def find_entry_point(project_path: str):
+    """
+    Locate the ASGI application object, preferring shallow `main` modules.
+    Returns ("package.module:variable", relative_path) or (None, None).
+    """
+    candidates = []
+    for relative, absolute in _iter_python_files(project_path):
+        with open(absolute, "r", encoding="utf-8", errors="replace") as f:
+            match = APP_RE.search(f.read())
+        if match:
+            module = _module_name(relative)
+            score = (module.rsplit(".", 1)[-1] != "main", module.count("."), module)
+            candidates.append((score, f"{module}:{match.group(1)}", relative))
+    if not candidates:
+        return None, None
+    _, entry_point, relative = min(candidates)
+    return entry_point, relative
+
+
+def find_launcher(project_path: str, entry_point: str):
+    """
+    Locate a runnable module (`python -m module --host ... --port ...`) that
+    starts the entry point itself, e.g. to choose the worker count.
+    Returns (module, relative_path) or (None, None).
+    """
+    for relative, absolute in _iter_python_files(project_path):
+        with open(absolute, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        match = LAUNCHER_RE.search(text)
+        if match and match.group(1) == entry_point and "__main__" in text:
+            return _module_name(relative), relative
+    return None, None
+
+
+def find_port(project_path: str) -> int:
+    for _, absolute in _iter_python_files(project_path):
+        with open(absolute, "r", encoding="utf-8", errors="replace") as f:
+            match = PORT_RE.search(f.read())
+        if match:
+            return int(match.group(1))
+    return DEFAULT_PORT
+
+
+def find_python_version(project_path: str) -> str:
+    for name in (".python-version", "runtime.txt"):
+        path = os.path.join(project_path, name)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                match = PYTHON_VERSION_RE.search(f.read())
+            if match:
+                return match.group(1)
+    return DEFAULT_PYTHON_VERSION
+
+
+def read_requirements(path: str):
+    requirements = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                requirements.append(line)
+    return requirements
+
+
+def inspect_project(project_path: str) -> dict:
+    """
+    Describe what the image for this project needs. Raises FileNotFoundError
+    when the project has no requirements.txt.
+    """
+    requirements_path = os.path.join(project_path, "requirements.txt")
+    if not os.path.exists(requirements_path):
+        raise FileNotFoundError(requirements_path)
+    requirements = read_requirements(requirements_path)
+
+    entry_point, entry_file = find_entry_point(project_path)
+    warnings = []
+    if entry_point is None:
+        entry_point = DEFAULT_APP
+        warnings.append(f"No FastAPI/Starlette app found, assuming {DEFAULT_APP}")
+    if not any(re.match(r"uvicorn\b", requirement) for requirement in requirements):
+        warnings.append("uvicorn is not listed in requirements.txt")
+
+    # The top-level package (or module) holding the entry point is what gets copied
+    top_level = entry_point.split(":", 1)[0].split(".", 1)[0]
+    source = top_level if os.path.isdir(os.path.join(project_path, top_level)) else f"{top_level}.py"
+    sources = [source]
+    launcher, launcher_file = find_launcher(project_path, entry_point)
+    if launcher is not None:
+        launcher_top = launcher.split(".", 1)[0]
+        launcher_source = launcher_top if "/" in launcher_file else launcher_file
+        if launcher_source not in sources:
+            sources.append(launcher_source)
+
+    return {
+        "entry_point": entry_point,
+        "entry_file": entry_file,
+        "launcher": launcher,
+        "launcher_file": launcher_file,
+        "port": find_port(project_path),
+        "python_version": find_python_version(project_path),
+        "requirements_file": "requirements.txt",
+        "requirements": requirements,
+        "sources": sources,
+        "warnings": warnings,
+    }
+
+
+# ============================================================
+# Rendering
+# ============================================================
+def render_dockerfile(
+    spec: dict,
+    template_path: str,
+    buildkit: bool = True,
+    wheelhouse: bool = False,
+    fast_start: bool = False
+) -> str:
+    """
+    Fill the Dockerfile template from a project spec. With buildkit=False the
+    output avoids BuildKit-only syntax so the classic builder can build it.
+    With wheelhouse=True the dependencies come from the locked wheels the
+    build sends under WHEELHOUSE_ARCNAME instead of being resolved and
+    downloaded by pip inside the build. fast_start=True bakes unchecked
+    bytecode for the application and every installed dependency.
+    """
+    with open(template_path, "r", encoding="utf-8") as f:
+        template = Template(f.read())
+
+    copy_sources = "\n".join(
+        f"COPY {source} ./{source}" for source in spec["sources"]
+    )
+    if spec.get("launcher"):
+        # The project's own launcher (e.g. sizing uvicorn workers to the container)
+        command = ["python", "-m", spec["launcher"], "--host", "0.0.0.0", "--port", str(spec["port"])]
+    else:
+        command = ["uvicorn", spec["entry_point"], "--host", "0.0.0.0", "--port", str(spec["port"])]
+
+    if wheelhouse:
+        # The lock arrives as requirements.txt next to its wheels
+        wheels_comment = "the locked wheels from the shared wheelhouse, no network needed"
+        collect_wheels = f"COPY {WHEELHOUSE_ARCNAME}/ ./"
+    else:
+        wheels_comment = "build every dependency wheel once, reusing pip's cache"
+        collect_wheels = (
+            f"COPY {spec['requirements_file']} requirements.txt\n"
+            f"RUN {PIP_CACHE_MOUNT if buildkit else ''}pip wheel --wheel-dir /wheels -r requirements.txt"
+        )
+
+    return template.substitute(
+        syntax=BUILDKIT_SYNTAX if buildkit else "",
+        entry_point=spec["entry_point"],
+        python_version=spec["python_version"],
+        wheels_comment=wheels_comment,
+        collect_wheels=collect_wheels,
+        # pip's own bytecode is timestamp-checked: compile once, unchecked, instead
+        install_options="--no-compile " if fast_start else "",
+        compile_dependencies=(
+            f" \\\n && /opt/venv/bin/python -m compileall -q -j 0 {FAST_START_COMPILE}/opt/venv/lib"
+            if fast_start else ""
+        ),
+        compile_options=FAST_START_COMPILE if fast_start else "",
+        copy_sources=copy_sources,
+        compile_targets=" ".join(spec["sources"]),
+        port=spec["port"],
+        command=json.dumps(command),
+    )
+
+
+def requires_buildkit(dockerfile_path: str) -> bool:
+    """
+    True when the Dockerfile uses syntax the classic builder rejects
+    """
+    with open(dockerfile_path, "r", encoding="utf-8") as f:
+        content = f.read()
+    return "--mount=" in content or content.startswith("# syntax=")
+
+
+def uses_wheelhouse(dockerfile_path: str) -> bool:
+    """
+    True when the Dockerfile installs dependencies from the locked wheels
+    """
+    with open(dockerfile_path, "r", encoding="utf-8") as f:
+        return f"COPY {WHEELHOUSE_ARCNAME}/" in f.read()
+
+
+# ============================================================
+# Project Spec Persistence
+# ============================================================
+def save_project_spec(manifest_dir: str, spec: dict) -> str:
+    path = os.path.join(manifest_dir, PROJECT_SPEC_NAME)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(spec, f, indent=2)
+    return path
+
+
+def load_project_spec(manifest_dir: str) -> dict:
+    try:
+        with open(os.path.join(manifest_dir, PROJECT_SPEC_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
@@ -0,0 +1,504 @@
+"""
+Docker Engine API backend.
+
+Talks HTTP to the daemon over its unix socket or a TCP endpoint through a
+pooled keep-alive connection, replacing one `wsl docker ...` process per
+step. connect_backend() falls back to the CLI backend when the API is not
+reachable.
+
+Dockerfiles using BuildKit syntax (a `# syntax=` line, cache mounts) are
+built with version=2 on /build: the daemon runs BuildKit on the uploaded
+context tar and streams its progress as protobuf StatusResponse messages,
+which are relayed as the lines `docker build --progress=plain` prints. Only
+daemons without BuildKit (Windows, API before 1.39) leave such builds to the
+CLI backend.
+"""
+import base64
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import quote
+
+from tools.build_context import DOCKERFILE_ARCNAME
+from tools.containerize import requires_buildkit
+from tools.docker_cli import MAX_LINE_LENGTH, CliBackend, DockerError
+from tools.http_pool import HttpError, HttpPool
+
+API_VERSION = "v1.41"
+DEFAULT_UNIX_SOCKET = "unix:///var/run/docker.sock"
+# The first API version whose /build accepts version=2
+BUILDKIT_API_VERSION = (1, 39)
+BUILDKIT_TRACE_ID = "moby.buildkit.trace"
+# Log and stats streams followed at once (a monitored container follows
+# both); further follows are refused instead of waiting for a connection
+MAX_FOLLOWS = 16
+
+
+def _split_image(image: str):
+    """
+    Split "repo/name:tag" into ("repo/name", "tag")
+    """
+    name, sep, tag = image.rpartition(":")
+    if not sep or "/" in tag:
+        return image, "latest"
+    return name, tag
+
+
+async def _stream_error(response) -> DockerError:
+    body = await response.read()
+    try:
+        return DockerError(json.loads(body)["message"])
+    except (ValueError, KeyError, TypeError):
+        return DockerError(body.decode(errors="replace").strip())
+
+
+async def _log_payloads(chunks):
+    """
+    The text of a log or exec output stream. For containers without a TTY the daemon
+    multiplexes stdout and stderr into frames (8-byte header: stream type
+    0-2, three zero bytes, big-endian payload size); timestamped raw text
+    starts with a digit instead.
+    """
+    multiplexed = None
+    pending = b""
+    async for chunk in chunks:
+        if multiplexed is None:
+            multiplexed = chunk[:1] in (b"\x00", b"\x01", b"\x02")
+        if not multiplexed:
+            yield chunk
+            continue
+        pending += chunk
+        while len(pending) >= 8:
+            size = int.from_bytes(pending[4:8], "big")
+            if len(pending) < 8 + size:
+                break
+            yield pending[8:8 + size]
+            pending = pending[8 + size:]
+
+
+# ============================================================
+# BuildKit Progress
+# ============================================================
+def _varint(data: bytes, position: int):
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def _proto_fields(data: bytes):
+    """
+    (field number, value) for each field of an encoded protobuf message:
+    an int for varints, bytes for length-delimited fields. Fixed-size
+    fields are skipped, none of the fields read here has one.
+    """
+    position = 0
+    while position < len(data):
+        key, position = _varint(data, position)
+        field, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, position = _varint(data, position)
+        elif wire_type == 2:
+            size, position = _varint(data, position)
+            value, position = data[position:position + size], position + size
+        elif wire_type in (1, 5):
+            position += 8 if wire_type == 1 else 4
+            continue
+        else:
+            raise ValueError(f"unsupported protobuf wire type {wire_type}")
+        yield field, value
+
+
+def _timestamp(data: bytes) -> float:
+    fields = dict(_proto_fields(data))
+    return fields.get(1, 0) + fields.get(2, 0) / 1e9
+
+
+class BuildkitTrace:
+    """
+    Renders the StatusResponse messages of a version=2 build as plain
+    progress lines ("#3 [2/5] COPY ...", "#3 DONE 0.2s", "#3 CACHED",
+    "#3 ERROR: ..."), numbering vertices in the order they first appear.
+
+    StatusResponse: vertexes = 1, logs = 3. Vertex: digest = 1, name = 3,
+    cached = 4, started = 5, completed = 6, error = 7. VertexLog: vertex = 1,
+    msg = 4.
+    """
+
+    def __init__(self):
+        self.numbers = {}
+        self.finished = set()
+        self.partial = {}
+
+    def _number(self, digest: bytes):
+        if digest not in self.numbers:
+            self.numbers[digest] = len(self.numbers) + 1
+            return self.numbers[digest], True
+        return self.numbers[digest], False
+
+    def lines(self, aux: str):
+        lines = []
+        for field, value in _proto_fields(base64.b64decode(aux)):
+            if field == 1:
+                lines += self._vertex(dict(_proto_fields(value)))
+            elif field == 3:
+                lines += self._log(dict(_proto_fields(value)))
+        return lines
+
+    def _vertex(self, vertex: dict):
+        digest = vertex.get(1, b"")
+        number, new = self._number(digest)
+        lines = [f"#{number} {vertex.get(3, b'').decode(errors='replace')}"] if new else []
+        if digest in self.finished:
+            return lines
+        if vertex.get(7):
+            lines.append(f"#{number} ERROR: {vertex[7].decode(errors='replace')}")
+        elif vertex.get(4):
+            lines.append(f"#{number} CACHED")
+        elif 6 in vertex:
+            duration = _timestamp(vertex[6]) - _timestamp(vertex[5]) if 5 in vertex else 0.0
+            lines.append(f"#{number} DONE {max(duration, 0.0):.1f}s")
+        else:
+            return lines
+        self.finished.add(digest)
+        return lines
+
+    def _log(self, log: dict):
+        digest = log.get(1, b"")
+        number, _ = self._number(digest)
+        # Log messages are not line aligned either
+        *complete, self.partial[digest] = (self.partial.get(digest, b"") + log.get(4, b"")).split(b"\n")
+        lines = []
+        for line in complete:
+            text = line[:MAX_LINE_LENGTH].decode(errors="replace").rstrip("\r")
+            if text.strip():
+                lines.append(f"#{number} {text}")
+        return lines
+
+
+def stats_sample(message: dict):
+    """
+    One /containers/{id}/stats message as a sample (see
+    tools.container_monitor), or None when it carries no CPU delta yet
+    """
+    cpu, precpu = message.get("cpu_stats") or {}, message.get("precpu_stats") or {}
+    system_delta = cpu.get("system_cpu_usage", 0) - precpu.get("system_cpu_usage", 0)
+    if not precpu.get("system_cpu_usage") or system_delta <= 0:
+        return None
+    cpu_delta = cpu["cpu_usage"]["total_usage"] - precpu["cpu_usage"]["total_usage"]
+    online = cpu.get("online_cpus") or len(cpu["cpu_usage"].get("percpu_usage") or ()) or 1
+
+    memory = message.get("memory_stats") or {}
+    details = memory.get("stats") or {}
+    # Page cache the kernel can drop is not the application's memory
+    # (inactive_file on cgroup v2, total_inactive_file on v1)
+    reclaimable = details.get("inactive_file", details.get("total_inactive_file", 0))
+    networks = (message.get("networks") or {}).values()
+    return {
+        "time": time.time(),
+        "cpu_percent": cpu_delta / system_delta * online * 100,
+        "memory_bytes": max(memory.get("usage", 0) - reclaimable, 0),
+        "memory_limit_bytes": memory.get("limit", 0),
+        "net_rx_bytes": sum(network.get("rx_bytes", 0) for network in networks),
+        "net_tx_bytes": sum(network.get("tx_bytes", 0) for network in networks),
+    }
+
+
+class EngineApiBackend:
+    name = "engine-api"
+
+    def __init__(
+        self, endpoint: str, max_connections: int = 4, timeout: float = 30.0, fallback=None,
+        max_follows: int = MAX_FOLLOWS
+    ):
+        self.endpoint = endpoint
+        self.fallback = fallback
+        self._buildkit = None
+        self.http = HttpPool(endpoint, max_connections=max_connections, timeout=timeout)
+        # Exec output holds its connection until the command exits, followed
+        # logs and stats theirs indefinitely: each gets its own pool so
+        # neither starves short calls, and follows (which never hand their
+        # connection back) cannot take the slots execs need
+        self.streams = HttpPool(endpoint, max_connections=4 * max_connections, timeout=timeout)
+        self.max_follows = max_follows
+        self.following = 0
+        self.follows = HttpPool(endpoint, max_connections=max_follows, timeout=timeout)
+
+    def _path(self, path: str) -> str:
+        return f"/{API_VERSION}{path}"
+
+    async def _call(self, method, path, params=None, payload=None, ok_statuses=()):
+        try:
+            return await self.http.json(method, self._path(path), params, payload, ok_statuses)
+        except HttpError as e:
+            raise DockerError(e.message)
+        except OSError as e:
+            raise DockerError(f"Docker Engine API unreachable at {self.endpoint}: {e}")
+
+    async def ping(self) -> bool:
+        try:
+            status, _, _ = await self.http.request("GET", "/_ping")
+            return status == 200
+        except OSError:
+            return False
+
+    # ============================================================
+    # Backend Operations
+    # ============================================================
+    async def architecture(self) -> str:
+        """
+        The daemon's CPU architecture, e.g. "amd64" or "arm64"
+        """
+        _, data = await self._call("GET", "/version")
+        return data.get("Arch", "amd64")
+
+    async def supports_buildkit(self) -> bool:
+        """
+        Whether /build accepts version=2: Linux daemons from API 1.39 on.
+        Windows daemons only have the classic builder.
+        """
+        if self._buildkit is None:
+            _, data = await self._call("GET", "/version")
+            api = tuple(int(part) for part in data.get("ApiVersion", "0.0").split(".")[:2])
+            self._buildkit = data.get("Os", "linux") != "windows" and api >= BUILDKIT_API_VERSION
+        return self._buildkit
+
+    async def inspect_image_id(self, image: str) -> str:
+        status, data = await self._call("GET", f"/images/{quote(image, safe='/:')}/json", ok_statuses=(404,))
+        return data["Id"] if status == 200 else ""
+
+    async def running_container_image(self, container: str) -> str:
+        status, data = await self._call("GET", f"/containers/{quote(container)}/json", ok_statuses=(404,))
+        if status != 200 or not data["State"]["Running"]:
+            return ""
+        return data["Image"]
+
+    async def remove_container(self, container: str) -> None:
+        await self._call("DELETE", f"/containers/{quote(container)}", {"force": "1"}, ok_statuses=(404,))
+
+    async def stop_container(self, container: str) -> None:
+        # 304: already stopped
+        await self._call("POST", f"/containers/{quote(container)}/stop", ok_statuses=(304,))
+
+    async def start_container(self, container: str) -> None:
+        await self._call("POST", f"/containers/{quote(container)}/start", ok_statuses=(304,))
+
+    async def tag_image(self, source: str, target: str) -> None:
+        repo, tag = _split_image(target)
+        await self._call("POST", f"/images/{quote(source, safe='/:')}/tag", {"repo": repo, "tag": tag})
+
+    async def build(self, context, tags, on_line) -> None:
+        """
+        POST the build context as a streamed tar and relay the daemon's JSON
+        progress messages to on_line as plain text lines. Dockerfiles that
+        need BuildKit are built with it (version=2) where the daemon has it.
+        """
+        buildkit = requires_buildkit(context.dockerfile_path)
+        if buildkit and self.fallback and not await self.supports_buildkit():
+            on_line("ℹ️ The Docker daemon has no BuildKit, building through the docker CLI")
+            return await self.fallback.build(context, tags, on_line)
+
+        params = [("dockerfile", DOCKERFILE_ARCNAME), ("rm", "1"), ("forcerm", "1")]
+        params += [("t", tag) for tag in tags]
+        if buildkit:
+            params.append(("version", "2"))
+        trace = BuildkitTrace()
+        error = None
+        pending = ""
+
+        try:
+            async with self.http.stream(
+                "POST",
+                self._path("/build"),
+                params=params,
+                headers={"Content-Type": "application/x-tar"},
+                body=context.stream()
+            ) as response:
+                if not response.ok:
+                    raise await _stream_error(response)
+
+                async for raw in response.iter_lines():
+                    if not raw.strip():
+                        continue
+                    message = json.loads(raw)
+                    if message.get("id") == BUILDKIT_TRACE_ID:
+                        for line in trace.lines(message.get("aux", "")):
+                            on_line(line)
+                    elif "error" in message:
+                        error = message["error"].strip()
+                        on_line(f"ERROR: {error}")
+                    elif "stream" in message:
+                        # Stream fragments are not line aligned
+                        pending += message["stream"]
+                        *lines, pending = pending.split("\n")
+                        for line in lines:
+                            on_line(line.rstrip("\r"))
+        except OSError as e:
+            raise DockerError(f"Docker Engine API unreachable at {self.endpoint}: {e}")
+
+        if pending:
+            on_line(pending)
+        if error:
+            raise DockerError(error)
+
+    async def run_container(self, image: str, name: str, ports: dict, volumes=None, environment=None) -> str:
+        """
+        Create and start a detached container; ports maps container port -> host port,
+        volumes maps a named volume (or host path) -> mount path in the container
+        """
+        exposed = {f"{container_port}/tcp": {} for container_port in ports}
+        bindings = {
+            f"{container_port}/tcp": [{"HostPort": str(host_port)}]
+            for container_port, host_port in ports.items()
+        }
+        host_config = {"PortBindings": bindings}
+        if volumes:
+            host_config["Binds"] = [f"{source}:{target}" for source, target in volumes.items()]
+        config = {"Image": image, "ExposedPorts": exposed, "HostConfig": host_config}
+        if environment:
+            config["Env"] = [f"{key}={value}" for key, value in environment.items()]
+        _, created = await self._call("POST", "/containers/create", {"name": name}, config)
+        container_id = created["Id"]
+        await self._call("POST", f"/containers/{container_id}/start")
+        return container_id
+
+    @asynccontextmanager
+    async def _follow(self, path: str, params: dict):
+        """
+        A GET streamed from the follow pool. Refused with DockerError when
+        max_follows streams are already open: a follow ends only when its
+        container stops, so waiting for a free connection could be forever.
+        """
+        if self.following >= self.max_follows:
+            raise DockerError(
+                f"Already following {self.max_follows} log/stats streams; stop monitoring a container first"
+            )
+        self.following += 1
+        try:
+            async with self.follows.stream("GET", self._path(path), params=params) as response:
+                yield response
+        finally:
+            self.following -= 1
+
+    async def follow_logs(self, container: str, on_line, tail: int = 100, since: float = None) -> None:
+        """
+        Call on_line for each of the last `tail` log lines (or those logged
+        after the unix time `since`), then for every new line until the
+        container stops. Lines carry the daemon's RFC 3339 timestamp.
+        """
+        params = {"follow": "1", "stdout": "1", "stderr": "1", "timestamps": "1", "tail": str(tail)}
+        if since is not None:
+            params.update(since=f"{since:.6f}", tail="all")
+        try:
+            async with self._follow(f"/containers/{quote(container)}/logs", params) as response:
+                if not response.ok:
+                    raise await _stream_error(response)
+                pending = b""
+                async for payload in _log_payloads(response.iter_chunks()):
+                    pending += payload
+                    *lines, pending = pending.split(b"\n")
+                    for line in lines:
+                        on_line(line[:MAX_LINE_LENGTH].decode(errors="replace").rstrip("\r"))
+                    pending = pending[:MAX_LINE_LENGTH]
+                if pending:
+                    on_line(pending.decode(errors="replace").rstrip("\r"))
+        except OSError as e:
+            raise DockerError(f"Docker Engine API unreachable at {self.endpoint}: {e}")
+
+    async def follow_stats(self, container: str, on_sample) -> None:
+        """
+        Call on_sample with a resource sample each time the daemon reports
+        one (about once a second) until the container stops
+        """
+        try:
+            async with self._follow(f"/containers/{quote(container)}/stats", {"stream": "1"}) as response:
+                if not response.ok:
+                    raise await _stream_error(response)
+                async for raw in response.iter_lines():
+                    if raw.strip():
+                        sample = stats_sample(json.loads(raw))
+                        if sample is not None:
+                            on_sample(sample)
+        except OSError as e:
+            raise DockerError(f"Docker Engine API unreachable at {self.endpoint}: {e}")
+
+    async def exec_in_container(self, container: str, command) -> tuple:
+        """
+        Run a command in a running container and wait for it to exit;
+        returns (exit code, stdout and stderr text)
+        """
+        _, created = await self._call(
+            "POST", f"/containers/{quote(container)}/exec", payload={
+                "Cmd": list(command), "AttachStdout": True, "AttachStderr": True,
+            }
+        )
+        exec_id = created["Id"]
+        output = bytearray()
+        try:
+            # The daemon hijacks the connection for the output and closes it when the command exits
+            async with self.streams.stream(
+                "POST", self._path(f"/exec/{exec_id}/start"),
+                headers={"Content-Type": "application/json"},
+                body=json.dumps({"Detach": False, "Tty": False}).encode()
+            ) as response:
+                if not response.ok:
+                    raise await _stream_error(response)
+                async for payload in _log_payloads(response.iter_chunks()):
+                    output += payload
+        except OSError as e:
+            raise DockerError(f"Docker Engine API unreachable at {self.endpoint}: {e}")
+        _, state = await self._call("GET", f"/exec/{exec_id}/json")
+        return state.get("ExitCode"), output.decode(errors="replace")
+
+    async def close(self) -> None:
+        await self.http.close()
+        await self.streams.close()
+        await self.follows.close()
+
+
+# ============================================================
+# Backend Selection
+# ============================================================
+def default_docker_host() -> str:
+    """
+    DOCKER_HOST when set, else the local unix socket where one can exist
+    """
+    host = os.environ.get("DOCKER_HOST", "")
+    if host:
+        return host
+    return DEFAULT_UNIX_SOCKET if os.name != "nt" else ""
+
+
+async def connect_backend(
+    mode: str = "auto", endpoint: str = "", cli_command=("wsl", "docker"), max_follows: int = MAX_FOLLOWS
+):
+    """
+    Return the backend to use for docker operations.
+
+    mode "cli" always uses the CLI, "api" requires the Engine API, and
+    "auto" uses the Engine API when it answers /_ping and the CLI otherwise.
+    max_follows bounds the Engine API backend's followed log/stats streams.
+    """
+    if mode == "cli":
+        return CliBackend(cli_command)
+
+    endpoint = endpoint or default_docker_host()
+    if endpoint:
+        try:
+            backend = EngineApiBackend(endpoint, fallback=CliBackend(cli_command), max_follows=max_follows)
+        except ValueError:
+            # e.g. npipe:// endpoints, which only the CLI understands
+            backend = None
+        if backend and await backend.ping():
+            return backend
+        if backend:
+            await backend.close()
+
+    if mode == "api":
+        raise DockerError(f"Docker Engine API not reachable at {endpoint or '(no endpoint)'}")
+    return CliBackend(cli_command)
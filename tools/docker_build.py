@@ -0,0 +1,257 @@
+"""
+Docker build & deploy pipeline executed as a background job.
+
+The pipeline is written against a docker backend (tools.docker_api's Engine
+API client, or the tools.docker_cli fallback) so no step blocks the MCP
+server's event loop. Build output is consumed line by line and forwarded to
+the job as it arrives; only a short tail is retained for error reports.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+
+from tools import build_cache, containerize, health, startup, wheelhouse as wheelhouses
+from tools.build_context import BuildContext, refresh_dockerignore
+from tools.build_progress import BuildProgress
+from tools.docker_cli import DockerError
+from tools.jobs import JobFailed
+from tools.metrics import build_cache_requests
+
+# Output lines kept for the failure message
+ERROR_TAIL_LINES = 40
+
+
+# ============================================================
+# Helper Functions
+# ============================================================
+async def build_image(job, backend, context: BuildContext, tags) -> BuildProgress:
+    """
+    Build an image, reporting each build step to the job as it starts and
+    finishes.
+    """
+    progress = BuildProgress()
+    tail = deque(maxlen=ERROR_TAIL_LINES)
+
+    def on_line(line):
+        tail.append(line)
+        job.log(line)
+        message = progress.feed(line)
+        if message:
+            job.report_progress(progress.completed, progress.total, message)
+
+    try:
+        await backend.build(context, tags, on_line)
+    except DockerError as e:
+        raise JobFailed(f"Docker image build failed: {e}\n" + "\n".join(tail))
+    finally:
+        progress.finish()
+    return progress
+
+
+async def lock_dependencies(job, backend, wheelhouse, project_path: str, dockerfile_path: str, refresh: bool):
+    """
+    The dependency lock a wheelhouse Dockerfile installs from, or None when
+    the Dockerfile resolves dependencies itself
+    """
+    if not containerize.uses_wheelhouse(dockerfile_path):
+        return None
+    if wheelhouse is None:
+        raise JobFailed("The Dockerfile installs from the wheelhouse, but no wheelhouse is configured")
+    spec = containerize.load_project_spec(os.path.dirname(dockerfile_path))
+    requirements_path = os.path.join(project_path, spec.get("requirements_file", "requirements.txt"))
+    python_version = spec.get("python_version", containerize.DEFAULT_PYTHON_VERSION)
+    with job.phase("dependencies"):
+        return await wheelhouse.ensure_lock(
+            job, requirements_path, python_version, await backend.architecture(), refresh
+        )
+
+
+async def fingerprint_context(
+    job,
+    backend,
+    project_path: str,
+    dockerfile_path: str,
+    cache_path: str,
+    wheelhouse=None,
+    refresh_dependencies: bool = False
+):
+    """
+    Fingerprint the filtered build context (with the locked wheels, when the
+    Dockerfile installs from the wheelhouse) against the last successful
+    build, after bringing a generated .dockerignore up to date with the
+    application's imports. Returns (context, manifest).
+    """
+    job.log(f"🔌 Docker backend: {backend.name}")
+    lock = await lock_dependencies(job, backend, wheelhouse, project_path, dockerfile_path, refresh_dependencies)
+    with job.phase("fingerprint"):
+        spec = containerize.load_project_spec(os.path.dirname(dockerfile_path))
+        if await asyncio.to_thread(refresh_dockerignore, project_path, spec):
+            job.log("🙈 .dockerignore regenerated: the application's imports changed since prepare")
+        context = BuildContext(project_path, dockerfile_path, wheelhouse.context_files(lock) if lock else None)
+        previous = build_cache.load_manifest(cache_path)
+        manifest = await asyncio.to_thread(build_cache.fingerprint, context, previous)
+        if lock:
+            manifest["dependencies"] = lock
+        build_cache.save_manifest(cache_path, manifest)
+    job.log(f"🔎 Build digest {manifest['digest'][:12]} ({manifest['rehashed']} files re-hashed)")
+    return context, manifest
+
+
+async def ensure_image(job, backend, context: BuildContext, manifest: dict, image_name: str, cache_path: str) -> dict:
+    """
+    Point image_name at an image built from the fingerprinted context,
+    reusing the cached digest-tagged image when it still exists. The
+    build phase includes the context upload, which is also timed alone.
+    """
+    digest_tag = build_cache.image_tag(image_name, manifest["digest"])
+    cache_hit = build_cache.is_cache_hit(manifest) and bool(await backend.inspect_image_id(digest_tag))
+    build_cache_requests.inc(result="hit" if cache_hit else "miss")
+    build_timings = ""
+    context_report = ""
+
+    if cache_hit:
+        # Re-point the floating tag at the cached image instead of rebuilding
+        job.log(f"♻️ Reusing cached image {digest_tag}")
+        with job.phase("tag"):
+            await backend.tag_image(digest_tag, image_name)
+    else:
+        job.log(f"🔨 Building image {image_name}")
+        with job.phase("build"):
+            progress = await build_image(job, backend, context, [image_name, digest_tag])
+        job.phases.record("context_upload", context.upload_seconds)
+        build_timings = progress.timings()
+        context_report = context.size_report(await asyncio.to_thread(context.raw_size))
+        job.log(context_report)
+
+        build_cache.record_build(manifest, digest_tag, await backend.inspect_image_id(digest_tag))
+        build_cache.save_manifest(cache_path, manifest)
+
+    return {
+        "digest_tag": digest_tag,
+        "cache_hit": cache_hit,
+        "build_timings": build_timings,
+        "context_report": context_report,
+        "dependencies_report": wheelhouses.lock_report(manifest["dependencies"]) if "dependencies" in manifest else "",
+    }
+
+
+def image_report(image_name: str, image: dict) -> str:
+    return (
+        f"🐳 Image: {image_name} ({image['digest_tag']})\n"
+        f"♻️ Build cache: {'hit, build skipped' if image['cache_hit'] else 'miss, image rebuilt'}"
+        + (f"\n{image['dependencies_report']}" if image["dependencies_report"] else "")
+    )
+
+
+def build_report(image: dict) -> str:
+    return (
+        (f"\n{image['context_report']}" if image["context_report"] else "")
+        + (f"\n{image['build_timings']}" if image["build_timings"] else "")
+    )
+
+
+def up_to_date_report(manifest: dict, container_name: str) -> str:
+    return (
+        "✅ Python application is already up to date.\n"
+        f"♻️ Build inputs unchanged (digest {manifest['digest'][:12]}), "
+        "container left running.\n"
+        f"🐳 Image: {manifest['built']['tag']}\n"
+        f"📦 Container: {container_name}"
+    )
+
+
+# ============================================================
+# Build & Deploy Pipeline
+# ============================================================
+async def build_and_deploy(
+    job,
+    backend,
+    project_path: str,
+    dockerfile_path: str,
+    image_name: str,
+    container_name: str,
+    cache_path: str,
+    ports: dict,
+    volumes=None,
+    environment=None,
+    health_path: str = None,
+    health_timeout: float = 60.0,
+    wheelhouse=None,
+    refresh_dependencies: bool = False,
+    profile_module: str = None
+) -> str:
+    """
+    Build (or reuse) the image and (re)start the container.
+    ports maps container port -> host port; volumes (name -> mount path) and
+    environment are passed to the new container. With health_path, waits
+    (up to health_timeout) for the container to answer it and reports the
+    cold start. A Dockerfile rendered for the wheelhouse gets its
+    dependencies locked in (and sent from) wheelhouse. With profile_module,
+    the new container's import of that module is profiled.
+    """
+    try:
+        return await _build_and_deploy(
+            job, backend, project_path, dockerfile_path, image_name, container_name, cache_path, ports,
+            volumes, environment, health_path, health_timeout, wheelhouse, refresh_dependencies, profile_module
+        )
+    except DockerError as e:
+        raise JobFailed(str(e))
+
+
+async def _build_and_deploy(
+    job, backend, project_path, dockerfile_path, image_name, container_name, cache_path, ports, volumes, environment,
+    health_path, health_timeout, wheelhouse, refresh_dependencies, profile_module
+):
+    context, manifest = await fingerprint_context(
+        job, backend, project_path, dockerfile_path, cache_path, wheelhouse, refresh_dependencies
+    )
+
+    # Same inputs and the container already runs that image: nothing to do
+    if build_cache.is_cache_hit(manifest):
+        if await backend.running_container_image(container_name) == manifest["built"]["image_id"]:
+            build_cache_requests.inc(result="up_to_date")
+            return up_to_date_report(manifest, container_name)
+
+    image = await ensure_image(job, backend, context, manifest, image_name, cache_path)
+
+    # Remove existing container only once the new image is ready
+    job.log(f"🧹 Removing container {container_name}")
+    with job.phase("remove"):
+        await backend.remove_container(container_name)
+
+    # Run Docker container with port exposure
+    job.log(f"🚀 Starting container {container_name}")
+    started = time.perf_counter()
+    try:
+        with job.phase("run"):
+            container_id = await backend.run_container(image_name, container_name, ports, volumes, environment)
+    except DockerError as e:
+        raise JobFailed(f"Docker container failed to start:\n{e}")
+
+    host_port = next(iter(ports.values()))
+    health_report = ""
+    if health_path:
+        job.log(f"🩺 Waiting for {health_path}")
+        try:
+            with job.phase("health"):
+                await health.wait_until_healthy(
+                    "127.0.0.1", host_port, health_path, health_timeout, startup.HEALTH_POLL_SECONDS
+                )
+            health_report = startup.record_cold_start(time.perf_counter() - started, "recreate") + "\n"
+        except TimeoutError as e:
+            # The container is left running: it may simply not serve health_path
+            health_report = f"⚠️ Not healthy yet: {e}\n"
+    if profile_module:
+        health_report += await startup.profile_imports(job, backend, container_name, profile_module) + "\n"
+    return (
+        "✅ Python application deployed successfully using Docker.\n"
+        f"{image_report(image_name, image)}\n"
+        f"📦 Container: {container_name}\n"
+        f"🆔 Container ID: {container_id}\n"
+        + health_report
+        + "".join(f"💾 Volume: {source} -> {target}\n" for source, target in (volumes or {}).items())
+        + f"🌐 Application URL: http://localhost:{host_port}\n"
+        f"📘 API Docs (if FastAPI): http://localhost:{host_port}/docs"
+        + build_report(image)
+    )
@@ -0,0 +1,258 @@
+"""
+Docker CLI backend: drives `wsl docker ...` as asyncio subprocesses.
+
+This is the fallback when the Docker Engine API is not reachable. Every
+command runs as a subprocess so the event loop is never blocked, and
+cancelling the calling task kills the process.
+"""
+import asyncio
+import json
+import re
+import time
+
+from tools.build_context import DOCKERFILE_ARCNAME
+
+
+class DockerError(Exception):
+    pass
+
+
+# Longest single output line forwarded (pip progress bars can be huge)
+MAX_LINE_LENGTH = 2000
+
+
+async def iter_lines(stream):
+    """
+    Yield decoded lines from a subprocess stream without ever holding more
+    than one (truncated) line in memory.
+    """
+    pending = b""
+    while True:
+        chunk = await stream.read(64 * 1024)
+        if not chunk:
+            break
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line[:MAX_LINE_LENGTH].decode(errors="replace").rstrip("\r")
+        if len(pending) > MAX_LINE_LENGTH:
+            # Keep reading until the newline but drop the overflow
+            pending = pending[:MAX_LINE_LENGTH]
+    if pending:
+        yield pending.decode(errors="replace").rstrip("\r")
+
+
+SIZE_UNITS = {
+    "b": 1, "kb": 1000, "mb": 1000 ** 2, "gb": 1000 ** 3, "tb": 1000 ** 4,
+    "kib": 1024, "mib": 1024 ** 2, "gib": 1024 ** 3, "tib": 1024 ** 4,
+}
+SIZE_RE = re.compile(r"([\d.]+)\s*([a-zA-Z]*)")
+
+
+def parse_size(text: str) -> int:
+    """
+    Bytes in a size as `docker stats` prints it ("48.1MiB", "1.2kB", "0B")
+    """
+    match = SIZE_RE.match(text.strip())
+    if not match:
+        return 0
+    return int(float(match[1]) * SIZE_UNITS.get(match[2].lower() or "b", 1))
+
+
+def stats_sample(line: str):
+    """
+    One `docker stats --format "{{json .}}"` line as a sample (see
+    tools.container_monitor), or None for lines without one
+    """
+    # Each refresh is preceded by terminal control codes
+    start = line.find("{")
+    if start < 0:
+        return None
+    try:
+        stats = json.loads(line[start:])
+    except ValueError:
+        return None
+    used, _, limit = stats.get("MemUsage", "").partition("/")
+    received, _, sent = stats.get("NetIO", "").partition("/")
+    try:
+        cpu_percent = float(stats.get("CPUPerc", "").rstrip("%"))
+    except ValueError:
+        # "--" while the container is not running
+        return None
+    return {
+        "time": time.time(),
+        "cpu_percent": cpu_percent,
+        "memory_bytes": parse_size(used),
+        "memory_limit_bytes": parse_size(limit),
+        "net_rx_bytes": parse_size(received),
+        "net_tx_bytes": parse_size(sent),
+    }
+
+
+class CliBackend:
+    name = "cli"
+
+    def __init__(self, command=("wsl", "docker")):
+        self.command = list(command)
+
+    async def _spawn(self, args, stdin=None):
+        try:
+            return await asyncio.create_subprocess_exec(
+                *self.command, *args,
+                stdin=stdin,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except FileNotFoundError:
+            raise DockerError("Docker is not installed or not accessible via WSL.")
+
+    async def run(self, *args: str):
+        """
+        Run a docker CLI command and return (returncode, stdout, stderr)
+        """
+        process = await self._spawn(args)
+        try:
+            stdout, stderr = await process.communicate()
+        except asyncio.CancelledError:
+            process.kill()
+            await process.wait()
+            raise
+        return process.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace")
+
+    async def stream(self, *args: str, on_line, stdin=None) -> int:
+        """
+        Run a docker CLI command, calling on_line(line) for every stdout/stderr
+        line as it is produced. `stdin` may be an async iterable of bytes that
+        is piped to the process while it runs. Returns the exit code.
+        """
+        process = await self._spawn(args, asyncio.subprocess.PIPE if stdin is not None else None)
+
+        async def pump(stream):
+            async for line in iter_lines(stream):
+                on_line(line)
+
+        async def feed():
+            try:
+                async for chunk in stdin:
+                    process.stdin.write(chunk)
+                    await process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                # docker exited early; its output explains why
+                pass
+            finally:
+                process.stdin.close()
+
+        tasks = [pump(process.stdout), pump(process.stderr)]
+        if stdin is not None:
+            tasks.append(feed())
+        try:
+            await asyncio.gather(*tasks)
+            return await process.wait()
+        except asyncio.CancelledError:
+            process.kill()
+            await process.wait()
+            raise
+
+    # ============================================================
+    # Backend Operations
+    # ============================================================
+    async def architecture(self) -> str:
+        code, stdout, stderr = await self.run("version", "--format", "{{.Server.Arch}}")
+        if code != 0:
+            raise DockerError(stderr.strip())
+        return stdout.strip()
+
+    async def inspect_image_id(self, image: str) -> str:
+        code, stdout, _ = await self.run("image", "inspect", "-f", "{{.Id}}", image)
+        return stdout.strip() if code == 0 else ""
+
+    async def running_container_image(self, container: str) -> str:
+        code, stdout, _ = await self.run(
+            "inspect", "-f", "{{.State.Running}} {{.Image}}", container
+        )
+        if code != 0:
+            return ""
+        running, _, image_id = stdout.strip().partition(" ")
+        return image_id if running == "true" else ""
+
+    async def remove_container(self, container: str) -> None:
+        await self.run("rm", "-f", container)
+
+    async def stop_container(self, container: str) -> None:
+        code, _, stderr = await self.run("stop", container)
+        if code != 0:
+            raise DockerError(stderr.strip())
+
+    async def start_container(self, container: str) -> None:
+        code, _, stderr = await self.run("start", container)
+        if code != 0:
+            raise DockerError(stderr.strip())
+
+    async def tag_image(self, source: str, target: str) -> None:
+        code, _, stderr = await self.run("tag", source, target)
+        if code != 0:
+            raise DockerError(stderr.strip())
+
+    async def build(self, context, tags, on_line) -> None:
+        """
+        Pipe the filtered context tar to `docker build -` so the daemon never
+        reads the project directory itself
+        """
+        args = ["build", "--progress=plain", "-f", DOCKERFILE_ARCNAME]
+        for tag in tags:
+            args += ["-t", tag]
+        code = await self.stream(*args, "-", on_line=on_line, stdin=context.stream())
+        if code != 0:
+            raise DockerError(f"docker build exited with code {code}")
+
+    async def run_container(self, image: str, name: str, ports: dict, volumes=None, environment=None) -> str:
+        """
+        Start a detached container; ports maps container port -> host port,
+        volumes maps a named volume (or host path) -> mount path in the container
+        """
+        args = ["run", "-d", "--name", name]
+        for container_port, host_port in ports.items():
+            args += ["-p", f"{host_port}:{container_port}"]
+        for source, target in (volumes or {}).items():
+            args += ["-v", f"{source}:{target}"]
+        for key, value in (environment or {}).items():
+            args += ["-e", f"{key}={value}"]
+        code, stdout, stderr = await self.run(*args, image)
+        if code != 0:
+            raise DockerError(stderr.strip())
+        return stdout.strip()
+
+    async def follow_logs(self, container: str, on_line, tail: int = 100, since: float = None) -> None:
+        """
+        One `docker logs --follow` process, relaying lines until the
+        container stops (see EngineApiBackend.follow_logs)
+        """
+        args = ["logs", "--follow", "--timestamps"]
+        args += ["--since", f"{since:.6f}"] if since is not None else ["--tail", str(tail)]
+        code = await self.stream(*args, container, on_line=on_line)
+        if code != 0:
+            raise DockerError(f"docker logs exited with code {code}")
+
+    async def follow_stats(self, container: str, on_sample) -> None:
+        """
+        One streaming `docker stats` process, relaying a sample per refresh
+        until the container stops
+        """
+        def on_line(line):
+            sample = stats_sample(line)
+            if sample is not None:
+                on_sample(sample)
+
+        code = await self.stream("stats", "--no-trunc", "--format", "{{json .}}", container, on_line=on_line)
+        if code != 0:
+            raise DockerError(f"docker stats exited with code {code}")
+
+    async def exec_in_container(self, container: str, command) -> tuple:
+        """
+        `docker exec`: (exit code, stdout and stderr text)
+        """
+        code, stdout, stderr = await self.run("exec", container, *command)
+        return code, stdout + stderr
+
+    async def close(self) -> None:
+        pass
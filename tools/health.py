@@ -0,0 +1,46 @@
+"""
+HTTP health probing for deployed containers.
+"""
+import asyncio
+import time
+
+
+async def check_health(host: str, port: int, path: str = "/health", timeout: float = 2.0) -> bool:
+    """
+    True when GET path answers with a 2xx status
+    """
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        parts = status_line.split()
+        return len(parts) >= 2 and parts[1].startswith(b"2")
+    except (OSError, asyncio.TimeoutError):
+        return False
+    finally:
+        writer.close()
+
+
+async def wait_until_healthy(
+    host: str,
+    port: int,
+    path: str = "/health",
+    timeout: float = 60.0,
+    interval: float = 0.1
+) -> float:
+    """
+    Poll the health endpoint until it succeeds. Returns the seconds it took;
+    raises TimeoutError if it never became healthy.
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+    while True:
+        if await check_health(host, port, path):
+            return time.monotonic() - started
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"http://{host}:{port}{path} not healthy after {timeout:.0f}s")
+        await asyncio.sleep(interval)
@@ -0,0 +1,301 @@
+"""
+Minimal asyncio HTTP/1.1 client with a keep-alive connection pool.
+
+Used to talk to the Docker Engine API (unix socket or TCP) and the Kubernetes
+API server without spawning a CLI process per call. Only what those APIs need
+is implemented: Content-Length and chunked bodies in both directions,
+streamed responses, and connection reuse.
+
+Endpoints are given as unix:///var/run/docker.sock, tcp://host:port,
+http://host:port or https://host:port.
+"""
+import asyncio
+import json
+import ssl as ssl_module
+from contextlib import asynccontextmanager
+from urllib.parse import urlencode, urlsplit
+
+# Longest line Response.iter_lines() holds; the rest of a longer one is dropped
+MAX_LINE_BYTES = 4 << 20
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+        self.message = message
+
+
+class _Connection:
+    __slots__ = ("reader", "writer")
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @property
+    def usable(self) -> bool:
+        return not self.writer.is_closing() and not self.reader.at_eof()
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class Response:
+    def __init__(self, status: int, reason: str, headers: dict, connection: _Connection, method: str):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self._connection = connection
+        self._remaining = None
+        self._chunked = headers.get("transfer-encoding", "").lower() == "chunked"
+        self._done = False
+        self.keep_alive = headers.get("connection", "").lower() != "close"
+
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            self._done = True
+        elif not self._chunked:
+            length = headers.get("content-length")
+            if length is not None:
+                self._remaining = int(length)
+                self._done = self._remaining == 0
+            else:
+                # Body delimited by connection close
+                self.keep_alive = False
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    @property
+    def complete(self) -> bool:
+        return self._done
+
+    async def iter_chunks(self):
+        """
+        Yield the body as it arrives, without buffering it.
+        """
+        reader = self._connection.reader
+        while not self._done:
+            if self._chunked:
+                size_line = await reader.readline()
+                if not size_line:
+                    raise ConnectionError("connection closed mid-body")
+                size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+                if size == 0:
+                    # Trailers, terminated by an empty line
+                    while (await reader.readline()).strip():
+                        pass
+                    self._done = True
+                    break
+                data = await reader.readexactly(size)
+                await reader.readexactly(2)
+                yield data
+            elif self._remaining is not None:
+                data = await reader.read(min(self._remaining, 64 * 1024))
+                if not data:
+                    raise ConnectionError("connection closed mid-body")
+                self._remaining -= len(data)
+                self._done = self._remaining == 0
+                yield data
+            else:
+                data = await reader.read(64 * 1024)
+                if not data:
+                    self._done = True
+                    break
+                yield data
+
+    async def iter_lines(self, max_length: int = MAX_LINE_BYTES):
+        """
+        Yield the body's decoded lines, holding at most one line (cut to
+        max_length bytes) however long the stream goes without a newline.
+        """
+        pending = b""
+        async for chunk in self.iter_chunks():
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                yield line[:max_length].decode(errors="replace").rstrip("\r")
+            if len(pending) > max_length:
+                # Keep reading until the newline but drop the overflow
+                pending = pending[:max_length]
+        if pending:
+            yield pending.decode(errors="replace").rstrip("\r")
+
+    async def read(self) -> bytes:
+        return b"".join([chunk async for chunk in self.iter_chunks()])
+
+    async def json(self):
+        body = await self.read()
+        return json.loads(body) if body else None
+
+
+def _error_message(body: bytes) -> str:
+    try:
+        payload = json.loads(body)
+        if isinstance(payload, dict):
+            return payload.get("message") or payload.get("error") or body.decode(errors="replace")
+    except ValueError:
+        pass
+    return body.decode(errors="replace").strip()
+
+
+class HttpPool:
+    def __init__(
+        self,
+        endpoint: str,
+        max_connections: int = 8,
+        timeout: float = 30.0,
+        ssl_context: ssl_module.SSLContext = None,
+        headers: dict = None
+    ):
+        parts = urlsplit(endpoint)
+        self.endpoint = endpoint
+        self.unix_path = None
+        self.ssl = None
+        if parts.scheme == "unix":
+            self.unix_path = parts.path
+            self.host = "localhost"
+        elif parts.scheme in ("tcp", "http", "https"):
+            self.host = parts.hostname or "localhost"
+            self.port = parts.port or (443 if parts.scheme == "https" else 80)
+            if parts.scheme == "https":
+                self.ssl = ssl_context or ssl_module.create_default_context()
+        else:
+            raise ValueError(f"Unsupported endpoint: {endpoint}")
+
+        self.timeout = timeout
+        self.default_headers = headers or {}
+        self.connections_opened = 0
+        self._idle = []
+        self._slots = asyncio.Semaphore(max_connections)
+
+    async def _connect(self) -> _Connection:
+        if self.unix_path:
+            opener = asyncio.open_unix_connection(self.unix_path)
+        else:
+            opener = asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+        reader, writer = await asyncio.wait_for(opener, self.timeout)
+        self.connections_opened += 1
+        return _Connection(reader, writer)
+
+    async def _checkout(self):
+        while self._idle:
+            connection = self._idle.pop()
+            if connection.usable:
+                return connection, True
+            connection.close()
+        return await self._connect(), False
+
+    def _checkin(self, connection: _Connection, reusable: bool) -> None:
+        if reusable and connection.usable:
+            self._idle.append(connection)
+        else:
+            connection.close()
+
+    async def _send(self, connection, method, target, headers, body) -> None:
+        writer = connection.writer
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {self.host}"]
+        headers = {**self.default_headers, **(headers or {})}
+        streaming = body is not None and not isinstance(body, (bytes, bytearray))
+        if streaming:
+            headers["Transfer-Encoding"] = "chunked"
+        elif body is not None or method in ("POST", "PUT", "PATCH"):
+            headers["Content-Length"] = str(len(body or b""))
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+        if streaming:
+            async for chunk in body:
+                if chunk:
+                    writer.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                    await writer.drain()
+            writer.write(b"0\r\n\r\n")
+        elif body:
+            writer.write(body)
+        await writer.drain()
+
+    async def _read_head(self, connection, method) -> Response:
+        reader = connection.reader
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed before response")
+        _, status, *reason = status_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return Response(int(status), reason[0] if reason else "", headers, connection, method)
+
+    @asynccontextmanager
+    async def stream(self, method: str, path: str, params=None, headers: dict = None, body=None):
+        """
+        Send a request and yield the Response before its body is read.
+        `body` may be bytes or an async iterable of byte chunks (sent chunked).
+        """
+        target = path + (f"?{urlencode(params, doseq=True)}" if params else "")
+        async with self._slots:
+            connection, reused = await self._checkout()
+            try:
+                try:
+                    await self._send(connection, method, target, headers, body)
+                    response = await asyncio.wait_for(self._read_head(connection, method), self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    # A pooled connection the server already closed; retry once
+                    # on a fresh one if the body can be replayed
+                    connection.close()
+                    if not reused or not (body is None or isinstance(body, (bytes, bytearray))):
+                        raise
+                    connection = await self._connect()
+                    await self._send(connection, method, target, headers, body)
+                    response = await asyncio.wait_for(self._read_head(connection, method), self.timeout)
+            except BaseException:
+                connection.close()
+                raise
+
+            try:
+                yield response
+            except BaseException:
+                connection.close()
+                raise
+            self._checkin(connection, response.complete and response.keep_alive)
+
+    async def request(self, method: str, path: str, params=None, headers: dict = None, body=None):
+        """
+        Send a request and return (status, headers, body bytes)
+        """
+        async with self.stream(method, path, params, headers, body) as response:
+            payload = await response.read()
+            return response.status, response.headers, payload
+
+    async def json(
+        self,
+        method: str,
+        path: str,
+        params=None,
+        payload=None,
+        ok_statuses=(),
+        headers: dict = None,
+        body: bytes = None
+    ):
+        """
+        JSON request helper. Raises HttpError for non-2xx statuses not listed
+        in ok_statuses; returns (status, decoded body or None). `body` sends
+        an already encoded request body (with its own Content-Type) instead
+        of a JSON payload.
+        """
+        headers = dict(headers or {})
+        if payload is not None:
+            body = json.dumps(payload).encode()
+            headers.setdefault("Content-Type", "application/json")
+        status, _, data = await self.request(method, path, params, headers, body)
+        if not (200 <= status < 300) and status not in ok_statuses:
+            raise HttpError(status, _error_message(data))
+        return (status, json.loads(data) if data else None)
+
+    async def close(self) -> None:
+        while self._idle:
+            self._idle.pop().close()
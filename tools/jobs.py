@@ -0,0 +1,190 @@
+"""
+Bounded asyncio job queue for long-running MCP tool work (image builds,
+deploys). Tools submit a coroutine factory and return the job id right away;
+at most `max_concurrency` jobs run at once and jobs sharing a key (e.g. the
+same container name) run one after another.
+
+Jobs also publish their log lines and progress as events, so a caller that
+wants to wait can relay them to the client while the job runs. Every buffer
+involved (log tail, subscriber queues) is bounded.
+"""
+import asyncio
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from tools.metrics import Phases
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = {SUCCEEDED, FAILED, CANCELLED}
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class JobFailed(Exception):
+    """
+    Raised by job bodies to fail with a user-facing message instead of a traceback
+    """
+
+
+class Job:
+    def __init__(self, kind: str, key: str = None, log_lines: int = 200, queue_size: int = 1000):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.key = key
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.log_lines = deque(maxlen=log_lines)
+        self.progress = None
+        self.phases = Phases(kind)
+        self.task = None
+        self._queue_size = queue_size
+        self._subscribers = set()
+
+    def log(self, line: str) -> None:
+        self.log_lines.append(line)
+        self._publish(("log", line))
+
+    def phase(self, name: str):
+        """
+        Context manager timing one step of the job (reported in the summary
+        and observed into the phase metrics)
+        """
+        return self.phases.time(name)
+
+    def report_progress(self, completed: int, total: int, message: str = None) -> None:
+        self.progress = (completed, total, message)
+        self._publish(("progress", completed, total, message))
+
+    def _publish(self, event) -> None:
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A slow consumer loses events rather than growing memory
+                pass
+
+    async def events(self, poll_interval: float = 0.5):
+        """
+        Yield ("log", line) and ("progress", completed, total, message) events
+        until the job finishes.
+        """
+        queue = asyncio.Queue(maxsize=self._queue_size)
+        self._subscribers.add(queue)
+        try:
+            while not (self.finished and queue.empty()):
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=poll_interval)
+                except asyncio.TimeoutError:
+                    continue
+        finally:
+            self._subscribers.discard(queue)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def summary(self, tail: int = 20) -> str:
+        lines = [
+            f"🆔 Job ID: {self.id}",
+            f"🧰 Kind: {self.kind}",
+            f"📍 Status: {self.status}",
+            f"⏱️ Elapsed: {self.elapsed:.1f}s",
+        ]
+        if self.progress and not self.finished:
+            completed, total, message = self.progress
+            lines.append(f"📈 Progress: {completed}/{total}" + (f" {message}" if message else ""))
+        if self.log_lines:
+            lines.append("📜 Recent output:")
+            lines.extend(f"   {line}" for line in list(self.log_lines)[-tail:])
+        if self.result:
+            lines.append(self.result)
+        if self.error:
+            lines.append(f"❌ {self.error}")
+        if self.phases.durations:
+            lines.append(self.phases.report())
+        return "\n".join(lines)
+
+
+class JobManager:
+    def __init__(self, max_concurrency: int = 2, max_pending: int = 8, history: int = 100):
+        self.max_pending = max_pending
+        self.history = history
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._key_locks = {}
+        self._jobs = OrderedDict()
+
+    def submit(self, kind: str, factory, key: str = None) -> Job:
+        """
+        Schedule `factory(job)` (a coroutine function) on the running loop.
+        Raises QueueFullError when too many jobs are already queued or running.
+        """
+        pending = sum(1 for job in self._jobs.values() if not job.finished)
+        if pending >= self.max_pending:
+            raise QueueFullError(f"{pending} jobs already queued or running")
+
+        job = Job(kind, key)
+        self._jobs[job.id] = job
+        job.task = asyncio.get_running_loop().create_task(self._run(job, factory))
+        self._prune()
+        return job
+
+    def get(self, job_id: str):
+        return self._jobs.get(job_id)
+
+    def list(self):
+        return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.task.cancel()
+        return True
+
+    async def _run(self, job: Job, factory) -> None:
+        key_lock = self._key_locks.setdefault(job.key, asyncio.Lock()) if job.key else None
+        try:
+            if key_lock:
+                await key_lock.acquire()
+            try:
+                async with self._semaphore:
+                    job.status = RUNNING
+                    job.started_at = time.time()
+                    job.result = await factory(job)
+                    job.status = SUCCEEDED
+            finally:
+                if key_lock:
+                    key_lock.release()
+        except asyncio.CancelledError:
+            job.status = CANCELLED
+        except JobFailed as e:
+            job.status = FAILED
+            job.error = str(e)
+        except Exception as e:
+            job.status = FAILED
+            job.error = f"{type(e).__name__}: {e}"
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[: max(0, len(self._jobs) - self.history)]:
+            del self._jobs[job_id]
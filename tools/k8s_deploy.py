@@ -0,0 +1,249 @@
+"""
+Kubernetes rollout for the containerized application.
+
+The manifests in templates/k8s (Deployment, Service and, when autoscaling
+is enabled, a HorizontalPodAutoscaler) are rendered with string.Template and
+sent to the API server as server-side apply patches. Kubernetes has no
+multi-object apply endpoint, so the batch is applied in two concurrent passes
+over pooled keep-alive connections: a dry run of every object first, so
+nothing is changed unless the whole set validates, then the real apply. The job then
+follows the Deployment's status until the rollout completes.
+
+    client = KubeClient("http://127.0.0.1:8080")   # e.g. `kubectl proxy --port=8080`
+    await deploy(job, client, template_dir, "billing-api", settings)
+"""
+import asyncio
+import os
+import ssl
+import time
+from string import Template
+from urllib.parse import quote
+
+from tools.http_pool import HttpError, HttpPool
+from tools.jobs import JobFailed
+
+FIELD_MANAGER = "containerization-mcp"
+APPLY_CONTENT_TYPE = "application/apply-patch+yaml"
+
+# Template file -> (API group path, resource plural). Each template holds
+# exactly one object named after the application.
+RESOURCES = {
+    "deployment.yaml": ("/apis/apps/v1", "deployments"),
+    "service.yaml": ("/api/v1", "services"),
+    "hpa.yaml": ("/apis/autoscaling/v2", "horizontalpodautoscalers"),
+}
+
+DEFAULT_SETTINGS = {
+    "port": 8001,
+    "replicas": 2,
+    # Autoscaling is enabled when max_replicas exceeds replicas
+    "max_replicas": 0,
+    "cpu_target": 70,
+    "cpu_request": "250m",
+    "cpu_limit": "1",
+    "memory_request": "128Mi",
+    "memory_limit": "512Mi",
+    # Bring new pods up before old ones go away
+    "max_surge": "1",
+    "max_unavailable": "0",
+    "health_path": "/health",
+    "service_type": "ClusterIP",
+}
+
+
+class KubeError(Exception):
+    pass
+
+
+# ============================================================
+# Rendering
+# ============================================================
+def autoscaling_enabled(settings: dict) -> bool:
+    return settings["max_replicas"] > settings["replicas"]
+
+
+def render_manifests(template_dir: str, name: str, settings: dict):
+    """
+    Render every template that applies to these settings.
+    Returns [(template name, YAML text)].
+    """
+    templates = ["deployment.yaml", "service.yaml"]
+    if autoscaling_enabled(settings):
+        templates.append("hpa.yaml")
+
+    # The Deployment's own count may differ from the HPA minimum (see _deploy)
+    settings = {"deployment_replicas": settings["replicas"], **settings}
+    manifests = []
+    for template_name in templates:
+        with open(os.path.join(template_dir, template_name), "r", encoding="utf-8") as f:
+            template = Template(f.read())
+        manifests.append((template_name, template.substitute(settings, name=name)))
+    return manifests
+
+
+# ============================================================
+# API Client
+# ============================================================
+class KubeClient:
+    def __init__(
+        self,
+        endpoint: str,
+        token: str = "",
+        namespace: str = "default",
+        ca_file: str = "",
+        max_connections: int = 4,
+        timeout: float = 30.0
+    ):
+        self.endpoint = endpoint
+        self.namespace = namespace
+        headers = {"Accept": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        ssl_context = ssl.create_default_context(cafile=ca_file) if ca_file else None
+        self.http = HttpPool(
+            endpoint, max_connections=max_connections, timeout=timeout, ssl_context=ssl_context, headers=headers
+        )
+
+    def object_path(self, template_name: str, name: str) -> str:
+        group, resource = RESOURCES[template_name]
+        return f"{group}/namespaces/{quote(self.namespace)}/{resource}/{quote(name)}"
+
+    async def _call(self, method, path, params=None, body=None, headers=None, ok_statuses=()):
+        try:
+            return await self.http.json(method, path, params, ok_statuses=ok_statuses, headers=headers, body=body)
+        except HttpError as e:
+            raise KubeError(f"{method} {path}: {e.status} {e.message}")
+        except OSError as e:
+            raise KubeError(f"Kubernetes API unreachable at {self.endpoint}: {e}")
+
+    async def apply(self, manifests, name: str, dry_run: bool = False) -> None:
+        """
+        Server-side apply every manifest concurrently
+        """
+        params = {"fieldManager": FIELD_MANAGER, "force": "true"}
+        if dry_run:
+            params["dryRun"] = "All"
+        headers = {"Content-Type": APPLY_CONTENT_TYPE}
+        await asyncio.gather(*(
+            self._call("PATCH", self.object_path(template_name, name), params, text.encode(), headers)
+            for template_name, text in manifests
+        ))
+
+    async def get(self, template_name: str, name: str):
+        status, data = await self._call("GET", self.object_path(template_name, name), ok_statuses=(404,))
+        return data if status == 200 else None
+
+    async def delete(self, template_name: str, name: str) -> None:
+        await self._call("DELETE", self.object_path(template_name, name), ok_statuses=(404,))
+
+    async def close(self) -> None:
+        await self.http.close()
+
+
+# ============================================================
+# Rollout
+# ============================================================
+def rollout_status(deployment: dict):
+    """
+    Mirror `kubectl rollout status`: returns (done, ready, desired, message)
+    """
+    generation = deployment["metadata"].get("generation", 0)
+    desired = deployment["spec"].get("replicas", 1)
+    status = deployment.get("status", {})
+    updated = status.get("updatedReplicas", 0)
+    total = status.get("replicas", 0)
+    available = status.get("availableReplicas", 0)
+
+    for condition in status.get("conditions", []):
+        if condition.get("type") == "Progressing" and condition.get("reason") == "ProgressDeadlineExceeded":
+            raise KubeError(f"Rollout exceeded its progress deadline: {condition.get('message', '')}")
+
+    if status.get("observedGeneration", 0) < generation:
+        return False, 0, desired, "Waiting for the rollout to be observed"
+    if updated < desired:
+        return False, updated, desired, f"{updated}/{desired} replicas updated"
+    if total > updated:
+        return False, updated, desired, f"{total - updated} old replicas pending termination"
+    if available < updated:
+        return False, available, desired, f"{available}/{desired} updated replicas available"
+    return True, available, desired, f"{available}/{desired} replicas available"
+
+
+async def wait_for_rollout(job, client: KubeClient, name: str, timeout: float, poll_interval: float) -> float:
+    started = time.monotonic()
+    last_message = None
+    while True:
+        deployment = await client.get("deployment.yaml", name)
+        if deployment is None:
+            raise KubeError(f"Deployment {name} disappeared during the rollout")
+        done, ready, desired, message = rollout_status(deployment)
+        if message != last_message:
+            job.report_progress(ready, desired, f"☸️ {message}")
+            last_message = message
+        if done:
+            return time.monotonic() - started
+        if time.monotonic() - started >= timeout:
+            raise KubeError(f"Rollout of {name} not finished after {timeout:.0f}s ({message})")
+        await asyncio.sleep(poll_interval)
+
+
+# ============================================================
+# Deploy Pipeline
+# ============================================================
+async def deploy(
+    job,
+    client: KubeClient,
+    template_dir: str,
+    name: str,
+    settings: dict,
+    timeout: float = 300.0,
+    poll_interval: float = 1.0
+) -> str:
+    try:
+        return await _deploy(job, client, template_dir, name, {**DEFAULT_SETTINGS, **settings}, timeout, poll_interval)
+    except KubeError as e:
+        raise JobFailed(str(e))
+
+
+async def _deploy(job, client, template_dir, name, settings, timeout, poll_interval):
+    autoscaling = autoscaling_enabled(settings)
+    if autoscaling:
+        # The HPA owns the replica count; re-applying the minimum would
+        # scale a busy deployment back down on every rollout
+        current = await client.get("deployment.yaml", name)
+        if current is not None:
+            settings["deployment_replicas"] = max(settings["replicas"], current["spec"].get("replicas", 0))
+
+    with job.phase("render"):
+        manifests = render_manifests(template_dir, name, settings)
+    job.log(f"☸️ Rendered {', '.join(template_name for template_name, _ in manifests)} for {name}")
+
+    job.log("🔍 Validating manifests (server-side dry run)")
+    with job.phase("validate"):
+        await client.apply(manifests, name, dry_run=True)
+    job.log(f"📤 Applying {len(manifests)} objects to namespace {client.namespace}")
+    with job.phase("apply"):
+        await client.apply(manifests, name)
+        if not autoscaling:
+            await client.delete("hpa.yaml", name)
+
+    job.log("⏳ Waiting for rollout")
+    with job.phase("rollout"):
+        elapsed = await wait_for_rollout(job, client, name, timeout, poll_interval)
+
+    scaling = (
+        f"📈 Autoscaling: {settings['replicas']}-{settings['max_replicas']} replicas at "
+        f"{settings['cpu_target']}% CPU"
+        if autoscaling else f"📦 Replicas: {settings['replicas']} (autoscaling off)"
+    )
+    return (
+        f"✅ {name} rolled out to Kubernetes in {elapsed:.1f}s.\n"
+        f"🐳 Image: {settings['image']}\n"
+        f"☸️ Namespace: {client.namespace} | Service: {name} ({settings['service_type']}, "
+        f"port {settings['port']})\n"
+        f"{scaling}\n"
+        f"🧮 Resources per pod: {settings['cpu_request']}/{settings['cpu_limit']} CPU, "
+        f"{settings['memory_request']}/{settings['memory_limit']} memory\n"
+        f"🔁 Rolling update: maxSurge {settings['max_surge']}, maxUnavailable {settings['max_unavailable']}, "
+        f"probes on {settings['health_path']}"
+    )
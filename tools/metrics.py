@@ -0,0 +1,196 @@
+"""
+Prometheus metrics and per-phase timings for the MCP server.
+
+The registry renders the Prometheus text exposition format for the server's
+/metrics route; nothing is pushed anywhere. Phases times the steps of one
+operation (a deploy job, a prepare call): each step is observed into the
+mcp_phase_duration_seconds histogram and kept for the one-line breakdown
+appended to the tool's response.
+"""
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+# ============================================================
+# Metric Types
+# ============================================================
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def lines(self):
+        for key, value in sorted(self.values.items()):
+            yield f"{self.name}{_labels(self.labelnames, key)} {value}"
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts..., sum, count]
+        self.values = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        counts = self.values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[position] += 1
+                break
+        counts[-2] += value
+        counts[-1] += 1
+
+    def lines(self):
+        for key, counts in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, [('le', float(bound))])} {cumulative}"
+            yield f"{self.name}_bucket{_labels(self.labelnames, key, [('le', '+Inf')])} {counts[-1]}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {counts[-2]}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {counts[-1]}"
+
+
+class Gauge:
+    """
+    Read when scraped: collect() returns {label values tuple: value}
+    """
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames=(), collect=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def lines(self):
+        for key, value in sorted(self.collect().items()):
+            yield f"{self.name}{_labels(self.labelnames, key)} {value}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.lines())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+tool_seconds = registry.register(Histogram(
+    "mcp_tool_duration_seconds", "Time to answer an MCP tool call, by tool", ("tool",)
+))
+phase_seconds = registry.register(Histogram(
+    "mcp_phase_duration_seconds", "Duration of each phase of a job or tool call", ("kind", "phase")
+))
+build_cache_requests = registry.register(Counter(
+    "mcp_build_cache_requests_total", "Image build cache lookups (hit, miss, or up_to_date: nothing to deploy)",
+    ("result",)
+))
+wheelhouse_locks = registry.register(Counter(
+    "mcp_wheelhouse_locks_total",
+    "Dependency lock lookups (locked: reused, offline: resolved from the wheelhouse, online: from the index)",
+    ("result",)
+))
+cold_start_seconds = registry.register(Histogram(
+    "mcp_cold_start_seconds", "Time from starting a deployed container to its first healthy response, by strategy",
+    ("strategy",)
+))
+
+
+# ============================================================
+# Phase Timing
+# ============================================================
+class Phases:
+    """
+    Durations of the named steps of one operation, in the order they ran
+    (a phase entered twice accumulates)
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.durations = {}
+
+    @contextmanager
+    def time(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name: str, seconds: float) -> None:
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+        phase_seconds.observe(seconds, kind=self.kind, phase=name)
+
+    def report(self) -> str:
+        if not self.durations:
+            return ""
+        return "⏱️ Phases: " + " | ".join(
+            f"{name} {seconds * 1000:.0f}ms" if seconds < 1 else f"{name} {seconds:.1f}s"
+            for name, seconds in self.durations.items()
+        )
+
+
+def timed_tool(name: str):
+    """
+    Observe every call of a tool function (sync or async) into
+    mcp_tool_duration_seconds
+    """
+    def decorate(function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                finally:
+                    tool_seconds.observe(time.perf_counter() - started, tool=name)
+        else:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    tool_seconds.observe(time.perf_counter() - started, tool=name)
+        return wrapper
+    return decorate
@@ -0,0 +1,196 @@
+"""
+Lightweight asyncio TCP proxy that owns the application's public port.
+
+Deploy strategies that replace containers without downtime start the new
+containers on spare ports and then switch the proxy's upstreams; the switch
+is a single list assignment, so new connections go to the new containers
+immediately while connections already open to the old ones finish normally.
+
+With several upstreams each new connection is balanced round-robin or to the
+upstream with the fewest open connections. Upstreams failing their periodic
+health check (or refusing a connection) are skipped until they recover.
+"""
+import asyncio
+import itertools
+import socket
+
+from tools.health import check_health
+
+BUFFER_SIZE = 64 * 1024
+BALANCING_MODES = ("round_robin", "least_connections")
+
+UNAVAILABLE_RESPONSE = (
+    b"HTTP/1.1 503 Service Unavailable\r\n"
+    b"Content-Type: text/plain\r\nContent-Length: 27\r\nConnection: close\r\n\r\n"
+    b"No healthy upstream replica"
+)
+
+
+class Upstream:
+    __slots__ = ("host", "port", "active", "total", "healthy")
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.active = 0
+        self.total = 0
+        self.healthy = True
+
+    @property
+    def address(self):
+        return self.host, self.port
+
+
+def find_free_port(host: str = "127.0.0.1") -> int:
+    """
+    Ask the OS for a currently unused TCP port
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+
+async def _pipe(reader, writer) -> None:
+    try:
+        while True:
+            data = await reader.read(BUFFER_SIZE)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+        if writer.can_write_eof():
+            writer.write_eof()
+    except (ConnectionError, OSError):
+        pass
+
+
+class TcpProxy:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        balancing: str = "round_robin",
+        health_path: str = "/health",
+        health_interval: float = 2.0
+    ):
+        self.host = host
+        self.port = port
+        self.balancing = balancing
+        self.health_path = health_path
+        self.health_interval = health_interval
+        self.upstreams = []
+        self._server = None
+        self._health_task = None
+        self._turn = itertools.count()
+
+    @property
+    def running(self) -> bool:
+        return self._server is not None
+
+    async def start(self) -> None:
+        if self._server is None:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            if self.health_path:
+                self._health_task = asyncio.create_task(self._check_health())
+
+    async def stop(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def set_upstreams(self, addresses):
+        """
+        Atomically replace the upstream set, keeping counters for upstreams
+        that stay. Returns the upstreams that were removed.
+        """
+        current = {upstream.address: upstream for upstream in self.upstreams}
+        self.upstreams = [current.get(address) or Upstream(*address) for address in addresses]
+        kept = {upstream.address for upstream in self.upstreams}
+        return [upstream for address, upstream in current.items() if address not in kept]
+
+    def pick(self, exclude=()):
+        candidates = [u for u in self.upstreams if u.healthy and u not in exclude]
+        if not candidates:
+            return None
+        turn = next(self._turn)
+        if self.balancing == "least_connections":
+            # Rotate the start so ties are still spread across replicas
+            offset = turn % len(candidates)
+            rotated = candidates[offset:] + candidates[:offset]
+            return min(rotated, key=lambda upstream: upstream.active)
+        return candidates[turn % len(candidates)]
+
+    def status(self) -> str:
+        return ", ".join(
+            f"{u.host}:{u.port} {'up' if u.healthy else 'down'} ({u.active} open, {u.total} total)"
+            for u in self.upstreams
+        )
+
+    async def drain(self, upstreams, timeout: float = 10.0) -> bool:
+        """
+        Wait until no connections remain open to the given upstreams
+        """
+        deadline = asyncio.get_running_loop().time() + timeout
+        while any(upstream.active for upstream in upstreams):
+            if asyncio.get_running_loop().time() >= deadline:
+                return False
+            await asyncio.sleep(0.05)
+        return True
+
+    async def _check_health(self) -> None:
+        while True:
+            upstreams = list(self.upstreams)
+            results = await asyncio.gather(*(
+                check_health(upstream.host, upstream.port, self.health_path) for upstream in upstreams
+            ))
+            for upstream, healthy in zip(upstreams, results):
+                upstream.healthy = healthy
+            await asyncio.sleep(self.health_interval)
+
+    async def _connect(self):
+        """
+        Open a connection to a healthy upstream, failing over to the next one
+        when a replica refuses the connection
+        """
+        tried = []
+        while True:
+            upstream = self.pick(tried)
+            if upstream is None:
+                return None, None, None
+            try:
+                reader, writer = await asyncio.open_connection(upstream.host, upstream.port)
+                return upstream, reader, writer
+            except OSError:
+                upstream.healthy = False
+                tried.append(upstream)
+
+    async def _handle(self, client_reader, client_writer) -> None:
+        upstream, upstream_reader, upstream_writer = await self._connect()
+        if upstream is None:
+            try:
+                client_writer.write(UNAVAILABLE_RESPONSE)
+                await client_writer.drain()
+            except (ConnectionError, OSError):
+                pass
+            client_writer.close()
+            return
+
+        upstream.active += 1
+        upstream.total += 1
+        try:
+            await asyncio.gather(
+                _pipe(client_reader, upstream_writer),
+                _pipe(upstream_reader, client_writer)
+            )
+            upstream_writer.close()
+        finally:
+            upstream.active -= 1
+            client_writer.close()
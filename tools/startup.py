@@ -0,0 +1,105 @@
+"""
+Cold start measurement and import profiles for deployed containers.
+
+A deploy's cold start is the time from asking the daemon to run the
+container to the first successful answer on its health path: image start,
+interpreter start, importing the application and opening the port. The
+health probe polls every HEALTH_POLL_SECONDS while measuring so the figure is
+not rounded up to a coarse polling interval.
+
+Most of a Python service's start is usually spent importing. With an import
+profile requested, the deploy runs the entry module's import once more
+inside the new container under `python -X importtime` and reports where the
+time went, by top-level package and by the slowest modules.
+"""
+import re
+
+from tools.metrics import cold_start_seconds
+
+HEALTH_POLL_SECONDS = 0.02
+
+# import time:   self [us] | cumulative | <2 spaces per nesting level>module
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)\s*$")
+
+# Packages named in the report; the rest are summed up as "other"
+TOP_PACKAGES = 6
+SLOWEST_MODULES = 5
+
+
+def record_cold_start(seconds: float, strategy: str) -> str:
+    cold_start_seconds.observe(seconds, strategy=strategy)
+    return f"🚀 Cold start: {seconds:.2f}s (container start to first healthy response)"
+
+
+# ============================================================
+# Import Profiles
+# ============================================================
+def parse_importtime(output: str):
+    """
+    (module, self µs, cumulative µs, nesting depth) for each line of
+    -X importtime output, in the order printed (a module after its imports)
+    """
+    imports = []
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            own, cumulative, indent, module = match.groups()
+            imports.append((module, int(own), int(cumulative), len(indent) // 2))
+    return imports
+
+
+def module_imports(imports, module: str):
+    """
+    The lines for importing `module` itself: its top-level line and every
+    nested import printed since the previous top-level one. Interpreter
+    startup (site, encodings) and anything imported before is left out.
+    """
+    start = 0
+    for position, (name, _, _, depth) in enumerate(imports):
+        if depth != 0:
+            continue
+        if name == module:
+            return imports[start:position + 1]
+        start = position + 1
+    return []
+
+
+def import_profile_report(output: str, module: str) -> str:
+    imports = module_imports(parse_importtime(output), module)
+    if not imports:
+        return f"⚠️ Import profile: no -X importtime output for {module}"
+
+    by_package = {}
+    for name, own, _, _ in imports:
+        package = name.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + own
+    ranked = sorted(by_package.items(), key=lambda item: item[1], reverse=True)
+    shown = ranked[:TOP_PACKAGES]
+    other = sum(own for _, own in ranked[TOP_PACKAGES:])
+    if other:
+        shown.append(("other", other))
+    slowest = sorted(imports, key=lambda line: line[1], reverse=True)[:SLOWEST_MODULES]
+
+    return (
+        f"🧩 Import profile of {module}: {imports[-1][2] / 1000:.0f}ms in {len(imports)} modules — "
+        + " | ".join(f"{package} {own / 1000:.0f}ms" for package, own in shown)
+        + "\n🐢 Slowest modules: "
+        + ", ".join(f"{name} {own / 1000:.0f}ms" for name, own, _, _ in slowest)
+    )
+
+
+async def profile_imports(job, backend, container: str, module: str) -> str:
+    """
+    Import `module` in the running container under -X importtime and report
+    on it. A failed profile is reported, never raised: the deploy itself
+    already succeeded.
+    """
+    job.log(f"🧩 Profiling the import of {module} in {container}")
+    with job.phase("import_profile"):
+        code, output = await backend.exec_in_container(
+            container, ["python", "-X", "importtime", "-c", f"import {module}"]
+        )
+    if code != 0:
+        last_line = (output.strip().splitlines() or ["no output"])[-1]
+        return f"⚠️ Import profile failed (exit code {code}): {last_line}"
+    return import_profile_report(output, module)
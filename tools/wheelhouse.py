@@ -0,0 +1,240 @@
+"""
+Shared wheelhouse and dependency locks for offline dependency layers.
+
+With unpinned requirements every image build resolves and downloads its
+dependencies again, and a new upstream release silently changes what gets
+installed. Instead the server resolves a project's requirements.txt once per
+lock key (the normalized requirements, the image's Python version and the
+daemon's CPU architecture) into a lock: the exact wheels for that target,
+pinned by version and sha256.
+
+The wheels live in one wheelhouse shared by every project the server
+containerizes. A new key is first resolved from the wheelhouse alone
+(pip --no-index), so dependencies another project already fetched cost no
+network at all; only what is missing is downloaded from the index.
+
+The build context carries the locked wheels plus the lock, as
+requirements.txt, under containerize.WHEELHOUSE_ARCNAME; the rendered
+Dockerfile installs them with --no-index, so the dependency layers build
+without network and stay cached until the lock changes.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import deque
+
+from tools.build_cache import hash_file
+from tools.containerize import WHEELHOUSE_ARCNAME, read_requirements
+from tools.docker_cli import iter_lines
+from tools.jobs import JobFailed
+from tools.metrics import wheelhouse_locks
+
+# Docker architectures -> manylinux machine names
+MACHINES = {"amd64": "x86_64", "x86_64": "x86_64", "arm64": "aarch64", "aarch64": "aarch64"}
+# glibc baselines the slim (Debian) images satisfy, newest first
+MANYLINUX_TAGS = ("manylinux_2_28", "manylinux_2_17", "manylinux2014", "manylinux_2_5", "manylinux1")
+
+# pip output lines kept for the failure message
+ERROR_TAIL_LINES = 20
+
+
+def lock_key(requirements, python_version: str, machine: str) -> str:
+    """
+    Identity of a resolution: the same requirements (in any order) for the
+    same interpreter and machine always lock to the same key
+    """
+    identity = json.dumps([sorted(requirements), python_version, machine])
+    return hashlib.sha256(identity.encode()).hexdigest()
+
+
+def _pip_target_args(python_version: str, machine: str):
+    abi = "cp" + python_version.replace(".", "")
+    args = ["--only-binary=:all:", "--implementation", "cp", "--python-version", python_version]
+    for tag in (abi, "abi3", "none"):
+        args += ["--abi", tag]
+    for tag in MANYLINUX_TAGS:
+        args += ["--platform", f"{tag}_{machine}"]
+    return args
+
+
+def _wheel_pin(filename: str):
+    """
+    (name, version) of a wheel file, e.g. ("pydantic_core", "2.23.4")
+    """
+    name, version = filename.split("-")[:2]
+    return name, version
+
+
+class Wheelhouse:
+    def __init__(self, path: str):
+        self.path = path
+        self.wheels_dir = os.path.join(path, "wheels")
+        self.locks_dir = os.path.join(path, "locks")
+
+    def _lock_path(self, key: str, extension: str) -> str:
+        return os.path.join(self.locks_dir, f"{key[:24]}.{extension}")
+
+    # ============================================================
+    # Locks
+    # ============================================================
+    def load_lock(self, key: str):
+        """
+        The lock for key, or None when it is missing or any of its wheels
+        is no longer in the wheelhouse
+        """
+        try:
+            with open(self._lock_path(key, "json"), "r", encoding="utf-8") as f:
+                lock = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if lock.get("key") != key or not os.path.exists(self._lock_path(key, "txt")):
+            return None
+        if not all(os.path.exists(os.path.join(self.wheels_dir, wheel["file"])) for wheel in lock["wheels"]):
+            return None
+        return lock
+
+    def _save_lock(self, lock: dict) -> None:
+        os.makedirs(self.locks_dir, exist_ok=True)
+        pins = "".join(
+            f"{wheel['name']}=={wheel['version']} --hash=sha256:{wheel['sha256']}\n" for wheel in lock["wheels"]
+        )
+        requirements_txt = (
+            f"# Locked for CPython {lock['python_version']} on linux/{lock['machine']} "
+            f"from: {', '.join(lock['requirements'])}\n{pins}"
+        )
+        # The pip lock first: a JSON lock is only loaded when both exist
+        for extension, content in (("txt", requirements_txt), ("json", json.dumps(lock, indent=2))):
+            path = self._lock_path(lock["key"], extension)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(path + ".tmp", path)
+
+    def context_files(self, lock: dict) -> dict:
+        """
+        Build context entries (arcname -> path) for a lock's wheels and pins
+        """
+        files = {
+            f"{WHEELHOUSE_ARCNAME}/{wheel['file']}": os.path.join(self.wheels_dir, wheel["file"])
+            for wheel in lock["wheels"]
+        }
+        files[f"{WHEELHOUSE_ARCNAME}/requirements.txt"] = self._lock_path(lock["key"], "txt")
+        return files
+
+    # ============================================================
+    # Resolution
+    # ============================================================
+    async def _download(self, job, requirements_path: str, python_version: str, machine: str, offline: bool):
+        """
+        pip download the requirements for the target into a fresh directory
+        inside the wheelhouse. Returns the directory, or None if pip failed.
+        """
+        os.makedirs(self.wheels_dir, exist_ok=True)
+        destination = tempfile.mkdtemp(prefix="resolve-", dir=self.path)
+        args = [
+            sys.executable, "-m", "pip", "download", "--disable-pip-version-check", "--progress-bar", "off",
+            "--dest", destination, "--find-links", self.wheels_dir,
+            *_pip_target_args(python_version, machine), "-r", requirements_path,
+        ]
+        if offline:
+            args.append("--no-index")
+        process = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+        )
+        tail = deque(maxlen=ERROR_TAIL_LINES)
+        try:
+            async for line in iter_lines(process.stdout):
+                tail.append(line)
+                if not offline:
+                    job.log(line)
+            code = await process.wait()
+        except asyncio.CancelledError:
+            process.kill()
+            await process.wait()
+            shutil.rmtree(destination, ignore_errors=True)
+            raise
+        if code != 0:
+            shutil.rmtree(destination, ignore_errors=True)
+            if offline:
+                return None
+            raise JobFailed("Resolving dependencies failed:\n" + "\n".join(tail))
+        return destination
+
+    def _adopt(self, destination: str, key: str, requirements, python_version: str, machine: str) -> dict:
+        """
+        Move a resolution's wheels into the wheelhouse and lock them
+        """
+        wheels = []
+        try:
+            for filename in sorted(os.listdir(destination)):
+                if not filename.endswith(".whl"):
+                    continue
+                target = os.path.join(self.wheels_dir, filename)
+                # Wheel file names are unique per build: an existing one is the same wheel
+                if not os.path.exists(target):
+                    os.replace(os.path.join(destination, filename), target)
+                name, version = _wheel_pin(filename)
+                wheels.append({"name": name, "version": version, "file": filename, "sha256": hash_file(target)})
+        finally:
+            shutil.rmtree(destination, ignore_errors=True)
+        lock = {
+            "key": key,
+            "python_version": python_version,
+            "machine": machine,
+            "requirements": sorted(requirements),
+            "created_at": time.time(),
+            "wheels": wheels,
+        }
+        self._save_lock(lock)
+        return lock
+
+    async def ensure_lock(
+        self,
+        job,
+        requirements_path: str,
+        python_version: str,
+        architecture: str,
+        refresh: bool = False
+    ) -> dict:
+        """
+        The lock for these requirements, resolving them if there is none yet:
+        from the wheelhouse alone when it has everything, else from the
+        index. refresh=True re-resolves from the index to pick up new
+        releases.
+        """
+        machine = MACHINES.get(architecture)
+        if machine is None:
+            raise JobFailed(f"No manylinux wheels for the daemon's architecture: {architecture}")
+        requirements = read_requirements(requirements_path)
+        key = lock_key(requirements, python_version, machine)
+
+        lock = None if refresh else self.load_lock(key)
+        if lock is not None:
+            wheelhouse_locks.inc(result="locked")
+            job.log(f"🔒 Dependencies locked ({len(lock['wheels'])} wheels, key {key[:12]})")
+            return lock
+
+        destination = None
+        if not refresh:
+            job.log("🔎 Resolving dependencies from the shared wheelhouse")
+            destination = await self._download(job, requirements_path, python_version, machine, offline=True)
+        result = "offline"
+        if destination is None:
+            job.log("🌐 Downloading dependency wheels from the package index")
+            destination = await self._download(job, requirements_path, python_version, machine, offline=False)
+            result = "online"
+        lock = await asyncio.to_thread(self._adopt, destination, key, requirements, python_version, machine)
+        wheelhouse_locks.inc(result=result)
+        job.log(f"🔒 Locked {len(lock['wheels'])} wheels (key {key[:12]}, resolved {result})")
+        return lock
+
+
+def lock_report(lock: dict) -> str:
+    return (
+        f"🔒 Dependencies: {len(lock['wheels'])} locked wheels for CPython {lock['python_version']} "
+        f"on linux/{lock['machine']}, installed offline (lock {lock['key'][:12]})"
+    )